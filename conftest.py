@@ -0,0 +1,16 @@
+"""Окружение тестов под pytest - то же, что у manage.py test
+(yatube.testing)."""
+import pytest
+
+from yatube.testing import override_test_settings, reset_caches
+
+
+@pytest.fixture(autouse=True, scope="session")
+def _test_settings():
+    with override_test_settings():
+        yield
+
+
+@pytest.fixture(autouse=True)
+def _reset_caches(_test_settings):
+    reset_caches()
@@ -1,16 +1,60 @@
+from django.conf import settings
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db.models import Max, Min
+from django.utils.functional import cached_property
 
 from .models import Post, Group, Comment, Follow
+from .search import FTS_TABLE, is_supported, match_expression
 
 
-class PostAdmin(admin.ModelAdmin):
+class EstimatedCountPaginator(Paginator):
+    """Paginator списков админки без COUNT(*) по всей таблице.
+
+    Без фильтров число строк оценивается по диапазону первичного ключа
+    (два поиска по индексу), с фильтрами считается не больше
+    ADMIN_COUNT_LIMIT строк.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            bounds = queryset.aggregate(first=Min("pk"), last=Max("pk"))
+            if bounds["first"] is None:
+                return 0
+            return bounds["last"] - bounds["first"] + 1
+        limit = settings.ADMIN_COUNT_LIMIT
+        return len(queryset.order_by().values("pk")[:limit])
+
+
+class ScalableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class PostAdmin(ScalableAdmin):
     list_display = ("pk", "group", "text", "pub_date", "author")
+    list_select_related = ("group", "author")
     search_fields = ("text",)
     list_filter = ("pub_date",)
+    date_hierarchy = "pub_date"
+    autocomplete_fields = ("author", "group")
     empty_value_display = "-пусто-"
 
+    def get_search_results(self, request, queryset, search_term):
+        # Поиск по тексту через индекс FTS5 вместо LIKE '%...%'
+        match = match_expression(search_term)
+        if not match or not is_supported():
+            return super().get_search_results(request, queryset,
+                                              search_term)
+        return queryset.extra(
+            where=[f"posts_post.id IN (SELECT rowid FROM {FTS_TABLE} "
+                   f"WHERE {FTS_TABLE} MATCH %s)"],
+            params=[match]), False
+
 
-class GroupAdmin(admin.ModelAdmin):
+class GroupAdmin(ScalableAdmin):
     list_display = ("pk", "title", "slug", "description")
     search_fields = ("title",)
     list_filter = ("slug",)
@@ -18,14 +62,18 @@ class GroupAdmin(admin.ModelAdmin):
 
 
 @admin.register(Comment)
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(ScalableAdmin):
     list_display = ("pk", "post", "author", "created")
+    list_select_related = ("post", "author")
     readonly_fields = ("created",)
+    autocomplete_fields = ("post", "author")
 
 
 @admin.register(Follow)
-class FollowAdmin(admin.ModelAdmin):
+class FollowAdmin(ScalableAdmin):
     list_display = ("pk", "user", "author")
+    list_select_related = ("user", "author")
+    autocomplete_fields = ("user", "author")
 
 
 admin.site.register(Post, PostAdmin)
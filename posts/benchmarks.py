@@ -0,0 +1,192 @@
+"""Замеры страниц posts и about (команда bench_views).
+
+Каждый маршрут из posts/urls.py и about/urls.py запрашивается тестовым
+клиентом анонимно и от имени пользователя, с пустым и прогретым кешем,
+а ленты - ещё и на глубоких страницах (?page=N и курсор на 90% ленты).
+Для каждого случая записываются перцентили времени, число запросов к БД
+и размер ответа. Запросы выполняются в транзакции, которая откатывается,
+поэтому записывающие страницы не меняют базу.
+"""
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from about.urls import app_name as about_app, urlpatterns as about_urls
+from .feed import follow_feed
+from .models import Group, Post, User, UserStats
+from .pagination import encode_cursor
+from .urls import app_name as posts_app, urlpatterns as posts_urls
+
+Case = namedtuple("Case", "route viewer cache variant method path data")
+
+FEED_ROUTES = ("posts:index", "posts:group", "posts:profile",
+               "posts:follow_index", "posts:search")
+# Страницы, которые имеют смысл только для автора поста
+AUTHOR_ROUTES = ("posts:post_edit", "posts:post_delete")
+POST_ROUTES = {"posts:add_comment": {"text": "Комментарий для замера"}}
+
+
+class _Rollback(Exception):
+    pass
+
+
+def route_names():
+    return ([f"{posts_app}:{pattern.name}" for pattern in posts_urls]
+            + [f"{about_app}:{pattern.name}" for pattern in about_urls])
+
+
+def percentile(values, share):
+    ordered = sorted(values)
+    position = max(0, min(len(ordered) - 1,
+                          round(share * len(ordered)) - 1))
+    return ordered[position]
+
+
+class Fixture:
+    """Объекты выборки, на которых меряются страницы: самый
+    комментируемый пост, его автор, самая большая группа и читатель с
+    наибольшим числом подписок."""
+
+    def __init__(self):
+        self.post = (Post.objects.select_related("author")
+                     .order_by("-comments_count", "-id").first())
+        if self.post is None:
+            raise ValueError("В базе нет постов")
+        self.author = self.post.author
+        stats = (UserStats.objects.exclude(user=self.author)
+                 .order_by("-following_count").first())
+        self.reader = (stats.user if stats
+                       else User.objects.exclude(id=self.author.id).first())
+        self.group = (Group.objects.annotate(total=Count("posts"))
+                      .order_by("-total").first())
+        self.word = self.post.text.split()[0] if self.post.text else "а"
+
+    def kwargs(self, route):
+        values = {"username": self.author.username, "post_id": self.post.id,
+                  "slug": self.group.slug if self.group else "-"}
+        pattern = next(pattern for pattern in posts_urls + about_urls
+                       if route.endswith(f":{pattern.name}"))
+        return {name: values[name] for name in pattern.pattern.converters}
+
+    def feed(self, route):
+        posts = Post.objects.order_by("-pub_date", "-id")
+        if route == "posts:group":
+            return posts.filter(group=self.group)
+        if route == "posts:profile":
+            return posts.filter(author=self.author)
+        if route == "posts:follow_index":
+            return follow_feed(self.reader)
+        return posts
+
+    def deep_variants(self, route):
+        variants = {"page": {"page": settings.PAGINATE_OFFSET_PAGES}}
+        if route == "posts:search":
+            return variants
+        posts = self.feed(route)
+        depth = int(posts.count() * 0.9)
+        deep = list(posts[depth:depth + 1]) if depth else []
+        if deep:
+            variants["cursor"] = {
+                "after": encode_cursor([deep[0].pub_date, deep[0].id])}
+        return variants
+
+
+def build_cases(fixture):
+    cases = []
+    for route in route_names():
+        path = reverse(route, kwargs=fixture.kwargs(route))
+        method = "post" if route in POST_ROUTES else "get"
+        data = dict(POST_ROUTES.get(route, {}))
+        if route == "posts:search":
+            data["q"] = fixture.word
+        variants = {"first": {}}
+        if route in FEED_ROUTES:
+            variants.update(fixture.deep_variants(route))
+        viewers = ["anonymous", "reader"]
+        if route in AUTHOR_ROUTES:
+            viewers.append("author")
+        for viewer in viewers:
+            for cache_state in ("cold", "warm"):
+                for variant, params in variants.items():
+                    cases.append(Case(route, viewer, cache_state, variant,
+                                      method, path, {**data, **params}))
+    return cases
+
+
+def case_key(case):
+    return f"{case.route}|{case.viewer}|{case.cache}|{case.variant}"
+
+
+def _request(client, case):
+    """Один запрос в откатываемой транзакции: (секунды, запросы, ответ)."""
+    result = None
+    try:
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                response = getattr(client, case.method)(case.path, case.data)
+                elapsed = time.perf_counter() - start
+            result = (elapsed, len(queries), response)
+            raise _Rollback
+    except _Rollback:
+        return result
+
+
+def measure(case, clients, repeats):
+    client = clients[case.viewer]
+    if case.cache == "warm":
+        _request(client, case)
+    timings = []
+    for _ in range(repeats):
+        if case.cache == "cold":
+            cache.clear()
+        elapsed, queries, response = _request(client, case)
+        timings.append(elapsed * 1000)
+    return {
+        "p50": round(percentile(timings, 0.5), 3),
+        "p90": round(percentile(timings, 0.9), 3),
+        "p99": round(percentile(timings, 0.99), 3),
+        "queries": queries,
+        "bytes": len(response.content),
+        "status": response.status_code,
+    }
+
+
+def run(repeats):
+    fixture = Fixture()
+    clients = {"anonymous": Client(), "reader": Client(), "author": Client()}
+    clients["reader"].force_login(fixture.reader)
+    clients["author"].force_login(fixture.author)
+    results = {case_key(case): measure(case, clients, repeats)
+               for case in build_cases(fixture)}
+    cache.clear()
+    return results
+
+
+def compare(results, baseline, threshold, min_ms=1.0):
+    """Регрессии относительно прошлого прогона: медиана выросла больше
+    чем на threshold (и хотя бы на min_ms) или стало больше запросов."""
+    regressions = []
+    for size, cases in results.items():
+        for key, current in cases.items():
+            previous = baseline.get(size, {}).get(key)
+            if previous is None:
+                continue
+            if current["queries"] > previous["queries"]:
+                regressions.append(
+                    f"{size} {key}: запросов {previous['queries']} -> "
+                    f"{current['queries']}")
+            slower = current["p50"] - previous["p50"]
+            if (slower > min_ms
+                    and current["p50"] > previous["p50"] * (1 + threshold)):
+                regressions.append(
+                    f"{size} {key}: p50 {previous['p50']} -> "
+                    f"{current['p50']} мс")
+    return regressions
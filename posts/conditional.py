@@ -0,0 +1,50 @@
+"""ETag страниц поста, профиля и группы для условного GET.
+
+Валидатор страницы - версии того, что на ней выводится: поста и профиля
+автора (Post.version, UserStats.version) или группы (Group.version).
+Версии растут при каждом видимом изменении (posts.signals, posts.counters),
+поэтому проверка - один запрос по индексу, и при совпадении view отдаёт
+304, не выбирая посты и не рендеря шаблон.
+
+Страница зависит и от зрителя (имя в меню, кнопки, токен CSRF в форме),
+поэтому в ETag входят cookie сессии и CSRF: их значения меняются при входе
+и выходе, а читать сессию ради них не нужно.
+"""
+import hashlib
+
+from django.conf import settings
+
+from .models import Group, Post, UserStats
+
+
+def make_etag(request, *parts):
+    viewer = (request.COOKIES.get(settings.SESSION_COOKIE_NAME, ""),
+              request.COOKIES.get(settings.CSRF_COOKIE_NAME, ""))
+    key = repr((settings.PAGE_ETAG_VERSION, parts, viewer))
+    return hashlib.md5(key.encode()).hexdigest()
+
+
+def post_etag(request, username, post_id):
+    versions = (Post.objects.filter(id=post_id, author__username=username)
+                .values_list("version", "author__stats__version").first())
+    if versions is None:
+        return None
+    return make_etag(request, "post", post_id, *versions)
+
+
+def profile_etag(request, username):
+    version = (UserStats.objects.filter(user__username=username)
+               .values_list("version", flat=True).first())
+    if version is None:
+        return None
+    return make_etag(request, "profile", username, version)
+
+
+def group_etag(request, slug):
+    version = (Group.objects.filter(slug=slug)
+               .values_list("version", flat=True).first())
+    if version is None:
+        return None
+    # Группу view берёт из posts.lookups без версии: отдаём ему свежую
+    request.group_version = version
+    return make_etag(request, "group", slug, version)
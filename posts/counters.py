@@ -0,0 +1,93 @@
+"""Денормализованные счётчики: комментарии поста и статистика автора.
+
+Счётчики меняются атомарным UPDATE ... SET x = x + 1 в той же транзакции,
+что и сама запись, поэтому остаются точными. recount_all() пересчитывает
+их с нуля (команда recount_stats).
+"""
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+
+def exact_user_stats(user_id):
+    return {
+        "posts_count": Post.objects.filter(author_id=user_id).count(),
+        "followers_count": Follow.objects.filter(author_id=user_id).count(),
+        "following_count": Follow.objects.filter(user_id=user_id).count(),
+    }
+
+
+def _add(field, delta):
+    # Разошедшийся счётчик (bulk_create до recount_stats) не уходит ниже
+    # нуля: иначе удаление упадёт на CHECK поля
+    if delta < 0:
+        return Greatest(F(field) + delta, Value(0))
+    return F(field) + delta
+
+
+def bump_user_stats(user_id, **deltas):
+    # Счётчики выводятся в профиле - вместе с ними растёт его версия
+    updated = UserStats.objects.filter(user_id=user_id).update(
+        version=F("version") + 1,
+        **{field: _add(field, delta) for field, delta in deltas.items()})
+    # Строки статистики может не быть (пользователь заведён до миграции).
+    # При удалениях её не создаём: удаление может быть каскадом от самого
+    # пользователя, а точные значения восстановит recount_stats.
+    if not updated and all(delta > 0 for delta in deltas.values()):
+        UserStats.objects.update_or_create(
+            user_id=user_id, defaults=exact_user_stats(user_id))
+
+
+def bump_comments_count(post_id, delta):
+    # Число комментариев выводится в карточке поста - сбрасываем её кеш
+    Post.objects.filter(id=post_id).update(
+        comments_count=_add("comments_count", delta),
+        version=F("version") + 1)
+    bump_page_versions(post_id=post_id)
+
+
+def bump_page_versions(author_id=None, group_ids=(), post_id=None,
+                       authors_of_group=None):
+    """Поднимает версии страниц профиля и групп, где выводятся посты
+    автора author_id, групп group_ids или пост post_id, и профилей авторов
+    постов группы authors_of_group."""
+    if post_id is not None:
+        UserStats.objects.filter(user__posts=post_id).update(
+            version=F("version") + 1)
+        Group.objects.filter(posts=post_id).update(version=F("version") + 1)
+    if author_id is not None:
+        UserStats.objects.filter(user_id=author_id).update(
+            version=F("version") + 1)
+    if authors_of_group is not None:
+        UserStats.objects.filter(user__posts__group=authors_of_group).update(
+            version=F("version") + 1)
+    group_ids = {group_id for group_id in group_ids if group_id is not None}
+    if group_ids:
+        Group.objects.filter(id__in=group_ids).update(
+            version=F("version") + 1)
+
+
+def _count(model, field, outer):
+    rows = (model.objects.filter(**{field: OuterRef(outer)})
+            .order_by().values(field)
+            .annotate(total=Count("pk")).values("total"))
+    return Coalesce(Subquery(rows), Value(0))
+
+
+def recount_all():
+    UserStats.objects.bulk_create(
+        (UserStats(user_id=user_id) for user_id
+         in User.objects.filter(stats__isnull=True)
+         .values_list("id", flat=True)),
+        ignore_conflicts=True)
+
+    # Пересчёт мог изменить любую страницу - поднимаем и все версии
+    Post.objects.update(comments_count=_count(Comment, "post", "pk"),
+                        version=F("version") + 1)
+    Group.objects.update(version=F("version") + 1)
+    UserStats.objects.update(
+        version=F("version") + 1,
+        posts_count=_count(Post, "author", "user_id"),
+        followers_count=_count(Follow, "author", "user_id"),
+        following_count=_count(Follow, "user", "user_id"))
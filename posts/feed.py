@@ -0,0 +1,196 @@
+"""Лента подписок, материализованная по подписчикам (fan-out on write).
+
+Новый пост автора сразу раскладывается во «входящие» (FeedItem) каждого
+подписчика, подписка досыпает туда последние посты автора, отписка их
+удаляет. Авторы, у которых подписчиков больше FEED_FANOUT_LIMIT, не
+раскладываются: их посты подмешиваются в ленту при чтении.
+
+Такой автор помечается «звездой» (UserStats.celebrity) и остаётся ею, пока
+подписчиков не станет не больше FEED_REJOIN_LIMIT: автор у порога не
+переключается туда-обратно на каждой подписке. Вернуть его в обычные
+авторы, разложив последние посты по лентам подписчиков, - работа
+recount_stats (rejoin_pending), а не запроса отписки.
+"""
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import FeedItem, Follow, Post, UserStats
+
+
+CELEBRITY_POSTS_KEY = "feed:celebrity-posts"
+
+
+def _celebrities_key():
+    return "feed:celebrities"
+
+
+def _bulk_insert(items):
+    items = iter(items)
+    while True:
+        batch = list(islice(items, settings.FEED_BATCH_SIZE))
+        if not batch:
+            return
+        FeedItem.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def is_celebrity(author_id):
+    stats = (UserStats.objects.filter(user_id=author_id)
+             .values_list("celebrity", "followers_count").first())
+    if stats is None:
+        return False
+    celebrity, followers_count = stats
+    if not celebrity and followers_count > settings.FEED_FANOUT_LIMIT:
+        # Автор только что перешагнул порог
+        mark_celebrities(user_id=author_id)
+        celebrity = True
+    return celebrity
+
+
+def mark_celebrities(**filters):
+    """Помечает «звёздами» авторов, у которых подписчиков больше
+    FEED_FANOUT_LIMIT."""
+    UserStats.objects.filter(
+        celebrity=False, followers_count__gt=settings.FEED_FANOUT_LIMIT,
+        **filters).update(celebrity=True)
+    forget_celebrities()
+
+
+def celebrity_ids():
+    """Авторы, чьи посты не раскладываются по лентам подписчиков."""
+    ids = cache.get(_celebrities_key())
+    if ids is None:
+        ids = set(UserStats.objects.filter(celebrity=True)
+                  .values_list("user_id", flat=True))
+        cache.set(_celebrities_key(), ids, settings.FEED_CELEBRITIES_TTL)
+    return ids
+
+
+def forget_celebrities():
+    """Сбрасывает кешированный список «звёзд» после пересчёта подписчиков."""
+    cache.delete(_celebrities_key())
+
+
+def _followers(author_id):
+    return (Follow.objects.filter(author_id=author_id)
+            .values_list("user_id", flat=True))
+
+
+def _touch_celebrity_posts():
+    # Подписчиков «звезды» слишком много, чтобы трогать каждого: их ленты
+    # учитывают общую отметку изменения постов «звёзд»
+    cache.set(CELEBRITY_POSTS_KEY, timezone.now().timestamp(), None)
+
+
+def touch(user_ids):
+    """Помечает ленты пользователей изменёнными, сбрасывая их кеш."""
+    UserStats.objects.filter(user_id__in=user_ids).update(
+        feed_updated=timezone.now())
+
+
+def fan_out(post):
+    if is_celebrity(post.author_id):
+        _touch_celebrity_posts()
+        return
+
+    followers = _followers(post.author_id)
+    _bulk_insert(FeedItem(user_id=user_id, post_id=post.id,
+                          author_id=post.author_id, pub_date=post.pub_date)
+                 for user_id in followers.iterator())
+    touch(followers)
+
+
+def invalidate(author_id):
+    """Сбрасывает кеш лент подписчиков после правки или удаления поста."""
+    if is_celebrity(author_id):
+        _touch_celebrity_posts()
+    else:
+        touch(_followers(author_id))
+
+
+def backfill(follow):
+    touch([follow.user_id])
+    if is_celebrity(follow.author_id):
+        return
+
+    posts = (Post.objects.filter(author_id=follow.author_id)
+             .order_by("-pub_date")
+             .values_list("id", "pub_date")[:settings.FEED_BACKFILL_SIZE])
+    _bulk_insert(FeedItem(user_id=follow.user_id, post_id=post_id,
+                          author_id=follow.author_id, pub_date=pub_date)
+                 for post_id, pub_date in posts)
+
+
+def prune(follow):
+    FeedItem.objects.filter(user_id=follow.user_id,
+                            author_id=follow.author_id).delete()
+    touch([follow.user_id])
+
+
+def rejoin(author_id):
+    """Возвращает «звезду» в обычные авторы: его посты больше не
+    подмешиваются при чтении, поэтому последние FEED_REJOIN_SIZE из них
+    раскладываются по входящим всех подписчиков."""
+    UserStats.objects.filter(user_id=author_id).update(celebrity=False)
+    forget_celebrities()
+    posts = list(Post.objects.filter(author_id=author_id)
+                 .order_by("-pub_date")
+                 .values_list("id", "pub_date")[:settings.FEED_REJOIN_SIZE])
+    followers = _followers(author_id)
+    _bulk_insert(FeedItem(user_id=user_id, post_id=post_id,
+                          author_id=author_id, pub_date=pub_date)
+                 for user_id in followers.iterator()
+                 for post_id, pub_date in posts)
+    touch(followers)
+
+
+def rejoin_pending():
+    """Возвращает в обычные авторы «звёзд», у которых подписчиков стало не
+    больше FEED_REJOIN_LIMIT, - каждого в своей транзакции."""
+    author_ids = list(UserStats.objects.filter(
+        celebrity=True, followers_count__lte=settings.FEED_REJOIN_LIMIT)
+        .values_list("user_id", flat=True))
+    for author_id in author_ids:
+        with transaction.atomic():
+            rejoin(author_id)
+    return author_ids
+
+
+def followed_celebrities(user):
+    celebrities = celebrity_ids()
+    if not celebrities:
+        return []
+    return list(Follow.objects.filter(user=user, author_id__in=celebrities)
+                .values_list("author_id", flat=True))
+
+
+def feed_version(user):
+    """Версия ленты подписок для ключа кеша: меняется, когда в ленту
+    попадает, меняется или пропадает пост."""
+    updated = (UserStats.objects.filter(user=user)
+               .values_list("feed_updated", flat=True).first())
+    version = updated.timestamp() if updated else 0
+    if followed_celebrities(user):
+        return f"{version}:{cache.get(CELEBRITY_POSTS_KEY, 0)}"
+    return str(version)
+
+
+def follow_feed(user):
+    """Посты ленты подписок пользователя, от новых к старым."""
+    celebrities = followed_celebrities(user)
+    posts = Post.objects.select_related("author", "group")
+    if not celebrities:
+        # Условие курсора - по аннотации: она берёт дату из того же
+        # соединения с FeedItem, отдельный filter() добавил бы второе
+        return (posts.filter(feed_items__user=user)
+                .annotate(feed_date=F("feed_items__pub_date"))
+                .order_by("-feed_date", "-id"))
+
+    inbox = FeedItem.objects.filter(user=user).values("post_id")
+    return (posts.filter(Q(id__in=inbox)
+                         | Q(author_id__in=celebrities))
+            .order_by("-pub_date", "-id"))
@@ -0,0 +1,142 @@
+"""Группа по slug и пользователь по имени - с кешем в два уровня.
+
+С них начинается почти каждая страница, а меняются они редко. Поиск
+сначала смотрит в LRU процесса (LOOKUP_LOCAL_SIZE записей по
+LOOKUP_LOCAL_TTL секунд), затем в общий кеш (LOOKUP_CACHE_TIMEOUT) и только
+потом в базу. Сигналы сохранения и удаления Group и User стирают записи
+в общем кеше и в LRU своего процесса; LRU других процессов отстаёт не
+дольше LOOKUP_LOCAL_TTL.
+
+Хранятся только значения полей из FIELDS, а не объекты: каждый вызов
+получает свой экземпляр, хэш пароля в общий кеш не попадает. Прочие поля
+отложены и при обращении читаются из базы - в том числе Group.version,
+которую поднимают UPDATE-ы без сигналов.
+
+Промах читает основную базу: отстающая реплика вернула бы в кеш старые
+значения. По той же причине записи стираются дважды - при сохранении и
+после фиксации транзакции, до которой другие запросы ещё видят старую
+строку.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, router, transaction
+from django.http import Http404
+
+from .models import Group, User
+
+# Поле поиска и загружаемые поля каждой модели
+FIELDS = {
+    Group: ("slug", ("id", "title", "slug", "description")),
+    User: ("username", ("id", "username", "first_name", "last_name")),
+}
+
+
+class LocalCache:
+    """LRU процесса с временем жизни записей."""
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + settings.LOOKUP_LOCAL_TTL,
+                                  value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.LOOKUP_LOCAL_SIZE:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+local = LocalCache()
+
+
+def _key(model, value):
+    return f"lookup:{model._meta.label_lower}:{value}"
+
+
+def _fields(model):
+    # Порядок concrete_fields: его ожидает Model.from_db для отложенных полей
+    wanted = FIELDS[model][1]
+    return [field.attname for field in model._meta.concrete_fields
+            if field.attname in wanted]
+
+
+def _values(model, value):
+    field, _ = FIELDS[model]
+    return (model._default_manager.using(DEFAULT_DB_ALIAS)
+            .filter(**{field: value})
+            .values_list(*_fields(model)).first())
+
+
+def get_or_404(model, value):
+    if not settings.LOOKUP_CACHE:
+        values = _values(model, value)
+    else:
+        key = _key(model, value)
+        values = local.get(key)
+        if values is None:
+            values = cache.get(key)
+            if values is None:
+                values = _values(model, value)
+                if values is not None:
+                    cache.set(key, values, settings.LOOKUP_CACHE_TIMEOUT)
+            if values is not None:
+                local.set(key, values)
+    if values is None:
+        raise Http404(f"No {model._meta.object_name} matches the query.")
+    return model.from_db(router.db_for_read(model), _fields(model), values)
+
+
+def group_by_slug(slug):
+    return get_or_404(Group, slug)
+
+
+def user_by_username(username):
+    return get_or_404(User, username)
+
+
+def remember(instance):
+    """Запоминает значение поиска загруженного объекта (post_init):
+    после переименования forget сотрёт и запись под старым именем."""
+    field, _ = FIELDS[type(instance)]
+    instance._lookup_value = instance.__dict__.get(field)
+
+
+def forget(instance):
+    field, _ = FIELDS[type(instance)]
+    keys = {_key(type(instance), value)
+            for value in (getattr(instance, "_lookup_value", None),
+                          instance.__dict__.get(field))
+            if value is not None}
+    _delete(keys)
+    transaction.on_commit(lambda: _delete(keys))
+    remember(instance)
+
+
+def _delete(keys):
+    cache.delete_many(list(keys))
+    for key in keys:
+        local.delete(key)
@@ -0,0 +1,166 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count, Q
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+# Составные индексы из миграции 0004 и одиночные индексы по внешним
+# ключам, которые были до неё: «до» = без первых, но со вторыми
+COMPOSITE_INDEXES = (
+    "posts_post_author_date_idx",
+    "posts_post_group_date_idx",
+    "posts_post_date_idx",
+    "posts_comment_post_created_idx",
+)
+LEGACY_INDEXES = (
+    ("bench_post_author_id", "posts_post", "author_id"),
+    ("bench_post_group_id", "posts_post", "group_id"),
+    ("bench_comment_post_id", "posts_comment", "post_id"),
+)
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ("Показывает планы SQLite и время горячих запросов лент "
+            "с составными индексами и без них")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=0,
+                            help="сколько синтетических постов добавить")
+        parser.add_argument("--runs", type=int, default=20)
+        parser.add_argument("--random-seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("Бенчмарк рассчитан на SQLite")
+
+        if options["seed"]:
+            self.seed(options["seed"], options["random_seed"])
+
+        post = (Post.objects.annotate(comments_total=Count("comments"))
+                .order_by("-comments_total").first())
+        if post is None:
+            raise CommandError("В базе нет постов, запустите с --seed N")
+        follow = Follow.objects.first()
+        queries = self.hot_queries(post, follow)
+
+        after = self.measure(queries, options["runs"])
+        before = self.measure_without_indexes(queries, options["runs"])
+        self.report(queries, before, after)
+
+    def measure_without_indexes(self, queries, runs):
+        """Замер на схеме до миграции 0004. DDL в SQLite транзакционен,
+        поэтому индексы возвращаются откатом транзакции."""
+        try:
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    for name in COMPOSITE_INDEXES:
+                        cursor.execute(f'DROP INDEX "{name}"')
+                    for name, table, column in LEGACY_INDEXES:
+                        cursor.execute(
+                            f'CREATE INDEX "{name}" ON "{table}" ("{column}")')
+                    cursor.execute("ANALYZE")
+                before = self.measure(queries, runs)
+                raise Rollback
+        except Rollback:
+            return before
+
+    def report(self, queries, before, after):
+        for name in queries:
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            for label, results in (("до", before), ("после", after)):
+                plan, timing = results[name]
+                self.stdout.write(f"  {label}: {timing * 1000:.3f} мс")
+                for line in plan:
+                    self.stdout.write(f"    {line}")
+
+    def hot_queries(self, post, follow):
+        posts = Post.objects.select_related("author", "group")
+        oldest = Post.objects.order_by("pub_date").first()
+        deep = Q(pub_date__lt=oldest.pub_date + timedelta(days=1))
+        queries = {
+            "index": posts.order_by("-pub_date", "-id")[:11],
+            "index, глубокая страница": (posts.filter(deep)
+                                         .order_by("-pub_date", "-id")[:11]),
+            "profile": (posts.filter(author_id=post.author_id)
+                        .order_by("-pub_date", "-id")[:11]),
+            "group_posts": (posts.filter(group_id=post.group_id)
+                            .order_by("-pub_date", "-id")[:11]),
+            "comments": (Comment.objects.filter(post_id=post.id)
+                         .order_by("created")),
+        }
+        if follow is not None:
+            queries["follow check"] = Follow.objects.filter(
+                user_id=follow.user_id, author_id=follow.author_id)
+            queries["followers"] = Follow.objects.filter(
+                author_id=follow.author_id)
+        return queries
+
+    def measure(self, queries, runs):
+        results = {}
+        with connection.cursor() as cursor:
+            for name, queryset in queries.items():
+                sql, params = queryset.query.sql_with_params()
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+                plan = [row[-1] for row in cursor.fetchall()]
+                timings = []
+                for _ in range(runs):
+                    start = time.perf_counter()
+                    cursor.execute(sql, params)
+                    cursor.fetchall()
+                    timings.append(time.perf_counter() - start)
+                results[name] = (plan, statistics.median(timings))
+        return results
+
+    def seed(self, count, seed):
+        rnd = random.Random(seed)
+        prefix = f"bench_{int(time.time())}_"
+        User.objects.bulk_create(User(username=f"{prefix}{i}")
+                                 for i in range(max(count // 100, 2)))
+        users = list(User.objects.filter(username__startswith=prefix))
+        Group.objects.bulk_create(
+            Group(title=f"{prefix}{i}", slug=f"{prefix}{i}".replace("_", "-"),
+                  description="bench")
+            for i in range(10))
+        groups = list(Group.objects.filter(title__startswith=prefix))
+
+        first_id = (Post.objects.order_by("-id")
+                    .values_list("id", flat=True).first() or 0)
+        for start in range(0, count, 5000):
+            Post.objects.bulk_create(
+                Post(author=rnd.choice(users),
+                     group=rnd.choice(groups + [None]),
+                     text=f"Текст {i}")
+                for i in range(start, min(start + 5000, count)))
+        # auto_now_add проставляет всем постам одно время - разнесём их
+        # по прошлому детерминированно от id
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "UPDATE posts_post SET pub_date = datetime(pub_date, "
+                "'-' || ((id * 7919) %% 1000000) || ' minutes') "
+                "WHERE id > %s", [first_id])
+
+        hot_posts = list(Post.objects.filter(id__gt=first_id)
+                         .values_list("id", flat=True)[:10])
+        Comment.objects.bulk_create(
+            Comment(post_id=rnd.choice(hot_posts), author=rnd.choice(users),
+                    text="Комментарий")
+            for _ in range(count // 10))
+        Follow.objects.bulk_create(
+            (Follow(user=user, author=rnd.choice(users)) for user in users
+             if rnd.random() < 0.9),
+            ignore_conflicts=True)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        self.stdout.write(f"Добавлено постов: {count}")
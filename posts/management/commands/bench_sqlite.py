@@ -0,0 +1,151 @@
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.transactions import is_locked, retry_delays
+from yatube.sqlite import apply_pragmas
+
+SCHEMA = """
+CREATE TABLE post (id INTEGER PRIMARY KEY, author_id INTEGER NOT NULL,
+                   text TEXT NOT NULL, pub_date REAL NOT NULL,
+                   comments_count INTEGER NOT NULL DEFAULT 0);
+CREATE INDEX post_date_idx ON post (pub_date DESC, id DESC);
+CREATE TABLE comment (id INTEGER PRIMARY KEY, post_id INTEGER NOT NULL,
+                      author_id INTEGER NOT NULL, text TEXT NOT NULL,
+                      created REAL NOT NULL);
+CREATE INDEX comment_post_idx ON comment (post_id, created);
+"""
+
+
+class Command(BaseCommand):
+    help = ("Сравнивает пропускную способность SQLite с настройками по "
+            "умолчанию и с PRAGMA из DATABASES при одновременных чтении "
+            "и записи. Работает на временном файле, базу проекта не трогает")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--readers", type=int, default=8)
+        parser.add_argument("--writers", type=int, default=4)
+        parser.add_argument("--seconds", type=float, default=5)
+        parser.add_argument("--posts", type=int, default=10000)
+
+    def handle(self, *args, **options):
+        self.posts = options["posts"]
+        tuned = settings.DATABASES["default"].get(
+            "OPTIONS", {}).get("pragmas", {})
+        profiles = (
+            # Как django.db.backends.sqlite3 без OPTIONS: журнал DELETE,
+            # ожидание блокировки 5 секунд, без повторов
+            ("по умолчанию", {}, False),
+            ("WAL и PRAGMA", tuned, True),
+        )
+        for label, pragmas, retry in profiles:
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, "bench.sqlite3")
+                self.prepare(path, options["posts"])
+                result = self.run(path, pragmas, retry, options)
+            self.report(label, result, options["seconds"])
+
+    def prepare(self, path, posts):
+        rnd = random.Random(1)
+        now = time.time()
+        with sqlite3.connect(path) as conn:
+            conn.executescript(SCHEMA)
+            conn.executemany(
+                "INSERT INTO post (author_id, text, pub_date) "
+                "VALUES (?, ?, ?)",
+                ((rnd.randrange(1000), "x" * rnd.randrange(20, 400),
+                  now - rnd.randrange(10 ** 7)) for _ in range(posts)))
+        conn.close()
+
+    def run(self, path, pragmas, retry, options):
+        deadline = time.perf_counter() + options["seconds"]
+        result = {"reads": [], "writes": [], "errors": 0, "retries": 0}
+        lock = threading.Lock()
+        workers = (
+            [threading.Thread(target=self.worker,
+                              args=(path, pragmas, retry, deadline,
+                                    self.read, "reads", result, lock))
+             for _ in range(options["readers"])]
+            + [threading.Thread(target=self.worker,
+                                args=(path, pragmas, retry, deadline,
+                                      self.write, "writes", result, lock))
+               for _ in range(options["writers"])])
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return result
+
+    def worker(self, path, pragmas, retry, deadline, operation, kind,
+               result, lock):
+        conn = sqlite3.connect(path, isolation_level=None)
+        apply_pragmas(conn, pragmas)
+        rnd = random.Random(threading.get_ident())
+        timings, errors, retries = [], 0, 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            delays = retry_delays() if retry else iter(())
+            while True:
+                try:
+                    operation(conn, rnd)
+                except sqlite3.OperationalError as error:
+                    if conn.in_transaction:
+                        conn.execute("ROLLBACK")
+                    delay = next(delays, None) if is_locked(error) else None
+                    if delay is None:
+                        errors += 1
+                        break
+                    retries += 1
+                    time.sleep(delay)
+                else:
+                    timings.append(time.perf_counter() - start)
+                    break
+        conn.close()
+        with lock:
+            result[kind].extend(timings)
+            result["errors"] += errors
+            result["retries"] += retries
+
+    def read(self, conn, rnd):
+        # Страница главной: последние посты по индексу даты
+        conn.execute("SELECT id, author_id, text, comments_count FROM post "
+                     "ORDER BY pub_date DESC, id DESC LIMIT 10 OFFSET ?",
+                     (rnd.randrange(100) * 10,)).fetchall()
+
+    def write(self, conn, rnd):
+        # Как add_comment: прочитать пост, добавить комментарий и поднять
+        # счётчик в одной транзакции
+        conn.execute("BEGIN")
+        post_id = conn.execute(
+            "SELECT id FROM post ORDER BY pub_date DESC LIMIT 1 OFFSET ?",
+            (rnd.randrange(min(self.posts, 1000)),)).fetchone()[0]
+        conn.execute("INSERT INTO comment (post_id, author_id, text, created)"
+                     " VALUES (?, ?, ?, ?)",
+                     (post_id, rnd.randrange(1000), "комментарий",
+                      time.time()))
+        conn.execute("UPDATE post SET comments_count = comments_count + 1 "
+                     "WHERE id = ?", (post_id,))
+        conn.execute("COMMIT")
+
+    def report(self, label, result, seconds):
+        self.stdout.write(self.style.MIGRATE_HEADING(label))
+        for kind, title in (("reads", "чтений"), ("writes", "записей")):
+            timings = result[kind]
+            if not timings:
+                self.stdout.write(f"  {title}: 0")
+                continue
+            p95 = statistics.quantiles(timings, n=20)[-1] \
+                if len(timings) > 1 else timings[0]
+            self.stdout.write(
+                f"  {title}: {len(timings) / seconds:.0f}/с, "
+                f"медиана {statistics.median(timings) * 1000:.2f} мс, "
+                f"p95 {p95 * 1000:.2f} мс")
+        self.stdout.write(f"  ошибок блокировки: {result['errors']}, "
+                          f"повторов: {result['retries']}")
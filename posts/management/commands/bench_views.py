@@ -0,0 +1,74 @@
+import json
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from posts import benchmarks
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = ("Замеряет все страницы posts и about на базе нескольких "
+            "размеров и сравнивает с прошлым прогоном. Заполняет текущую "
+            "базу синтетикой - запускайте на отдельной базе")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="",
+                            help="размеры базы в постах через запятую; "
+                                 "без них меряется база как есть")
+        parser.add_argument("--repeats", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--output", help="куда записать JSON")
+        parser.add_argument("--compare", help="JSON прошлого прогона")
+        parser.add_argument("--threshold", type=float, default=0.2,
+                            help="допустимый рост медианы, доля")
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options["sizes"].split(",") if size]
+        results = {}
+        for size in sizes or [None]:
+            if size is not None:
+                self.grow(size, options["seed"])
+            label = str(Post.objects.count())
+            try:
+                results[label] = benchmarks.run(options["repeats"])
+            except ValueError as error:
+                raise CommandError(str(error))
+            self.report(label, results[label])
+
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump({"created": timezone.now().isoformat(),
+                           "repeats": options["repeats"],
+                           "results": results},
+                          output, ensure_ascii=False, indent=2)
+
+        if options["compare"]:
+            with open(options["compare"]) as baseline:
+                previous = json.load(baseline)["results"]
+            regressions = benchmarks.compare(results, previous,
+                                             options["threshold"])
+            if regressions:
+                raise CommandError("Регрессии:\n" + "\n".join(regressions))
+            self.stdout.write(self.style.SUCCESS("Регрессий нет"))
+
+    def grow(self, size, seed):
+        """Досеивает базу до size постов теми же пропорциями, что в
+        seed_yatube по умолчанию."""
+        missing = size - Post.objects.count()
+        if missing <= 0:
+            return
+        call_command("seed_yatube", posts=missing,
+                     users=max(missing // 10, 10), groups=10,
+                     comments=missing * 2, follows=missing * 2,
+                     seed=seed, prefix=f"bench{size}_", stdout=StringIO())
+
+    def report(self, label, results):
+        self.stdout.write(self.style.MIGRATE_HEADING(f"Постов: {label}"))
+        for key, result in results.items():
+            self.stdout.write(
+                f"  {key}: p50 {result['p50']} мс, p99 {result['p99']} мс, "
+                f"запросов {result['queries']}, {result['bytes']} Б, "
+                f"{result['status']}")
@@ -0,0 +1,48 @@
+import os
+from multiprocessing import Pool
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts.models import Post
+from posts.thumbnails import ready_variants, render_variants, save_variants
+
+
+class Command(BaseCommand):
+    help = ("Создаёт недостающие варианты картинок постов "
+            "параллельно на всех ядрах")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=os.cpu_count(),
+                            help="сколько процессов запустить")
+
+    def handle(self, *args, **options):
+        posts = (Post.objects.exclude(image="").exclude(image=None)
+                 .only("image", "image_variants"))
+        missing = {}
+        for post in posts.iterator():
+            if ready_variants(post) is None:
+                missing.setdefault(post.image.name, []).append(post.id)
+        if not missing:
+            self.stdout.write("Все варианты картинок уже созданы")
+            return
+
+        processes = max(1, min(options["processes"], len(missing)))
+        if processes == 1:
+            manifests = map(render_variants, missing)
+            self.save(manifests, missing)
+        else:
+            # Дочерние процессы только работают с файлами, в БД пишет
+            # родитель; соединения не должны наследоваться через fork
+            connections.close_all()
+            with Pool(processes) as pool:
+                self.save(pool.imap_unordered(render_variants, missing,
+                                              chunksize=8), missing)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Варианты созданы для картинок: {len(missing)}"))
+
+    def save(self, manifests, missing):
+        for manifest in manifests:
+            for post_id in missing[manifest["source"]]:
+                save_variants(post_id, manifest)
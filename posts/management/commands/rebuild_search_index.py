@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = "Перестраивает полнотекстовый индекс постов и его триггеры"
+
+    def handle(self, *args, **options):
+        if not search.is_supported():
+            raise CommandError("Полнотекстовый индекс есть только на SQLite")
+        if not search.ensure_triggers():
+            search.rebuild()
+        self.stdout.write(self.style.SUCCESS("Поисковый индекс перестроен"))
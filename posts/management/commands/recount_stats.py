@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import feed
+from posts.counters import recount_all
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает счётчики комментариев, записей и подписок"
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            recount_all()
+            feed.mark_celebrities()
+        self.stdout.write(self.style.SUCCESS("Счётчики пересчитаны"))
+        # Кто после пересчёта опустился под порог, получает ленты
+        # подписчиков обратно
+        rejoined = feed.rejoin_pending()
+        if rejoined:
+            self.stdout.write(f"Возвращены в ленты подписчиков: "
+                              f"{len(rejoined)}")
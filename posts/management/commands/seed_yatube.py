@@ -0,0 +1,241 @@
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from io import BytesIO
+from itertools import accumulate, islice
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count, Max, Min
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from PIL import Image, ImageDraw
+
+from posts import feed
+from posts.counters import recount_all
+from posts.models import Comment, Follow, Group, MediaBlob, Post
+
+User = get_user_model()
+
+WORDS = (
+    "сегодня вчера утром вечером город лес река море кот собака книга "
+    "кофе чай дождь солнце снег друзья работа отпуск поезд дорога музыка "
+    "фильм ужин завтрак прогулка парк новости идея проект код тест "
+    "красиво странно весело грустно быстро медленно наконец опять"
+).split()
+
+# Даты раскладываются назад от этого момента, а не от текущего времени:
+# один и тот же --seed даёт одни и те же даты в любой день
+DEFAULT_NOW = "2020-01-01T00:00:00+00:00"
+
+
+@contextmanager
+def explicit_dates(*fields):
+    """Даёт bulk_create записать свои даты в поля с auto_now_add."""
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = ("Заполняет базу синтетическими пользователями, группами, "
+            "постами, комментариями и подписками для нагрузочных проверок")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--groups", type=int, default=20)
+        parser.add_argument("--posts", type=int, default=10000)
+        parser.add_argument("--comments", type=int, default=20000)
+        parser.add_argument("--follows", type=int, default=20000)
+        parser.add_argument("--images", type=int, default=0,
+                            help="сколько разных картинок сгенерировать")
+        parser.add_argument("--image-ratio", type=float, default=0.1,
+                            help="доля постов с картинкой")
+        parser.add_argument("--power", type=float, default=1.2,
+                            help="показатель степенного закона подписчиков")
+        parser.add_argument("--days", type=int, default=365,
+                            help="за сколько дней разнести даты")
+        parser.add_argument("--now", default=DEFAULT_NOW,
+                            help="самая поздняя дата, ISO 8601")
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--prefix", default="seed")
+
+    def handle(self, *args, **options):
+        self.rnd = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        self.now = parse_datetime(options["now"])
+        if self.now is None:
+            raise CommandError(f"--now: ожидается дата ISO 8601, "
+                               f"получено {options['now']!r}")
+        if timezone.is_naive(self.now):
+            self.now = timezone.make_aware(self.now, timezone.utc)
+        self.seconds = options["days"] * 24 * 60 * 60
+        prefix = f"{options['prefix']}{options['seed']}_"
+        if User.objects.filter(username__startswith=prefix).exists():
+            raise CommandError(f"Данные с префиксом {prefix} уже есть, "
+                               "задайте другой --prefix или --seed")
+
+        if connection.vendor == "sqlite" and not connection.in_atomic_block:
+            # Данные синтетические: при сбое их проще залить заново, чем
+            # ждать fsync на каждой транзакции
+            with connection.cursor() as cursor:
+                cursor.execute("PRAGMA synchronous = OFF")
+
+        users = self.create_users(prefix, options["users"])
+        groups = self.create_groups(prefix, options["groups"])
+        images = self.create_images(options["images"])
+        posts = self.create_posts(options["posts"], users, groups, images,
+                                  options["image_ratio"])
+        self.create_comments(options["comments"], users, posts)
+        follows_before = self.create_follows(options["follows"], users,
+                                             options["power"])
+        self.finish(follows_before, images)
+
+    def bulk(self, model, objects, label, **kwargs):
+        created = 0
+        objects = iter(objects)
+        while True:
+            batch = list(islice(objects, self.batch_size))
+            if not batch:
+                break
+            with transaction.atomic():
+                model.objects.bulk_create(batch, **kwargs)
+            created += len(batch)
+        self.stdout.write(f"{label}: {created}")
+
+    def last_id(self, model):
+        return model.objects.aggregate(last=Max("id"))["last"] or 0
+
+    def new_ids(self, model, before):
+        # Пакеты вставляются подряд, поэтому новые id идут одним отрезком
+        bounds = model.objects.filter(id__gt=before).aggregate(
+            first=Min("id"), last=Max("id"))
+        if bounds["first"] is None:
+            return range(0)
+        return range(bounds["first"], bounds["last"] + 1)
+
+    def moment(self):
+        return self.now - timedelta(seconds=self.rnd.randrange(self.seconds))
+
+    def text(self, low, high):
+        words = self.rnd.choices(WORDS, k=self.rnd.randint(low, high))
+        return " ".join(words).capitalize()
+
+    def create_users(self, prefix, count):
+        # "!" - заведомо непригодный пароль: хешировать его не нужно
+        self.bulk(User, (User(username=f"{prefix}{i}", password="!")
+                         for i in range(count)), "Пользователей")
+        return list(User.objects.filter(username__startswith=prefix)
+                    .order_by("id").values_list("id", flat=True))
+
+    def create_groups(self, prefix, count):
+        self.bulk(Group, (Group(title=f"Группа {prefix}{i}",
+                                slug=f"{prefix}{i}".replace("_", "-"),
+                                description=self.text(5, 20))
+                          for i in range(count)), "Групп")
+        return list(Group.objects.filter(title__startswith=f"Группа {prefix}")
+                    .values_list("id", flat=True))
+
+    def create_images(self, count):
+        storage = Post._meta.get_field("image").storage
+        names = []
+        for _ in range(count):
+            color = tuple(self.rnd.randrange(256) for _ in range(3))
+            image = Image.new("RGB", (1200, 800), color)
+            draw = ImageDraw.Draw(image)
+            for _ in range(8):
+                box = sorted(self.rnd.sample(range(1200), 2))
+                box += sorted(self.rnd.sample(range(800), 2))
+                draw.ellipse((box[0], box[2], box[1], box[3]),
+                             fill=tuple(self.rnd.randrange(256)
+                                        for _ in range(3)))
+            content = BytesIO()
+            image.save(content, "JPEG", quality=85)
+            names.append(storage.save("posts/seed.jpg",
+                                      ContentFile(content.getvalue())))
+        if names:
+            self.stdout.write(f"Картинок: {len(names)}")
+        return names
+
+    def create_posts(self, count, users, groups, images, image_ratio):
+        before = self.last_id(Post)
+        group_choices = groups + [None]
+
+        def posts():
+            for _ in range(count):
+                has_image = images and self.rnd.random() < image_ratio
+                yield Post(author_id=self.rnd.choice(users),
+                           group_id=self.rnd.choice(group_choices),
+                           text=self.text(5, 60),
+                           pub_date=self.moment(),
+                           image=(self.rnd.choice(images) if has_image
+                                  else None))
+
+        with explicit_dates(Post._meta.get_field("pub_date")):
+            self.bulk(Post, posts(), "Постов")
+        return self.new_ids(Post, before)
+
+    def create_comments(self, count, users, posts):
+        if not posts:
+            return
+        comments = (Comment(post_id=self.rnd.choice(posts),
+                            author_id=self.rnd.choice(users),
+                            text=self.text(2, 20),
+                            created=self.moment())
+                    for _ in range(count))
+        with explicit_dates(Comment._meta.get_field("created")):
+            self.bulk(Comment, comments, "Комментариев")
+
+    def create_follows(self, count, users, power):
+        """Подписки, где число подписчиков автора убывает по степенному
+        закону от его места в случайном рейтинге."""
+        before = self.last_id(Follow)
+        authors = users[:]
+        self.rnd.shuffle(authors)
+        weights = list(accumulate(1 / (rank + 1) ** power
+                                  for rank in range(len(authors))))
+
+        def follows():
+            for _ in range(count):
+                user_id = self.rnd.choice(users)
+                author_id = self.rnd.choices(authors, cum_weights=weights)[0]
+                if user_id != author_id:
+                    yield Follow(user_id=user_id, author_id=author_id)
+
+        if len(users) > 1:
+            self.bulk(Follow, follows(), "Подписок (до удаления повторов)",
+                      ignore_conflicts=True)
+        return before
+
+    def finish(self, follows_before, images):
+        """bulk_create не вызывает сигналы: досчитываем счётчики, входящие
+        ленты и ссылки на картинки сами."""
+        with transaction.atomic():
+            recount_all()
+            feed.mark_celebrities()
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "INSERT INTO posts_feeditem "
+                    "(user_id, post_id, author_id, pub_date) "
+                    "SELECT f.user_id, p.id, p.author_id, p.pub_date "
+                    "FROM posts_follow f "
+                    "JOIN posts_userstats s ON s.user_id = f.author_id "
+                    "JOIN posts_post p ON p.author_id = f.author_id "
+                    "WHERE f.id > %s AND NOT s.celebrity",
+                    [follows_before])
+            refs = (Post.objects.filter(image__in=images).order_by()
+                    .values_list("image").annotate(refs=Count("id")))
+            for name, count in refs:
+                MediaBlob.objects.update_or_create(
+                    name=name, defaults={"refs": count})
+        if connection.vendor == "sqlite":
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+        self.stdout.write(self.style.SUCCESS("Готово"))
@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from yatube import slow_queries
+
+SORT_KEYS = ("total_ms", "count", "max_ms", "avg_ms")
+
+
+class Command(BaseCommand):
+    help = ("Печатает самые тяжёлые формы SQL-запросов из журнала "
+            "медленных запросов")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--log", default=None,
+                            help="журнал; по умолчанию SLOW_QUERY_LOG")
+        parser.add_argument("--top", type=int, default=10)
+        parser.add_argument("--sort", choices=SORT_KEYS, default="total_ms")
+        parser.add_argument("--view", help="только запросы этого URL")
+
+    def handle(self, *args, **options):
+        path = options["log"] or settings.SLOW_QUERY_LOG
+        try:
+            entries = list(slow_queries.read(path))
+        except FileNotFoundError:
+            raise CommandError(f"Журнала {path} нет")
+        if options["view"]:
+            entries = [entry for entry in entries
+                       if entry.get("view") == options["view"]]
+
+        groups = slow_queries.aggregate(entries)
+        groups.sort(key=lambda group: group[options["sort"]], reverse=True)
+        if not groups:
+            self.stdout.write("Медленных запросов нет")
+        for group in groups[:options["top"]]:
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"{group['fingerprint']}  {group['count']} раз, "
+                f"всего {group['total_ms']:.1f} мс, "
+                f"в среднем {group['avg_ms']:.1f} мс, "
+                f"худший {group['max_ms']:.1f} мс"))
+            if group["views"]:
+                self.stdout.write("  URL: " + ", ".join(group["views"]))
+            self.stdout.write("  " + group["sql"])
+            for line in group["plan"] or ():
+                self.stdout.write("    " + line)
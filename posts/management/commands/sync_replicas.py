@@ -0,0 +1,52 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from yatube.routers import PRIMARY
+
+
+class Command(BaseCommand):
+    help = ("Копирует основную базу SQLite в файлы реплик из "
+            "DATABASE_REPLICAS онлайн-бэкапом, однократно или по кругу")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", type=float, default=0,
+                            help="повторять каждые столько секунд")
+        parser.add_argument("--to", action="append", default=[],
+                            help="файл вместо реплик из настроек")
+
+    def handle(self, *args, **options):
+        primary = connections[PRIMARY]
+        if primary.vendor != "sqlite":
+            raise CommandError("Копирование рассчитано на SQLite")
+        if primary.in_atomic_block:
+            # Бэкап ждал бы конца собственной транзакции записи
+            raise CommandError("Нельзя копировать базу внутри транзакции")
+        targets = options["to"] or [
+            connections[alias].settings_dict["NAME"]
+            for alias in settings.DATABASE_REPLICAS]
+        if not targets:
+            raise CommandError("Реплики не настроены: DATABASE_REPLICAS пуст")
+
+        while True:
+            for path in targets:
+                started = time.perf_counter()
+                self.copy(primary, path)
+                self.stdout.write(f"{path}: "
+                                  f"{time.perf_counter() - started:.2f} с")
+            if not options["interval"]:
+                break
+            time.sleep(options["interval"])
+
+    def copy(self, primary, path):
+        """Копия поверх файла реплики, а не подмена файла: открытые
+        соединения реплики увидят новые данные, а не удалённый файл."""
+        primary.ensure_connection()
+        target = sqlite3.connect(path)
+        try:
+            primary.connection.backup(target)
+        finally:
+            target.close()
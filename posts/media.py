@@ -0,0 +1,60 @@
+"""Подсчёт ссылок на файлы картинок и удаление файлов без ссылок.
+
+Хранилище картинок адресуется по содержимому (posts.storage), поэтому
+один файл может принадлежать нескольким постам. Ссылки считает MediaBlob:
+сохранение поста с новой картинкой берёт ссылку на неё и отпускает
+прежнюю, удаление поста отпускает свою. Файл, на который не осталось
+ссылок, удаляется вместе с вариантами после фиксации транзакции.
+"""
+from functools import partial
+
+from django.db import transaction
+from django.db.models import F
+
+from . import thumbnails
+from .models import MediaBlob, Post
+from .storage import name_digest
+
+
+def acquire(name):
+    blob, created = MediaBlob.objects.get_or_create(name=name,
+                                                    defaults={"refs": 1})
+    if not created:
+        MediaBlob.objects.filter(id=blob.id).update(refs=F("refs") + 1)
+
+
+def release(name):
+    MediaBlob.objects.filter(name=name, refs__gt=0).update(
+        refs=F("refs") - 1)
+    deleted, _ = MediaBlob.objects.filter(name=name, refs=0).delete()
+    if deleted:
+        transaction.on_commit(partial(delete_files, name))
+
+
+def delete_files(name):
+    # Пока транзакция фиксировалась, тот же файл могли загрузить снова
+    if MediaBlob.objects.filter(name=name).exists():
+        return
+    storage = Post._meta.get_field("image").storage
+    if not storage.exists(name):
+        return
+    digest = thumbnails.file_digest(name, storage)
+    storage.delete(name)
+    # Имя из содержимого - единственное для него, и раз на MediaBlob не
+    # осталось ссылок, варианты никому не нужны. Варианты файла под
+    # прежним именем могут быть общими с копией того же содержимого
+    if (name_digest(name) is None
+            and Post.objects.filter(image_variants__contains=digest)
+            .exists()):
+        return
+    for variant in thumbnails.variant_names(digest):
+        storage.delete(variant)
+
+
+def replace(old_name, new_name):
+    if old_name == new_name:
+        return
+    if new_name:
+        acquire(new_name)
+    if old_name:
+        release(old_name)
@@ -0,0 +1,57 @@
+# Generated by Django 2.2.6 on 2026-10-16 23:57
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedItem',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pub_date', models.DateTimeField(verbose_name='Дата публикации')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_items', to='posts.Post', verbose_name='Пост')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_items', to=settings.AUTH_USER_MODEL, verbose_name='Подписчик')),
+            ],
+            options={
+                'verbose_name': 'Запись ленты',
+                'verbose_name_plural': 'Записи ленты',
+                'ordering': ['-pub_date'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='feeditem',
+            index=models.Index(fields=['user', '-pub_date'], name='posts_feed_user_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='feeditem',
+            constraint=models.UniqueConstraint(fields=('user', 'post'), name='%(app_label)s_%(class)s_unique_item'),
+        ),
+        # Как при подписке (posts.feed.backfill): последние
+        # FEED_BACKFILL_SIZE постов авторов, у которых подписчиков не больше
+        # FEED_FANOUT_LIMIT
+        migrations.RunSQL(
+            sql=[("""
+                INSERT INTO posts_feeditem (user_id, post_id, author_id, pub_date)
+                SELECT f.user_id, p.id, p.author_id, p.pub_date
+                FROM posts_follow f
+                JOIN (SELECT id, author_id, pub_date,
+                             ROW_NUMBER() OVER (PARTITION BY author_id
+                                                ORDER BY pub_date DESC) AS n
+                      FROM posts_post) p ON p.author_id = f.author_id
+                WHERE p.n <= %s AND f.author_id IN (
+                    SELECT author_id FROM posts_follow
+                    GROUP BY author_id HAVING COUNT(*) <= %s)
+            """, [settings.FEED_BACKFILL_SIZE, settings.FEED_FANOUT_LIMIT])],
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 2.2.6 on 2026-10-17 00:05
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0004_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userstats',
+            name='feed_updated',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Лента обновлена'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 2.2.6 on 2026-10-17 01:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_page_versions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userstats',
+            name='celebrity',
+            field=models.BooleanField(db_index=True, default=False, editable=False, verbose_name='Звезда'),
+        ),
+        migrations.RunSQL(
+            sql=[("UPDATE posts_userstats SET celebrity = 1 "
+                  "WHERE followers_count > %s", [settings.FEED_FANOUT_LIMIT])],
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -1,5 +1,8 @@
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from .storage import post_images
 
 User = get_user_model()
 
@@ -8,6 +11,9 @@ class Group(models.Model):
     title = models.CharField("Название", max_length=200)
     slug = models.SlugField("Адрес", unique=True)
     description = models.TextField("Описание")
+    # Растёт при любом изменении, видимом на странице группы: её ETag
+    version = models.PositiveIntegerField("Версия", default=1,
+                                          editable=False)
 
     class Meta:
         verbose_name = "Группа"
@@ -20,21 +26,44 @@ class Group(models.Model):
 class Post(models.Model):
     text = models.TextField("Текст", help_text="Напишите текст")
     pub_date = models.DateTimeField("Дата публикации", auto_now_add=True)
+    # Одиночные индексы по author и group не нужны: их покрывают
+    # составные индексы из Meta.indexes
     author = models.ForeignKey(User, on_delete=models.CASCADE,
-                               related_name="posts", verbose_name="Автор")
+                               related_name="posts", verbose_name="Автор",
+                               db_index=False)
     group = models.ForeignKey(Group, on_delete=models.SET_NULL,
                               related_name="posts", verbose_name="Группа",
                               help_text="Выберите группу",
-                              blank=True, null=True)
-    image = models.ImageField(upload_to="posts/", verbose_name="Изображение",
+                              blank=True, null=True, db_index=False)
+    image = models.ImageField(upload_to="posts/", storage=post_images,
+                              verbose_name="Изображение",
                               help_text="Загрузите изображение",
                               blank=True, null=True)
+    comments_count = models.PositiveIntegerField("Комментариев", default=0,
+                                                 editable=False)
+    # Манифест JSON с вариантами картинки (posts.thumbnails)
+    image_variants = models.TextField("Варианты изображения", blank=True,
+                                      editable=False)
+    # Растёт при любом изменении, видимом в карточке поста: ключ её кеша
+    version = models.PositiveIntegerField("Версия", default=1,
+                                          editable=False)
 
     class Meta:
         ordering = ["-pub_date"]
         verbose_name = "Пост"
         verbose_name_plural = "Посты"
 
+        # Ленты фильтруются по автору или группе и листаются по ключу
+        # (pub_date, id) от новых к старым
+        indexes = [
+            models.Index(fields=["author", "-pub_date", "-id"],
+                         name="posts_post_author_date_idx"),
+            models.Index(fields=["group", "-pub_date", "-id"],
+                         name="posts_post_group_date_idx"),
+            models.Index(fields=["-pub_date", "-id"],
+                         name="posts_post_date_idx"),
+        ]
+
     def __str__(self):
         return self.text[:15]
 
@@ -42,7 +71,7 @@ class Post(models.Model):
 class Comment(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE,
                              related_name="comments",
-                             verbose_name="Пост", )
+                             verbose_name="Пост", db_index=False)
     author = models.ForeignKey(User, on_delete=models.CASCADE,
                                related_name="comments", verbose_name="Автор")
     text = models.TextField("Текст", help_text='Напишите текст')
@@ -52,6 +81,9 @@ class Comment(models.Model):
         verbose_name = "Комментарий"
         verbose_name_plural = "Комментарии"
 
+        indexes = [models.Index(fields=["post", "created"],
+                                name="posts_comment_post_created_idx")]
+
     def __str__(self):
         return self.text[:15]
 
@@ -71,3 +103,77 @@ class Follow(models.Model):
         constraints = [models.UniqueConstraint(
             fields=['user', 'author'],
             name='%(app_label)s_%(class)s_unique_follow')]
+
+
+class UserStats(models.Model):
+    """Счётчики пользователя, которые поддерживаются при записи,
+    чтобы карточка профиля не считала COUNT(*) на каждый просмотр."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE,
+                                related_name="stats",
+                                verbose_name="Пользователь", )
+    posts_count = models.PositiveIntegerField("Записей", default=0)
+    followers_count = models.PositiveIntegerField("Подписчиков", default=0,
+                                                  db_index=True)
+    following_count = models.PositiveIntegerField("Подписок", default=0)
+    # Посты не раскладываются по лентам подписчиков (posts.feed)
+    celebrity = models.BooleanField("Звезда", default=False, db_index=True,
+                                    editable=False)
+    # Время последнего изменения ленты подписок - входит в ключ её кеша
+    feed_updated = models.DateTimeField("Лента обновлена",
+                                        default=timezone.now)
+    # Растёт при любом изменении, видимом на странице профиля: её ETag
+    version = models.PositiveIntegerField("Версия", default=1,
+                                          editable=False)
+
+    class Meta:
+        verbose_name = "Статистика пользователя"
+        verbose_name_plural = "Статистика пользователей"
+
+    def __str__(self):
+        return str(self.user)
+
+
+class FeedItem(models.Model):
+    """Запись во «входящих» подписчика: пост автора, на которого он подписан.
+
+    Заполняется при публикации (fan-out on write), поэтому лента подписок
+    читается готовым отсортированным срезом по индексу (user, -pub_date).
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE,
+                             related_name="feed_items",
+                             verbose_name="Подписчик", )
+    post = models.ForeignKey(Post, on_delete=models.CASCADE,
+                             related_name="feed_items",
+                             verbose_name="Пост", )
+    author = models.ForeignKey(User, on_delete=models.CASCADE,
+                               related_name="+",
+                               verbose_name="Автор", )
+    pub_date = models.DateTimeField("Дата публикации")
+
+    class Meta:
+        ordering = ["-pub_date"]
+        verbose_name = "Запись ленты"
+        verbose_name_plural = "Записи ленты"
+
+        indexes = [models.Index(fields=["user", "-pub_date"],
+                                name="posts_feed_user_date_idx")]
+        constraints = [models.UniqueConstraint(
+            fields=['user', 'post'],
+            name='%(app_label)s_%(class)s_unique_item')]
+
+
+class MediaBlob(models.Model):
+    """Файл картинки в хранилище по содержимому и число ссылок на него.
+
+    Одинаковые загрузки ссылаются на одну копию; когда ссылок не остаётся,
+    файл и его варианты удаляются.
+    """
+    name = models.CharField("Файл", max_length=255, unique=True)
+    refs = models.PositiveIntegerField("Ссылок", default=0)
+
+    class Meta:
+        verbose_name = "Файл картинки"
+        verbose_name_plural = "Файлы картинок"
+
+    def __str__(self):
+        return self.name
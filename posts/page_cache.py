@@ -0,0 +1,87 @@
+"""Кеш страниц лент с отдачей устаревшей копии (stale-while-revalidate).
+
+Запись хранит HTML вместе с моментом, до которого он свежий, и живёт в
+кеше дольше на PAGE_CACHE_GRACE секунд. Пересчитывает страницу только тот,
+кто первым взял блокировку - ключ, записанный через cache.add. Бэкенд
+общего кеша (yatube.sqlite.cache) выполняет add одной командой SQL, так
+что блокировку получает ровно один процесс. Пока он считает, остальные
+получают устаревшую копию, а если копии нет совсем (холодный старт, конец
+PAGE_CACHE_GRACE) - до PAGE_CACHE_WAIT секунд ждут его результата. Так ни
+истечение записи, ни её отсутствие не приводят к одновременному запросу
+страницы всеми процессами.
+
+Счётчики hit/miss/stale/wait ведутся в пределах процесса.
+"""
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+
+# Пауза между проверками кеша в ожидании чужого пересчёта
+WAIT_STEP = 0.05
+
+_stats = Counter()
+
+
+def make_key(name, vary_on=()):
+    return make_template_fragment_key(f"stale:{name}", vary_on)
+
+
+def stats():
+    return {outcome: _stats[outcome]
+            for outcome in ("hit", "miss", "stale", "wait")}
+
+
+def reset_stats():
+    _stats.clear()
+
+
+def _store(key, value, timeout):
+    cache.set(key, (time.time() + timeout, value),
+              timeout + settings.PAGE_CACHE_GRACE)
+
+
+def _wait(key):
+    """Запись, которую положит владелец блокировки, или None, если он не
+    успел за PAGE_CACHE_WAIT секунд."""
+    deadline = time.monotonic() + settings.PAGE_CACHE_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(WAIT_STEP)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+    return None
+
+
+def get_or_set(key, compute, timeout=None):
+    """Значение из кеша, при необходимости пересчитанное через compute()."""
+    if timeout is None:
+        timeout = settings.PAGE_CACHE_TIMEOUT
+    entry = cache.get(key)
+    if entry is not None:
+        fresh_until, value = entry
+        if time.time() < fresh_until:
+            _stats["hit"] += 1
+            return value
+
+    lock = f"{key}:lock"
+    locked = cache.add(lock, 1, settings.PAGE_CACHE_LOCK_TIMEOUT)
+    if not locked:
+        if entry is not None:
+            _stats["stale"] += 1
+            return entry[1]
+        entry = _wait(key)
+        if entry is not None:
+            _stats["wait"] += 1
+            return entry[1]
+        # Владелец блокировки завис или упал: считаем сами
+    try:
+        _stats["miss"] += 1
+        value = compute()
+        _store(key, value, timeout)
+    finally:
+        if locked:
+            cache.delete(lock)
+    return value
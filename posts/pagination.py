@@ -0,0 +1,296 @@
+"""Постраничная навигация по ключу (keyset/cursor pagination).
+
+Вместо OFFSET N и COUNT(*) следующая страница выбирается условием
+«строго после последней записи предыдущей» по ключу сортировки, например
+(pub_date, id), поэтому любая страница стоит столько же, сколько первая.
+Старые ссылки вида ?page=N продолжают работать для первых
+PAGINATE_OFFSET_PAGES страниц.
+
+Общее число записей paginator не считает сам: view передаёт его готовым
+(счётчик UserStats) или функцией, результат которой кешируется
+(cached_count). Функция вызывается, только если шаблон выводит число.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+from math import ceil
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.http import QueryDict
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+INT64_MAX = 2 ** 63 - 1
+
+
+def _in_int64(number):
+    return -INT64_MAX - 1 <= number <= INT64_MAX
+
+
+def encode_cursor(values):
+    raw = json.dumps([value.isoformat() if isinstance(value, datetime)
+                      else value for value in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Разбирает курсор; для испорченного курсора возвращает None."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, ValueError, UnicodeDecodeError):
+        return None
+    if not isinstance(values, list):
+        return None
+    # Числа вне 64-битного диапазона SQLite не принимает (OverflowError
+    # при выполнении запроса), JSON пропускает и Infinity/NaN
+    if any(isinstance(value, (int, float)) and not _in_int64(value)
+           for value in values):
+        return None
+    return [parse_datetime(value) or value if isinstance(value, str)
+            else value for value in values]
+
+
+class CursorPage(Page):
+    """Страница, которая выбирает записи только при первом обращении:
+    если фрагмент с ней взят из кеша, запрос к БД не выполняется."""
+
+    def __init__(self, paginator, load, number=None, key=None):
+        self.paginator = paginator
+        self.number = number
+        # Ключ страницы для кеша фрагментов: page:N, after:... или before:...
+        self.key = key or f"page:{number}"
+        self._load = load
+        self._result = None
+
+    def __repr__(self):
+        return f"<Page {self.key}>"
+
+    def _fetch(self):
+        if self._result is None:
+            self._result = self._load()
+        return self._result
+
+    @property
+    def object_list(self):
+        return self._fetch()[0]
+
+    def has_next(self):
+        return self._fetch()[1]
+
+    def has_previous(self):
+        return self._fetch()[2]
+
+    def next_page_number(self):
+        return self.number + 1 if self.number else None
+
+    def previous_page_number(self):
+        return self.number - 1 if self.number else None
+
+    @property
+    def next_cursor(self):
+        return self.paginator.cursor_for(self.object_list[-1])
+
+    @property
+    def previous_cursor(self):
+        return self.paginator.cursor_for(self.object_list[0])
+
+    @property
+    def next_query(self):
+        return self.paginator.query_string(after=self.next_cursor)
+
+    @property
+    def previous_query(self):
+        if self.number and self.number > 1:
+            return self.paginator.query_string(
+                page=self.previous_page_number())
+        return self.paginator.query_string(before=self.previous_cursor)
+
+    @property
+    def first_query(self):
+        return self.paginator.query_string()
+
+    @cached_property
+    def window(self):
+        """Ссылки на номера страниц не дальше PAGINATE_WINDOW от текущей.
+
+        По номеру открываются только первые PAGINATE_OFFSET_PAGES страниц;
+        если число записей неизвестно, дальше следующей страницы ссылок нет.
+        """
+        if not self.number:
+            return []
+        last = settings.PAGINATE_OFFSET_PAGES
+        if self.paginator.num_pages is not None:
+            last = min(last, self.paginator.num_pages)
+        elif self.has_next():
+            last = min(last, self.number + 1)
+        else:
+            last = self.number
+        last = max(last, self.number)
+        first = max(1, self.number - settings.PAGINATE_WINDOW)
+        last = min(last, self.number + settings.PAGINATE_WINDOW)
+        return [{"number": number,
+                 "current": number == self.number,
+                 "query": self.paginator.query_string(page=number)}
+                for number in range(first, last + 1)]
+
+
+class CursorPaginator(Paginator):
+    """Paginator, листающий queryset по ключу сортировки ordering.
+
+    ordering - поля сортировки в формате order_by(), последнее поле должно
+    быть уникальным (обычно id). Значение курсора берётся из атрибута
+    объекта с именем последней части пути поля.
+    """
+
+    def __init__(self, object_list, per_page,
+                 ordering=("-pub_date", "-id"), params=None, count=None):
+        super().__init__(object_list.order_by(*ordering), per_page)
+        self.ordering = ordering
+        self._count = count
+        self.params = (params.copy() if params is not None
+                       else QueryDict(mutable=True))
+        for name in ("page", "after", "before"):
+            self.params.pop(name, None)
+
+    @cached_property
+    def count(self):
+        """Число записей, переданное view, или None: COUNT(*) здесь не
+        выполняется."""
+        return self._count() if callable(self._count) else self._count
+
+    @cached_property
+    def num_pages(self):
+        if self.count is None:
+            return None
+        return max(1, ceil(self.count / self.per_page))
+
+    def cursor_for(self, obj):
+        return encode_cursor([getattr(obj, field.lstrip("-").split("__")[-1])
+                              for field in self.ordering])
+
+    def query_string(self, **params):
+        query = self.params.copy()
+        for key, value in params.items():
+            query[key] = value
+        return query.urlencode()
+
+    def _keyset_filter(self, values, after):
+        condition = Q()
+        for position, field in enumerate(self.ordering):
+            name = field.lstrip("-")
+            descending = field.startswith("-")
+            lookup = "lt" if descending == after else "gt"
+            step = Q(**{f"{name}__{lookup}": values[position]})
+            for previous, value in zip(self.ordering[:position], values):
+                step &= Q(**{previous.lstrip("-"): value})
+            condition |= step
+        return condition
+
+    def _reversed_ordering(self):
+        return [field[1:] if field.startswith("-") else f"-{field}"
+                for field in self.ordering]
+
+    def offset_page(self, number):
+        number = min(max(number, 1), settings.PAGINATE_OFFSET_PAGES)
+
+        def load():
+            bottom = (number - 1) * self.per_page
+            items = list(self.object_list[bottom:bottom + self.per_page + 1])
+            return (items[:self.per_page], len(items) > self.per_page,
+                    number > 1)
+
+        return CursorPage(self, load, number=number)
+
+    def cursor_page(self, cursor, after=True):
+        values = decode_cursor(cursor)
+        if values is None or len(values) != len(self.ordering):
+            return self.offset_page(1)
+        try:
+            # Значения курсора приводятся к типам полей уже в filter():
+            # курсор с чужими типами - такая же порча, как и нечитаемый
+            queryset = self.object_list.filter(
+                self._keyset_filter(values, after))
+        except (ValidationError, ValueError, TypeError, OverflowError):
+            return self.offset_page(1)
+        if not after:
+            queryset = queryset.order_by(*self._reversed_ordering())
+
+        def load():
+            items = list(queryset[:self.per_page + 1])
+            if not items:
+                return self.offset_page(1)._fetch()
+            has_more = len(items) > self.per_page
+            items = items[:self.per_page]
+            if after:
+                return items, has_more, True
+            return items[::-1], True, has_more
+
+        direction = "after" if after else "before"
+        return CursorPage(self, load, key=f"{direction}:{cursor}")
+
+    def get_page(self, number=None):
+        try:
+            return self.offset_page(int(number))
+        except (TypeError, ValueError):
+            return self.offset_page(1)
+
+    def page_for_request(self, request):
+        if request.GET.get("after"):
+            return self.cursor_page(request.GET["after"], after=True)
+        if request.GET.get("before"):
+            return self.cursor_page(request.GET["before"], after=False)
+        return self.get_page(request.GET.get("page"))
+
+
+def cached_count(key, queryset, timeout=None):
+    """Функция для count=: COUNT(*) по queryset, закешированный под key.
+
+    Ключ, в который входит версия набора записей, даёт точное число;
+    без версии число отстаёт не больше чем на timeout секунд.
+    """
+    if timeout is None:
+        timeout = settings.PAGINATE_COUNT_TIMEOUT
+    return lambda: cache.get_or_set(f"count:{key}", queryset.count, timeout)
+
+
+def cache_page_ids(page, key, timeout):
+    """Кеширует под key состав страницы - id записей и наличие соседних
+    страниц, - но не сами записи: при попадании они выбираются по id, так
+    что правки постов видны сразу, а тяжёлая выборка страницы не
+    повторяется. Записи выбираются из того же queryset'а paginator'а -
+    с его аннотациями для курсоров."""
+    load = page._load
+
+    def cached_load():
+        entry = cache.get(key)
+        if entry is None:
+            items, has_next, has_previous = load()
+            cache.set(key, ([obj.pk for obj in items], has_next,
+                            has_previous), timeout)
+            return items, has_next, has_previous
+        ids, has_next, has_previous = entry
+        objects = {obj.pk: obj for obj in
+                   page.paginator.object_list.filter(pk__in=ids)}
+        return ([objects[pk] for pk in ids if pk in objects],
+                has_next, has_previous)
+
+    page._load = cached_load
+    return page
+
+
+def paginate(request, object_list, ordering=None, count=None):
+    """Страница для запроса; без ordering берётся явная сортировка
+    queryset'а, а если её нет - («-pub_date», «-id»). count - число
+    записей или функция, которая его вернёт."""
+    ordering = (ordering or tuple(object_list.query.order_by)
+                or ("-pub_date", "-id"))
+    paginator = CursorPaginator(object_list, settings.POSTS_PER_PAGE,
+                                ordering=ordering, params=request.GET,
+                                count=count)
+    return paginator, paginator.page_for_request(request)
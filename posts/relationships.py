@@ -0,0 +1,76 @@
+"""Подписки зрителя: «подписан ли он на X» и «на кого из этих авторов».
+
+На любой такой вопрос отвечает один EXISTS или IN по Follow, и ответы
+запоминаются на время запроса (relationships_for). Общего кеша ответов
+нет: его поколение пришлось бы читать из базы тем же одним запросом.
+Кнопки подписки не кешируются и внутри общего кеша страницы: их выводит
+{% viewerpart %} при каждом показе.
+"""
+from .models import Follow
+
+
+class Relationships:
+    def __init__(self, user):
+        self.user_id = user.pk if user.is_authenticated else None
+        self._known = {}
+
+    def follows(self, author_id):
+        return author_id in self.followed_among([author_id])
+
+    def followed_among(self, author_ids):
+        """Множество авторов из author_ids, на которых подписан зритель."""
+        if self.user_id is None:
+            return set()
+        missing = {author_id for author_id in author_ids
+                   if author_id not in self._known}
+        if missing:
+            self._known.update(self._load(missing))
+        return {author_id for author_id in author_ids
+                if self._known[author_id]}
+
+    def _load(self, author_ids):
+        follows = Follow.objects.filter(user_id=self.user_id)
+        if len(author_ids) == 1:
+            author_id, = author_ids
+            followed = ({author_id}
+                        if follows.filter(author_id=author_id).exists()
+                        else set())
+        else:
+            followed = set(follows.filter(author_id__in=author_ids)
+                           .values_list("author_id", flat=True))
+        return {author_id: author_id in followed for author_id in author_ids}
+
+    def among_posts(self, posts):
+        """Ленивое множество для шаблона: `post.author_id in followed`.
+        Подписки на всех авторов posts выбираются разом при первой
+        проверке - если фрагмент со списком взят из кеша, запроса нет."""
+        return FollowedAuthors(self, posts)
+
+
+class FollowedAuthors:
+    def __init__(self, relationships, posts):
+        self.relationships = relationships
+        self.posts = posts
+        self._prefetched = False
+
+    def __contains__(self, author_id):
+        if not self._prefetched:
+            self.relationships.followed_among(
+                {post.author_id for post in self.posts})
+            self._prefetched = True
+        # Автор не со страницы (из устаревшей копии общего кеша страницы)
+        # спрашивается отдельно
+        return self.relationships.follows(author_id)
+
+
+class FollowedEveryone:
+    """Для ленты подписок: все её авторы заведомо в подписках."""
+    def __contains__(self, author_id):
+        return True
+
+
+def relationships_for(request):
+    """Один Relationships на запрос: повторные вопросы - без запросов."""
+    if not hasattr(request, "_relationships"):
+        request._relationships = Relationships(request.user)
+    return request._relationships
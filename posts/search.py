@@ -0,0 +1,106 @@
+"""Полнотекстовый поиск по постам на SQLite FTS5.
+
+posts_post_fts - внешний (content=) индекс FTS5 над posts_post.text: сам
+текст не дублируется, индекс обновляют триггеры на вставку, правку и
+удаление поста, поэтому он согласован и с bulk_create, и с update().
+Результаты ранжируются bm25 и листаются по ключу (rank, id).
+
+SQLite пересоздаёт таблицу при части миграций, и триггеры при этом
+пропадают: после migrate ensure_triggers() возвращает их и перестраивает
+индекс. На других СУБД поиск сводится к icontains по тексту.
+"""
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from .models import Post
+
+FTS_TABLE = "posts_post_fts"
+
+TRIGGERS = {
+    "posts_post_fts_insert": f"""
+        CREATE TRIGGER IF NOT EXISTS posts_post_fts_insert
+        AFTER INSERT ON posts_post BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+        END""",
+    "posts_post_fts_delete": f"""
+        CREATE TRIGGER IF NOT EXISTS posts_post_fts_delete
+        AFTER DELETE ON posts_post BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text)
+            VALUES ('delete', old.id, old.text);
+        END""",
+    "posts_post_fts_update": f"""
+        CREATE TRIGGER IF NOT EXISTS posts_post_fts_update
+        AFTER UPDATE OF text ON posts_post BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text)
+            VALUES ('delete', old.id, old.text);
+            INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+        END""",
+}
+
+WORD_RE = re.compile(r"\w+")
+
+
+def is_supported():
+    return connection.vendor == "sqlite"
+
+
+def match_expression(query):
+    """Запрос пользователя в синтаксисе FTS5: все слова, последнее - как
+    префикс. Операторы FTS5 из ввода не проходят."""
+    words = WORD_RE.findall(query.lower())
+    if not words:
+        return ""
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def search_posts(query, group=None, author=None):
+    """Посты по запросу, от более релевантных к менее."""
+    posts = Post.objects.select_related("author", "group")
+    if group:
+        posts = posts.filter(group__slug=group)
+    if author:
+        posts = posts.filter(author__username=author)
+
+    match = match_expression(query)
+    if not match:
+        return posts.none().order_by("-pub_date", "-id")
+    if not is_supported():
+        return (posts.filter(text__icontains=query.strip())
+                .order_by("-pub_date", "-id"))
+    return (posts
+            .extra(tables=[FTS_TABLE],
+                   where=[f"{FTS_TABLE} MATCH %s",
+                          f"{FTS_TABLE}.rowid = posts_post.id"],
+                   params=[match])
+            .annotate(rank=RawSQL(f"bm25({FTS_TABLE})", ()))
+            .order_by("rank", "id"))
+
+
+def ensure_triggers():
+    """Возвращает пропавшие триггеры; если их не было, перестраивает
+    индекс. Возвращает True, если что-то пришлось чинить."""
+    if not is_supported():
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' "
+            "AND tbl_name = 'posts_post'")
+        existing = {row[0] for row in cursor.fetchall()}
+        missing = set(TRIGGERS) - existing
+        for name in sorted(missing):
+            cursor.execute(TRIGGERS[name])
+    if missing:
+        rebuild()
+    return bool(missing)
+
+
+def rebuild():
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
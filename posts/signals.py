@@ -0,0 +1,196 @@
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.db.models import F
+from django.db.models.signals import (post_delete, post_init, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+
+from . import counters, feed, lookups, media, search
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+# Имя фрагмента карточки поста в post_item.html
+POST_CARD_FRAGMENT = "post_card"
+
+# Посты, которые сейчас удаляются: комментарии, удаляемые каскадом, не
+# пересчитывают их счётчики
+_deleting_posts = set()
+
+
+def bump_post_versions(**filters):
+    Post.objects.filter(**filters).update(version=F("version") + 1)
+
+
+@receiver(post_init, sender=User)
+@receiver(post_init, sender=Group)
+def lookup_loaded(sender, instance, **kwargs):
+    lookups.remember(instance)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=Group)
+def lookup_changed(sender, instance, **kwargs):
+    lookups.forget(instance)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, raw=False, update_fields=None,
+               **kwargs):
+    if raw:
+        return
+    if created:
+        UserStats.objects.get_or_create(user=instance)
+    elif set(update_fields or ()) != {"last_login"}:
+        # Имя выводится в карточках постов автора, в его комментариях и
+        # профиле, а через карточки - на страницах групп
+        bump_post_versions(author=instance)
+        bump_post_versions(comments__author=instance)
+        counters.bump_page_versions(author_id=instance.id)
+        Group.objects.filter(posts__author=instance).update(
+            version=F("version") + 1)
+
+
+def bump_version(instance):
+    # Версию в базе могли поднять UPDATE-ом уже после загрузки объекта,
+    # поэтому увеличиваем её в самом UPDATE
+    if not instance._state.adding:
+        instance.version = F("version") + 1
+
+
+def settle_version(instance):
+    # После save() в поле осталось выражение: значение перечитается из
+    # базы при первом обращении
+    if not isinstance(instance.__dict__.get("version"), int):
+        instance.__dict__.pop("version", None)
+
+
+@receiver(pre_save, sender=Group)
+def group_changing(sender, instance, raw=False, **kwargs):
+    if not raw:
+        bump_version(instance)
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, raw=False, **kwargs):
+    settle_version(instance)
+    if not created and not raw:
+        # Название группы есть на карточках её постов, в том числе в
+        # профилях их авторов
+        bump_post_versions(group=instance)
+        counters.bump_page_versions(authors_of_group=instance.id)
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleting(sender, instance, **kwargs):
+    # Посты группы останутся без неё через UPDATE без сигналов, а их
+    # карточки и профили авторов ссылаются на страницу группы
+    bump_post_versions(group=instance)
+    counters.bump_page_versions(authors_of_group=instance.id)
+
+
+@receiver(pre_save, sender=Post)
+def post_changing(sender, instance, raw=False, **kwargs):
+    if not raw:
+        bump_version(instance)
+
+
+def _image_name(post):
+    # Отложенное поле (only/defer) не трогаем, чтобы не делать запрос
+    image = post.__dict__.get("image")
+    return getattr(image, "name", image) or None
+
+
+@receiver(post_init, sender=Post)
+def post_loaded(sender, instance, **kwargs):
+    # Картинка и группа при загрузке: по ним post_saved поймёт, что
+    # картинку заменили, а пост перенесли из группы
+    instance._saved_image = _image_name(instance)
+    instance._saved_group_id = instance.__dict__.get("group_id")
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    settle_version(instance)
+    if raw:
+        return
+    if "image" in instance.__dict__:
+        image = _image_name(instance)
+        media.replace(None if created else instance._saved_image, image)
+        instance._saved_image = image
+    if created:
+        counters.bump_user_stats(instance.author_id, posts_count=1)
+        counters.bump_page_versions(group_ids=[instance.group_id])
+        feed.fan_out(instance)
+    else:
+        counters.bump_page_versions(
+            author_id=instance.author_id,
+            group_ids=[instance.group_id, instance._saved_group_id])
+        feed.invalidate(instance.author_id)
+    instance._saved_group_id = instance.group_id
+
+
+@receiver(pre_delete, sender=Post)
+def post_deleting(sender, instance, **kwargs):
+    _deleting_posts.add(instance.id)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    _deleting_posts.discard(instance.id)
+    counters.bump_user_stats(instance.author_id, posts_count=-1)
+    counters.bump_page_versions(group_ids=[instance.group_id])
+    feed.invalidate(instance.author_id)
+    if _image_name(instance):
+        media.release(_image_name(instance))
+    version = instance.__dict__.get("version")
+    if isinstance(version, int):
+        cache.delete(make_template_fragment_key(
+            POST_CARD_FRAGMENT, [instance.id, version]))
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        counters.bump_comments_count(instance.post_id, 1)
+    else:
+        # Комментарии выводятся на странице поста, её ETag - версия поста
+        bump_post_versions(id=instance.post_id)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    # Иначе каждый комментарий удаляемого поста стоил бы трёх UPDATE
+    if instance.post_id not in _deleting_posts:
+        counters.bump_comments_count(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.bump_user_stats(instance.author_id, followers_count=1)
+        counters.bump_user_stats(instance.user_id, following_count=1)
+        feed.backfill(instance)
+        follow_changed(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.bump_user_stats(instance.author_id, followers_count=-1)
+    counters.bump_user_stats(instance.user_id, following_count=-1)
+    feed.prune(instance)
+    follow_changed(instance)
+
+
+def follow_changed(follow):
+    # Кнопки подписки на карточках автора меняются и на страницах групп,
+    # ETag которых - версия группы
+    Group.objects.filter(posts__author_id=follow.author_id).update(
+        version=F("version") + 1)
+
+
+def search_index_migrated(sender, **kwargs):
+    # Пересоздание posts_post в миграции SQLite уносит триггеры индекса
+    search.ensure_triggers()
@@ -0,0 +1,56 @@
+"""Хранилище картинок постов, адресуемое по содержимому.
+
+Файл сохраняется под именем из SHA-256 его содержимого, поэтому
+одинаковые картинки занимают на диске одну копию и один набор вариантов
+(posts.thumbnails). Сколько постов ссылается на файл, считает MediaBlob;
+файл без ссылок удаляется вместе с вариантами (см. posts.signals).
+"""
+import hashlib
+import os
+import re
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+# Имя, которое даёт hashed_name: каталог/ab/abcd....ext
+HASHED_NAME_RE = re.compile(r"(?:^|/)([0-9a-f]{2})/(\1[0-9a-f]{62})\.\w+$")
+
+
+def content_digest(content):
+    digest = hashlib.sha256()
+    if hasattr(content, "seek"):
+        content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    if hasattr(content, "seek"):
+        content.seek(0)
+    return digest.hexdigest()
+
+
+def name_digest(name):
+    """SHA-256 содержимого из имени файла этого хранилища; для файлов,
+    загруженных до него под исходными именами, - None."""
+    match = HASHED_NAME_RE.search(name)
+    return match.group(2) if match else None
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+
+    def hashed_name(self, name, digest):
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        return os.path.join(directory, digest[:2], f"{digest}{extension}")
+
+    def get_available_name(self, name, max_length=None):
+        # Одинаковое имя означает одинаковое содержимое - не переименовываем
+        return name
+
+    def _save(self, name, content):
+        name = self.hashed_name(name, content_digest(content))
+        if self.exists(name):
+            return name
+        return super()._save(name, content)
+
+
+post_images = ContentAddressedStorage()
@@ -0,0 +1,99 @@
+import secrets
+
+from django import template
+
+from posts import page_cache
+
+register = template.Library()
+
+# Переменная контекста, через которую viewerpart узнаёт, что рендерится
+# внутри stalecache
+PARTS = "_stalecache_parts"
+
+
+class StaleCacheNode(template.Node):
+    def __init__(self, nodelist, name, vary_on):
+        self.nodelist = nodelist
+        self.name = name
+        self.vary_on = vary_on
+
+    def render(self, context):
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        key = page_cache.make_key(self.name, vary_on)
+        html, marker, parts = page_cache.get_or_set(
+            key, lambda: self.render_shared(context))
+        chunks = html.split(marker)
+        output = [chunks[0]]
+        for (template_name, values), chunk in zip(parts, chunks[1:]):
+            output.append(render_part(context, template_name, values))
+            output.append(chunk)
+        return "".join(output)
+
+    def render_shared(self, context):
+        # Части зрителя заменяются меткой; маркер случайный, чтобы его не
+        # подделал текст поста
+        marker = f"<!--viewerpart:{secrets.token_hex(8)}-->"
+        parts = []
+        with context.push(**{PARTS: (marker, parts)}):
+            html = self.nodelist.render(context)
+        return html, marker, parts
+
+
+def render_part(context, template_name, values):
+    part = context.template.engine.get_template(template_name)
+    with context.push(**values):
+        return part.render(context)
+
+
+class ViewerPartNode(template.Node):
+    def __init__(self, template_name, extra):
+        self.template_name = template_name
+        self.extra = extra
+
+    def render(self, context):
+        template_name = self.template_name.resolve(context)
+        values = {name: var.resolve(context)
+                  for name, var in self.extra.items()}
+        shared = context.get(PARTS)
+        if shared is None:
+            return render_part(context, template_name, values)
+        marker, parts = shared
+        parts.append((template_name, values))
+        return marker
+
+
+@register.tag
+def stalecache(parser, token):
+    """{% stalecache имя [параметры...] %} ... {% endstalecache %}
+
+    Как {% cache %}, но через posts.page_cache: по истечении свежести
+    фрагмент пересчитывает один запрос, остальные получают старую копию.
+    Фрагмент общий для всех зрителей; то, что зависит от зрителя,
+    выводится через {% viewerpart %} и рендерится при каждом показе.
+    """
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(
+            f"'{bits[0]}' принимает хотя бы имя фрагмента")
+    nodelist = parser.parse(("endstalecache",))
+    parser.delete_first_token()
+    return StaleCacheNode(nodelist, bits[1],
+                          [parser.compile_filter(bit) for bit in bits[2:]])
+
+
+@register.tag
+def viewerpart(parser, token):
+    """{% viewerpart "шаблон.html" имя=значение ... %}
+
+    Как {% include ... with ... %}, но внутри stalecache шаблон не попадает
+    в общий кеш, а рендерится для текущего зрителя при каждом показе.
+    """
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(
+            f"'{bits[0]}' принимает имя шаблона")
+    extra = template.base.token_kwargs(bits[2:], parser)
+    if len(extra) != len(bits) - 2:
+        raise template.TemplateSyntaxError(
+            f"'{bits[0]}' принимает только параметры имя=значение")
+    return ViewerPartNode(parser.compile_filter(bits[1]), extra)
@@ -0,0 +1,33 @@
+from django import template
+from django.core.files.storage import default_storage
+
+from posts.thumbnails import ready_variants, variant_height
+
+register = template.Library()
+
+
+def _srcset(variants):
+    return ", ".join(f"{default_storage.url(name)} {width}w"
+                     for width, name in variants)
+
+
+@register.inclusion_tag("post_picture.html")
+def post_picture(post):
+    """<picture> с WebP и запасным JPEG всех ширин или заглушка."""
+    manifest = ready_variants(post)
+    if manifest is None:
+        return {"ready": False, "post": post}
+
+    formats = manifest["formats"]
+    fallback = formats["jpeg"]
+    width, name = fallback[-1]
+    return {
+        "ready": True,
+        "post": post,
+        "webp_srcset": _srcset(formats.get("webp", [])),
+        "srcset": _srcset(fallback),
+        "src": default_storage.url(name),
+        "width": width,
+        "height": variant_height(width),
+        "sizes": f"(max-width: {width}px) 100vw, {width}px",
+    }
@@ -0,0 +1,80 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class AdminScaleTests(TestCase):
+    """ В данном классе расположены тесты, которые проверяют, что списки
+            админки не зависят от размера таблиц"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username="admin", email="admin@example.com", password="pass")
+        cls.user = User.objects.create_user(username="TestUser")
+        cls.group = Group.objects.create(title="Тестовая группа",
+                                         slug="test-slug",
+                                         description="Тестовое описание")
+        cls.admin_client = Client()
+        cls.admin_client.force_login(cls.admin)
+        cls.create_rows(1, prefix="first")
+
+    @classmethod
+    def create_rows(cls, count, prefix):
+        for i in range(count):
+            author = User.objects.create_user(username=f"{prefix}_{i}")
+            post = Post.objects.create(author=author, group=cls.group,
+                                       text=f"Тестовый текст {i}")
+            Comment.objects.create(author=cls.user, post=post,
+                                   text="Комментарий")
+            Follow.objects.create(user=cls.user, author=author)
+
+    def changelists(self):
+        return {name: reverse(f"admin:posts_{name}_changelist")
+                for name in ("post", "comment", "follow", "group")}
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.admin_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelists_do_not_depend_on_table_size(self):
+        single = {name: self.count_queries(url)
+                  for name, url in self.changelists().items()}
+
+        self.create_rows(15, prefix="more")
+
+        for name, url in self.changelists().items():
+            with self.subTest(name=name):
+                self.assertEqual(self.count_queries(url), single[name])
+
+    def test_changelists_skip_full_count(self):
+        for name, url in self.changelists().items():
+            with CaptureQueriesContext(connection) as queries:
+                self.admin_client.get(url)
+            with self.subTest(name=name):
+                self.assertFalse(any("COUNT(*)" in query["sql"]
+                                     for query in queries))
+
+    def test_forms_do_not_list_every_related_object(self):
+        for name in ("comment", "follow"):
+            with self.subTest(name=name):
+                response = self.admin_client.get(
+                    reverse(f"admin:posts_{name}_add"))
+                self.assertContains(response, "admin-autocomplete")
+                self.assertNotContains(response, "first_0</option>")
+
+    def test_search_uses_full_text_index(self):
+        post = Post.objects.create(author=self.user, text="Редкое слово")
+
+        response = self.admin_client.get(
+            reverse("admin:posts_post_changelist"), {"q": "редкое"})
+
+        self.assertEqual(list(response.context["cl"].result_list), [post])
@@ -0,0 +1,305 @@
+import os
+import tempfile
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from posts import page_cache
+from posts.models import Comment, Group, Post
+from yatube.sqlite.cache import SQLiteCache
+
+User = get_user_model()
+
+
+class PostCardCacheTests(TestCase):
+    """ В данном классе расположены тесты для проверки
+            кеширования карточек постов"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user_author = User.objects.create_user(username="TestUser_author")
+        cls.user_reader = User.objects.create_user(username="TestUser_reader")
+        cls.group = Group.objects.create(title="Тестовая группа",
+                                         slug="test-slug",
+                                         description="Тестовое описание")
+
+        cls.guest_client = Client()
+        cls.author_client = Client()
+        cls.author_client.force_login(cls.user_author)
+        cls.reader_client = Client()
+        cls.reader_client.force_login(cls.user_reader)
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(author=self.user_author,
+                                        text="Тестовый текст",
+                                        group=self.group)
+        self.post_url = reverse("posts:post",
+                                kwargs={"username": self.user_author.username,
+                                        "post_id": self.post.id})
+
+    def get_version(self):
+        self.post.refresh_from_db()
+        return self.post.version
+
+    def assert_version_bumped(self, action):
+        version = self.get_version()
+        action()
+        self.assertGreater(self.get_version(), version)
+
+    def test_version_is_bumped_by_visible_changes(self):
+        def edit_group():
+            self.group.title = "Новое название"
+            self.group.save()
+
+        def rename_author():
+            self.user_author.first_name = "Автор"
+            self.user_author.save()
+
+        actions = {
+            "правка": lambda: self.author_client.post(
+                reverse("posts:post_edit",
+                        kwargs={"username": self.user_author.username,
+                                "post_id": self.post.id}),
+                {"text": "Новый текст", "group": self.group.id}),
+            "комментарий": lambda: self.reader_client.post(
+                reverse("posts:add_comment",
+                        kwargs={"username": self.user_author.username,
+                                "post_id": self.post.id}),
+                {"text": "Комментарий"}),
+            "удаление комментария": lambda: Comment.objects.all().delete(),
+            "группа": edit_group,
+            "автор": rename_author,
+        }
+        for name, action in actions.items():
+            with self.subTest(action=name):
+                self.assert_version_bumped(action)
+
+    def test_login_does_not_bump_version(self):
+        version = self.get_version()
+
+        Client().force_login(self.user_author)
+
+        self.assertEqual(self.get_version(), version)
+
+    def test_card_is_served_from_cache_until_post_changes(self):
+        self.guest_client.get(self.post_url)
+        Post.objects.filter(id=self.post.id).update(text="Тихая правка")
+
+        self.assertContains(self.guest_client.get(self.post_url),
+                            "Тестовый текст")
+
+        self.author_client.post(
+            reverse("posts:post_edit",
+                    kwargs={"username": self.user_author.username,
+                            "post_id": self.post.id}),
+            {"text": "Новый текст"})
+
+        self.assertContains(self.guest_client.get(self.post_url),
+                            "Новый текст")
+
+    def test_deleting_group_refreshes_cards_and_profiles(self):
+        group = Group.objects.create(title="Удаляемая группа",
+                                     slug="deleted-slug")
+        Post.objects.create(author=self.user_author, text="Пост в группе",
+                            group=group)
+        group_url = reverse("posts:group", args=[group.slug])
+        profile_url = reverse("posts:profile",
+                              args=[self.user_author.username])
+        self.assertContains(self.guest_client.get(profile_url), group_url)
+        etag = self.guest_client.get(profile_url)["ETag"]
+
+        group.delete()
+
+        self.assertNotContains(self.guest_client.get(reverse("posts:index")),
+                               group_url)
+        response = self.guest_client.get(profile_url,
+                                         HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, group_url)
+
+    def test_author_buttons_are_not_cached_in_card(self):
+        edit_url = reverse("posts:post_edit",
+                           kwargs={"username": self.user_author.username,
+                                   "post_id": self.post.id})
+
+        self.assertNotContains(self.reader_client.get(self.post_url),
+                               edit_url)
+        self.assertContains(self.author_client.get(self.post_url), edit_url)
+        self.assertNotContains(self.reader_client.get(self.post_url),
+                               edit_url)
+
+
+class PageCacheTests(TestCase):
+    """ В данном классе расположены тесты для проверки
+            кеша страниц с отдачей устаревшей копии"""
+    key = page_cache.make_key("test_page")
+
+    def setUp(self):
+        cache.clear()
+        page_cache.reset_stats()
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        return f"страница {self.calls}"
+
+    def store_stale(self, value):
+        cache.set(self.key, (time.time() - 1, value))
+
+    def test_fresh_page_is_computed_once(self):
+        first = page_cache.get_or_set(self.key, self.compute)
+        second = page_cache.get_or_set(self.key, self.compute)
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(page_cache.stats(),
+                         {"hit": 1, "miss": 1, "stale": 0, "wait": 0})
+
+    def test_stale_page_is_served_while_other_caller_recomputes(self):
+        self.store_stale("старая страница")
+        cache.add(f"{self.key}:lock", 1)
+
+        value = page_cache.get_or_set(self.key, self.compute)
+
+        self.assertEqual(value, "старая страница")
+        self.assertEqual(self.calls, 0)
+        self.assertEqual(page_cache.stats()["stale"], 1)
+
+    def test_stale_page_is_recomputed_by_lock_owner(self):
+        self.store_stale("старая страница")
+
+        value = page_cache.get_or_set(self.key, self.compute)
+
+        self.assertEqual(value, "страница 1")
+        self.assertIsNone(cache.get(f"{self.key}:lock"))
+        self.assertEqual(page_cache.get_or_set(self.key, self.compute),
+                         "страница 1")
+
+    def test_missing_page_waits_for_lock_owner(self):
+        cache.add(f"{self.key}:lock", 1)
+        owner = threading.Timer(
+            0.1, page_cache._store, (self.key, "страница владельца", 60))
+        owner.start()
+
+        value = page_cache.get_or_set(self.key, self.compute)
+
+        owner.join()
+        self.assertEqual(value, "страница владельца")
+        self.assertEqual(self.calls, 0)
+        self.assertEqual(page_cache.stats()["wait"], 1)
+
+    @override_settings(PAGE_CACHE_WAIT=0.1)
+    def test_missing_page_is_computed_if_lock_owner_hangs(self):
+        cache.add(f"{self.key}:lock", 1)
+
+        value = page_cache.get_or_set(self.key, self.compute)
+
+        self.assertEqual(value, "страница 1")
+        # Чужую блокировку не снимаем
+        self.assertIsNotNone(cache.get(f"{self.key}:lock"))
+
+    def test_index_page_is_rendered_through_page_cache(self):
+        Client().get(reverse("posts:index"))
+        Client().get(reverse("posts:index"))
+
+        self.assertEqual(page_cache.stats(),
+                         {"hit": 1, "miss": 1, "stale": 0, "wait": 0})
+
+    def test_index_page_is_shared_by_viewers(self):
+        """Общая копия главной, но кнопки подписки у каждого зрителя свои."""
+        author = User.objects.create_user(username="TestUser_author")
+        Post.objects.create(author=author, text="Тестовый текст")
+        follow_url = reverse("posts:profile_follow", args=[author.username])
+        unfollow_url = reverse("posts:profile_unfollow",
+                               args=[author.username])
+        clients = []
+        for name in ("TestUser_follower", "TestUser_reader"):
+            client = Client()
+            client.force_login(User.objects.create_user(username=name))
+            clients.append(client)
+        clients[0].get(follow_url)
+        page_cache.reset_stats()
+
+        follower, reader = (client.get(reverse("posts:index"))
+                            for client in clients)
+
+        self.assertEqual(page_cache.stats(),
+                         {"hit": 1, "miss": 1, "stale": 0, "wait": 0})
+        self.assertContains(follower, unfollow_url)
+        self.assertNotContains(follower, follow_url)
+        self.assertContains(reader, follow_url)
+        self.assertNotContains(reader, unfollow_url)
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    """ В данном классе расположены тесты для проверки
+            общего кеша в файле SQLite"""
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "cache.sqlite3")
+        self.cache = self.make_cache()
+
+    def make_cache(self, **options):
+        return SQLiteCache(self.path, {"OPTIONS": options})
+
+    def test_values_round_trip(self):
+        self.cache.set("key", {"a": [1, 2]})
+        self.cache.set_many({"one": 1, "two": 2})
+
+        self.assertEqual(self.cache.get("key"), {"a": [1, 2]})
+        self.assertEqual(self.cache.get_many(["one", "two", "three"]),
+                         {"one": 1, "two": 2})
+        self.cache.delete_many(["one", "two"])
+        self.assertIsNone(self.cache.get("one"))
+
+    def test_add_is_shared_between_processes(self):
+        """Второй add() - в том числе из другого соединения - не проходит,
+        пока ключ не истёк."""
+        other = self.make_cache()
+
+        self.assertTrue(self.cache.add("lock", 1, 60))
+        self.assertFalse(other.add("lock", 2, 60))
+        self.assertEqual(other.get("lock"), 1)
+
+    def test_add_replaces_expired_key(self):
+        self.cache.set("lock", 1, -1)
+
+        self.assertTrue(self.cache.add("lock", 2, 60))
+        self.assertEqual(self.cache.get("lock"), 2)
+
+    def test_incr_from_many_threads_loses_nothing(self):
+        self.cache.set("counter", 0)
+
+        def bump():
+            for _ in range(20):
+                self.make_cache().incr("counter")
+
+        threads = [threading.Thread(target=bump) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.cache.get("counter"), 80)
+
+    def test_incr_of_missing_key_raises(self):
+        with self.assertRaises(ValueError):
+            self.cache.incr("missing")
+
+    def test_cull_removes_expired_and_extra_entries(self):
+        cache = self.make_cache(MAX_ENTRIES=10, CULL_FREQUENCY=2,
+                                CULL_EVERY=5)
+        cache.set_many({f"old{i}": i for i in range(5)}, -1)
+        for i in range(15):
+            cache.set(f"key{i}", i, 60 + i)
+
+        self.assertEqual(cache.get_many([f"old{i}" for i in range(5)]), {})
+        self.assertEqual(cache.get("key14"), 14)
+        count = cache._connection().execute(
+            "SELECT COUNT(*) FROM cache").fetchone()[0]
+        self.assertLessEqual(count, 10)
@@ -0,0 +1,181 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.models import Max, Min
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from posts.benchmarks import route_names
+from posts.counters import exact_user_stats
+from posts.models import (Comment, FeedItem, Follow, Group, MediaBlob, Post,
+                          UserStats)
+from posts.search import search_posts
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+class BenchCommandsTests(TestCase):
+    """ В данном классе расположены тесты для проверки
+            команд замера производительности"""
+
+    def test_bench_indexes_shows_plans_and_keeps_indexes(self):
+        out = StringIO()
+
+        call_command("bench_indexes", seed=200, runs=1, stdout=out)
+
+        self.assertIn("posts_post_date_idx", out.getvalue())
+        with connection.cursor() as cursor:
+            indexes = connection.introspection.get_constraints(
+                cursor, "posts_post")
+        self.assertIn("posts_post_author_date_idx", indexes)
+        self.assertNotIn("bench_post_author_id", indexes)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class SeedCommandTests(TestCase):
+    """ В данном классе расположены тесты для проверки
+            генератора синтетических данных"""
+    options = {"users": 30, "groups": 3, "posts": 120, "comments": 80,
+               "follows": 150, "images": 2, "image_ratio": 0.5,
+               "batch_size": 50}
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def seed(self, **options):
+        call_command("seed_yatube", stdout=StringIO(),
+                     **{**self.options, **options})
+
+    def test_creates_requested_rows(self):
+        self.seed()
+
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 120)
+        self.assertEqual(Comment.objects.count(), 80)
+        self.assertGreater(Follow.objects.count(), 0)
+        self.assertTrue(Post.objects.exclude(image=None).exists())
+
+    def test_same_seed_gives_same_data(self):
+        self.seed(prefix="first")
+        first = (list(Post.objects.order_by("id")
+                      .values_list("text", "pub_date")),
+                 list(Comment.objects.order_by("id")
+                      .values_list("text", "created")))
+        Post.objects.all().delete()
+
+        self.seed(prefix="second")
+        second = (list(Post.objects.order_by("id")
+                       .values_list("text", "pub_date")),
+                  list(Comment.objects.order_by("id")
+                       .values_list("text", "created")))
+
+        self.assertEqual(first, second)
+
+    def test_dates_end_at_now_option(self):
+        now = datetime(2021, 6, 1, 12, tzinfo=timezone.utc)
+        self.seed(now=now.isoformat(), days=10)
+
+        dates = Post.objects.aggregate(first=Min("pub_date"),
+                                       last=Max("pub_date"))
+        self.assertLessEqual(dates["last"], now)
+        self.assertGreater(dates["first"], now - timedelta(days=10))
+
+    def test_derived_data_matches_seeded_rows(self):
+        self.seed()
+
+        for stats in UserStats.objects.all():
+            self.assertEqual(
+                (stats.posts_count, stats.followers_count,
+                 stats.following_count),
+                tuple(exact_user_stats(stats.user_id).values()))
+        for post in Post.objects.all():
+            self.assertEqual(post.comments_count, post.comments.count())
+        follow = Follow.objects.first()
+        self.assertEqual(
+            set(FeedItem.objects.filter(user=follow.user)
+                .values_list("post_id", flat=True)),
+            set(Post.objects.filter(author__following__user=follow.user)
+                .values_list("id", flat=True)))
+        for blob in MediaBlob.objects.all():
+            self.assertEqual(blob.refs,
+                             Post.objects.filter(image=blob.name).count())
+        self.assertEqual(list(search_posts(Post.objects.first().text)
+                              .values_list("id", flat=True))[:1],
+                         [Post.objects.first().id])
+
+    def test_followers_follow_power_law(self):
+        self.seed(users=200, follows=3000)
+
+        followers = sorted(UserStats.objects.values_list(
+            "followers_count", flat=True), reverse=True)
+
+        self.assertGreater(followers[0], 10 * followers[len(followers) // 2])
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class BenchViewsCommandTests(TestCase):
+    """ В данном классе расположены тесты для проверки
+            замеров страниц"""
+
+    def setUp(self):
+        self.output = tempfile.NamedTemporaryFile(suffix=".json",
+                                                  delete=False).name
+
+    def tearDown(self):
+        os.remove(self.output)
+
+    def bench(self, **options):
+        call_command("bench_views", sizes="60", repeats=1,
+                     stdout=StringIO(), **options)
+
+    def test_results_cover_every_route(self):
+        self.bench(output=self.output)
+
+        with open(self.output) as output:
+            results = json.load(output)["results"]
+        cases = results["60"]
+        for route in route_names():
+            with self.subTest(route=route):
+                self.assertIn(f"{route}|anonymous|cold|first", cases)
+                self.assertIn(f"{route}|reader|warm|first", cases)
+        self.assertIn("posts:index|anonymous|warm|cursor", cases)
+        self.assertEqual(cases["posts:index|reader|cold|first"]["status"],
+                         200)
+        self.assertGreater(cases["posts:index|reader|cold|first"]["bytes"],
+                           0)
+
+    def test_write_routes_do_not_change_database(self):
+        self.bench()
+        posts_count = Post.objects.count()
+        follows_count = Follow.objects.count()
+
+        self.bench()
+
+        self.assertEqual(Post.objects.count(), posts_count)
+        self.assertEqual(Follow.objects.count(), follows_count)
+
+    def test_regressions_are_flagged(self):
+        self.bench(output=self.output)
+        with open(self.output) as output:
+            baseline = json.load(output)
+        for result in baseline["results"]["60"].values():
+            result["queries"] -= 1
+        with open(self.output, "w") as output:
+            json.dump(baseline, output)
+
+        with self.assertRaisesMessage(CommandError, "запросов"):
+            self.bench(compare=self.output)
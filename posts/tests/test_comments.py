@@ -0,0 +1,129 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+
+@override_settings(COMMENTS_PER_PAGE=5)
+class CommentPagesTests(TestCase):
+    """ В данном классе расположены тесты для проверки
+            порционного вывода комментариев на странице поста"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="TestUser")
+        cls.post = Post.objects.create(author=cls.user, text="Тестовый текст")
+        for i in range(12):
+            Comment.objects.create(post=cls.post, author=cls.user,
+                                   text=f"Комментарий {i}")
+        cls.comments = list(Comment.objects.order_by("created", "id"))
+        cls.guest_client = Client()
+        cls.post_url = reverse("posts:post",
+                               kwargs={"username": cls.user.username,
+                                       "post_id": cls.post.id})
+
+    def setUp(self):
+        cache.clear()
+
+    def next_url(self, response):
+        page = response.context["comments"]
+        self.assertTrue(page.has_next())
+        return f"{response.context['comments_url']}?{page.next_query}"
+
+    def test_post_page_shows_first_chunk(self):
+        """На странице поста только первая порция и ссылка на следующую."""
+        response = self.guest_client.get(self.post_url)
+
+        self.assertEqual(list(response.context["comments"]),
+                         self.comments[:5])
+        self.assertContains(response, "data-comments-more")
+        self.assertNotContains(response, "Комментарий 5<")
+
+    def test_chunks_continue_in_order(self):
+        """Фрагменты продолжают список с места, где он прервался."""
+        response = self.guest_client.get(self.post_url)
+        second = self.guest_client.get(self.next_url(response))
+        third = self.guest_client.get(self.next_url(second))
+
+        self.assertTemplateUsed(second, "comments_chunk.html")
+        self.assertEqual(list(second.context["comments"]),
+                         self.comments[5:10])
+        self.assertEqual(list(third.context["comments"]),
+                         self.comments[10:])
+        self.assertNotContains(third, "data-comments-more")
+        self.assertNotContains(third, "<html")
+
+    def test_chunk_of_missing_post_is_404(self):
+        """Фрагмент чужого или несуществующего поста - 404."""
+        response = self.guest_client.get(reverse(
+            "posts:post_comments",
+            kwargs={"username": "nobody", "post_id": self.post.id}))
+
+        self.assertEqual(response.status_code, 404)
+
+
+class CommentFragmentTests(TestCase):
+    """ В данном классе расположены тесты для проверки
+            отправки комментария с ответом-фрагментом"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user_author = User.objects.create_user(username="TestUser_author")
+        cls.user_reader = User.objects.create_user(username="TestUser_reader")
+        cls.post = Post.objects.create(author=cls.user_author,
+                                       text="Тестовый текст")
+        cls.reader_client = Client()
+        cls.reader_client.force_login(cls.user_reader)
+        cls.url = reverse("posts:add_comment",
+                          kwargs={"username": cls.user_author.username,
+                                  "post_id": cls.post.id})
+
+    def send(self, text):
+        return self.reader_client.post(self.url, {"text": text},
+                                       HTTP_X_REQUESTED_WITH="XMLHttpRequest")
+
+    def test_fragment_contains_only_new_comment(self):
+        """Успешная отправка возвращает 201 и разметку комментария."""
+        response = self.send("Новый комментарий")
+
+        comment = Comment.objects.get()
+        self.assertEqual(response.status_code, 201)
+        self.assertTemplateUsed(response, "comment_item.html")
+        self.assertTemplateNotUsed(response, "post.html")
+        self.assertContains(response, "Новый комментарий", status_code=201)
+        self.assertContains(response, f'id="comment-{comment.id}"',
+                            status_code=201)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+
+    def test_fragment_with_errors(self):
+        """Ошибки формы приходят фрагментом с кодом 400."""
+        response = self.send("")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertTemplateUsed(response, "comment_errors.html")
+        self.assertContains(response, "alert-danger", status_code=400)
+        self.assertFalse(Comment.objects.exists())
+
+    def test_fragment_is_cheaper_than_redirect(self):
+        """Фрагмент обходится без повторной загрузки страницы поста."""
+        with CaptureQueriesContext(connection) as redirect:
+            self.reader_client.post(self.url, {"text": "Текст"}, follow=True)
+        with CaptureQueriesContext(connection) as fragment:
+            self.send("Комментарий")
+
+        self.assertLess(len(fragment), len(redirect))
+
+    def test_form_without_script_still_redirects(self):
+        """Обычная отправка формы по-прежнему ведёт на страницу поста."""
+        response = self.reader_client.post(self.url, {"text": "Текст"})
+
+        self.assertRedirects(response, reverse(
+            "posts:post", kwargs={"username": self.user_author.username,
+                                  "post_id": self.post.id}))
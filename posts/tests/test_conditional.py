@@ -0,0 +1,126 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalGetTests(TestCase):
+    """ В данном классе расположены тесты для проверки
+            ETag и ответов 304 страниц поста, профиля и группы"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user_author = User.objects.create_user(username="TestUser_author")
+        cls.user_reader = User.objects.create_user(username="TestUser_reader")
+        cls.group = Group.objects.create(title="Тестовая группа",
+                                         slug="test-slug",
+                                         description="Тестовое описание")
+        cls.post = Post.objects.create(author=cls.user_author,
+                                       text="Тестовый текст",
+                                       group=cls.group)
+
+        cls.guest_client = Client()
+        cls.reader_client = Client()
+        cls.reader_client.force_login(cls.user_reader)
+
+        cls.post_url = reverse("posts:post",
+                               kwargs={"username": cls.user_author.username,
+                                       "post_id": cls.post.id})
+        cls.profile_url = reverse("posts:profile",
+                                  kwargs={"username":
+                                          cls.user_author.username})
+        cls.group_url = reverse("posts:group", kwargs={"slug": "test-slug"})
+
+    def etag(self, url, client=None):
+        response = (client or self.guest_client).get(url)
+        self.assertEqual(response.status_code, 200)
+        return response["ETag"]
+
+    def test_matching_etag_returns_304_with_one_query(self):
+        """Совпавший ETag - ответ 304 без выборки постов и рендера."""
+        for url in (self.post_url, self.profile_url, self.group_url):
+            with self.subTest(url=url):
+                etag = self.etag(url)
+                with self.assertNumQueries(1):
+                    response = self.guest_client.get(
+                        url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b"")
+
+    def test_pages_revalidate_by_cookie(self):
+        """Страницы требуют сверки и различаются по cookie."""
+        response = self.guest_client.get(self.post_url)
+        self.assertIn("no-cache", response["Cache-Control"])
+        self.assertIn("Cookie", response["Vary"])
+
+    def test_viewer_changes_etag(self):
+        """У гостя и вошедшего пользователя разные ETag."""
+        self.assertNotEqual(self.etag(self.post_url),
+                            self.etag(self.post_url, self.reader_client))
+
+    def test_comment_changes_post_page(self):
+        """Новый комментарий меняет ETag поста, профиля и группы."""
+        before = [self.etag(url) for url in
+                  (self.post_url, self.profile_url, self.group_url)]
+        Comment.objects.create(post=self.post, author=self.user_reader,
+                               text="Комментарий")
+        after = [self.etag(url) for url in
+                 (self.post_url, self.profile_url, self.group_url)]
+        for old, new in zip(before, after):
+            self.assertNotEqual(old, new)
+
+    def test_new_post_changes_profile_and_group(self):
+        """Новый пост меняет ETag профиля автора и его группы."""
+        profile, group = self.etag(self.profile_url), self.etag(self.group_url)
+        Post.objects.create(author=self.user_author, text="Ещё текст",
+                            group=self.group)
+        self.assertNotEqual(profile, self.etag(self.profile_url))
+        self.assertNotEqual(group, self.etag(self.group_url))
+
+    def test_moving_post_changes_old_group(self):
+        """Перенос поста в другую группу меняет ETag прежней группы."""
+        other = Group.objects.create(title="Другая", slug="other",
+                                     description="Описание")
+        group = self.etag(self.group_url)
+        post = Post.objects.get(id=self.post.id)
+        post.group = other
+        post.save()
+        self.assertNotEqual(group, self.etag(self.group_url))
+
+    def test_follow_changes_profile(self):
+        """Подписка меняет ETag профиля автора."""
+        profile = self.etag(self.profile_url, self.reader_client)
+        Follow.objects.create(user=self.user_reader, author=self.user_author)
+        self.assertNotEqual(profile,
+                            self.etag(self.profile_url, self.reader_client))
+
+    def test_follow_changes_author_groups(self):
+        """Подписка меняет ETag групп автора: на карточках кнопка подписки."""
+        group = self.etag(self.group_url, self.reader_client)
+        Follow.objects.create(user=self.user_reader, author=self.user_author)
+        self.assertNotEqual(group,
+                            self.etag(self.group_url, self.reader_client))
+
+    def test_editing_group_and_author_changes_pages(self):
+        """Правка группы и имени автора меняет ETag их страниц, а правка
+        группы - и профилей авторов её постов."""
+        group = self.etag(self.group_url)
+        profile = self.etag(self.profile_url)
+        self.group.title = "Новое название"
+        self.group.save()
+        self.assertNotEqual(group, self.etag(self.group_url))
+        self.assertNotEqual(profile, self.etag(self.profile_url))
+
+        group = self.etag(self.group_url)
+        self.user_author.first_name = "Имя"
+        self.user_author.save()
+        self.assertNotEqual(group, self.etag(self.group_url))
+
+    def test_missing_page_is_404(self):
+        """Для несуществующей страницы ETag нет, отвечает сам view."""
+        response = self.guest_client.get(reverse("posts:post", kwargs={
+            "username": self.user_author.username, "post_id": 10 ** 6}))
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,123 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Post, UserStats
+
+User = get_user_model()
+
+
+class CountersTests(TestCase):
+    """ В данном классе расположены тесты для проверки
+            денормализованных счётчиков"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user_follower = User.objects.create_user(
+            username="TestUser_follower")
+        cls.user_author = User.objects.create_user(
+            username="TestUser_author")
+        cls.post = Post.objects.create(author=cls.user_author,
+                                       text="Тестовый текст")
+
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.user_follower)
+        cls.author_client = Client()
+        cls.author_client.force_login(cls.user_author)
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_new_post_increments_posts_count(self):
+        self.author_client.post(reverse("posts:new_post"),
+                                data={"text": "Новый текст"})
+
+        self.assertEqual(self.stats(self.user_author).posts_count, 2)
+
+    def test_post_delete_decrements_posts_count(self):
+        self.author_client.get(
+            reverse("posts:post_delete",
+                    kwargs={"username": self.user_author.username,
+                            "post_id": self.post.id}))
+
+        self.assertEqual(self.stats(self.user_author).posts_count, 0)
+
+    def test_add_comment_increments_comments_count(self):
+        self.authorized_client.post(
+            reverse("posts:add_comment",
+                    kwargs={"username": self.user_author.username,
+                            "post_id": self.post.id}),
+            data={"text": "Комментарий"})
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+
+    def delete_post_with_comments(self, count):
+        post = Post.objects.create(author=self.user_author, text="Пост")
+        Comment.objects.bulk_create(
+            Comment(author=self.user_follower, post=post, text=f"Текст {i}")
+            for i in range(count))
+        with CaptureQueriesContext(connection) as queries:
+            post.delete()
+        return len(queries)
+
+    def test_post_delete_does_not_recount_each_comment(self):
+        self.assertEqual(self.delete_post_with_comments(1),
+                         self.delete_post_with_comments(20))
+
+    def test_drifted_comments_count_does_not_block_delete(self):
+        """Комментарии из bulk_create не увеличили счётчик: удаление
+        оставляет его нулём, а не падает на CHECK."""
+        Comment.objects.bulk_create([
+            Comment(author=self.user_follower, post=self.post,
+                    text="Комментарий")])
+
+        Comment.objects.all().delete()
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+
+    def test_follow_and_unfollow_update_both_users(self):
+        kwargs = {"username": self.user_author.username}
+        self.authorized_client.get(reverse("posts:profile_follow",
+                                           kwargs=kwargs))
+
+        self.assertEqual(self.stats(self.user_author).followers_count, 1)
+        self.assertEqual(self.stats(self.user_follower).following_count, 1)
+
+        self.authorized_client.get(reverse("posts:profile_unfollow",
+                                           kwargs=kwargs))
+
+        self.assertEqual(self.stats(self.user_author).followers_count, 0)
+        self.assertEqual(self.stats(self.user_follower).following_count, 0)
+
+    def test_recount_stats_restores_drifted_counters(self):
+        Comment.objects.create(author=self.user_follower, post=self.post,
+                               text="Комментарий")
+        Follow.objects.create(user=self.user_follower, author=self.user_author)
+        Post.objects.filter(id=self.post.id).update(comments_count=42)
+        UserStats.objects.update(posts_count=42, followers_count=42)
+        UserStats.objects.filter(user=self.user_follower).delete()
+
+        call_command("recount_stats", stdout=StringIO())
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        self.assertEqual(self.stats(self.user_author).posts_count, 1)
+        self.assertEqual(self.stats(self.user_author).followers_count, 1)
+        self.assertEqual(self.stats(self.user_follower).following_count, 1)
+
+    def test_profile_shows_stored_counters(self):
+        Follow.objects.create(user=self.user_follower, author=self.user_author)
+
+        response = self.authorized_client.get(
+            reverse("posts:profile",
+                    kwargs={"username": self.user_author.username}))
+
+        self.assertContains(response, "Подписчиков: 1")
+        self.assertContains(response, "Записей: 1")
@@ -0,0 +1,270 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.feed import feed_version, follow_feed
+from posts.models import Comment, FeedItem, Follow, Post, UserStats
+from posts.pagination import CursorPaginator
+
+User = get_user_model()
+
+
+class FeedTests(TestCase):
+    """ В данном классе расположены тесты для проверки
+            материализованной ленты подписок"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user_follower = User.objects.create_user(
+            username="TestUser_follower")
+        cls.user_author = User.objects.create_user(
+            username="TestUser_author")
+        cls.post = Post.objects.create(author=cls.user_author,
+                                       text="Тестовый текст")
+
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.user_follower)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_follow_backfills_inbox_with_existing_posts(self):
+        Follow.objects.create(user=self.user_follower, author=self.user_author)
+
+        self.assertTrue(FeedItem.objects.filter(
+            user=self.user_follower, post=self.post).exists())
+
+    def test_new_post_is_written_to_followers_inbox(self):
+        Follow.objects.create(user=self.user_follower, author=self.user_author)
+
+        post_new = Post.objects.create(author=self.user_author,
+                                       text="Новый текст")
+
+        item = FeedItem.objects.get(user=self.user_follower, post=post_new)
+        self.assertEqual(item.author, self.user_author)
+        self.assertEqual(item.pub_date, post_new.pub_date)
+
+    def test_unfollow_prunes_inbox(self):
+        Follow.objects.create(user=self.user_follower, author=self.user_author)
+
+        self.authorized_client.get(
+            reverse("posts:profile_unfollow",
+                    kwargs={"username": self.user_author.username}))
+
+        self.assertFalse(FeedItem.objects.filter(
+            user=self.user_follower).exists())
+
+    def test_deleted_post_leaves_inbox(self):
+        Follow.objects.create(user=self.user_follower, author=self.user_author)
+        post_new = Post.objects.create(author=self.user_author,
+                                       text="Новый текст")
+
+        post_new.delete()
+
+        self.assertFalse(FeedItem.objects.filter(post_id=post_new.id).exists())
+
+    def test_follow_feed_is_sorted_from_newest(self):
+        Follow.objects.create(user=self.user_follower, author=self.user_author)
+        post_new = Post.objects.create(author=self.user_author,
+                                       text="Новый текст")
+
+        self.assertEqual(list(follow_feed(self.user_follower)),
+                         [post_new, self.post])
+
+    def test_cursor_pages_of_shared_posts_have_no_duplicates(self):
+        # Посты автора лежат во «входящих» нескольких подписчиков
+        for i in range(3):
+            user = User.objects.create_user(username=f"TestUser_{i}")
+            Follow.objects.create(user=user, author=self.user_author)
+        Follow.objects.create(user=self.user_follower, author=self.user_author)
+        for i in range(24):
+            Post.objects.create(author=self.user_author, text=f"Текст {i}")
+        expected = list(Post.objects.filter(author=self.user_author)
+                        .order_by("-pub_date", "-id")
+                        .values_list("id", flat=True))
+
+        feed = follow_feed(self.user_follower)
+        # Сортировка ленты, как в paginate() у view
+        paginator = CursorPaginator(feed, 10,
+                                    ordering=tuple(feed.query.order_by))
+        page = paginator.offset_page(1)
+        seen = [post.id for post in page]
+        for _ in range(2):
+            page = paginator.cursor_page(page.next_cursor, after=True)
+            seen += [post.id for post in page]
+        self.assertFalse(page.has_next())
+        self.assertEqual(seen, expected)
+
+        previous = paginator.cursor_page(
+            paginator.cursor_for(page.object_list[0]), after=False)
+        self.assertEqual([post.id for post in previous], expected[10:20])
+
+    @override_settings(FEED_FANOUT_LIMIT=1)
+    def test_posts_of_celebrity_are_merged_on_read(self):
+        user_another = User.objects.create_user(username="TestUser_another")
+        Follow.objects.create(user=self.user_follower, author=self.user_author)
+        Follow.objects.create(user=user_another, author=self.user_author)
+
+        post_new = Post.objects.create(author=self.user_author,
+                                       text="Новый текст")
+
+        self.assertFalse(FeedItem.objects.filter(post=post_new).exists())
+        self.assertEqual(list(follow_feed(self.user_follower)),
+                         [post_new, self.post])
+
+        response = self.authorized_client.get(reverse("posts:follow_index"))
+        self.assertContains(response, post_new)
+
+    @override_settings(FEED_FANOUT_LIMIT=1, FEED_REJOIN_LIMIT=1)
+    def test_author_back_under_limit_rejoins_feeds_on_recount(self):
+        user_another = User.objects.create_user(username="TestUser_another")
+        Follow.objects.create(user=user_another, author=self.user_author)
+        Follow.objects.create(user=self.user_follower, author=self.user_author)
+        post_new = Post.objects.create(author=self.user_author,
+                                       text="Пост «звезды»")
+
+        with CaptureQueriesContext(connection) as queries:
+            Follow.objects.filter(user=user_another).delete()
+
+        # Отписка не раскладывает посты: автор остаётся «звездой» до
+        # recount_stats, и его посты по-прежнему подмешиваются при чтении
+        self.assertFalse(any("INSERT" in query["sql"]
+                             for query in queries.captured_queries))
+        self.assertEqual(list(follow_feed(self.user_follower)),
+                         [post_new, self.post])
+
+        call_command("recount_stats", stdout=StringIO())
+
+        self.assertFalse(UserStats.objects.get(user=self.user_author)
+                         .celebrity)
+        self.assertTrue(FeedItem.objects.filter(
+            user=self.user_follower, post=post_new).exists())
+        self.assertEqual(list(follow_feed(self.user_follower)),
+                         [post_new, self.post])
+
+    @override_settings(FEED_FANOUT_LIMIT=1, FEED_REJOIN_LIMIT=0)
+    def test_author_near_limit_stays_celebrity(self):
+        user_another = User.objects.create_user(username="TestUser_another")
+        Follow.objects.create(user=user_another, author=self.user_author)
+        Follow.objects.create(user=self.user_follower, author=self.user_author)
+        Follow.objects.filter(user=user_another).delete()
+        post_new = Post.objects.create(author=self.user_author,
+                                       text="Пост «звезды»")
+
+        call_command("recount_stats", stdout=StringIO())
+
+        self.assertTrue(UserStats.objects.get(user=self.user_author)
+                        .celebrity)
+        self.assertFalse(FeedItem.objects.filter(post=post_new).exists())
+        self.assertEqual(list(follow_feed(self.user_follower)),
+                         [post_new, self.post])
+
+    @override_settings(FEED_FANOUT_LIMIT=1, FEED_REJOIN_LIMIT=1,
+                       FEED_REJOIN_SIZE=1)
+    def test_recount_rejoins_authors_under_limit(self):
+        Follow.objects.create(user=self.user_follower, author=self.user_author)
+        # Счётчик разошёлся с подписками: автор числится «звездой»
+        UserStats.objects.filter(user=self.user_author).update(
+            followers_count=5)
+        post_new = Post.objects.create(author=self.user_author,
+                                       text="Пост «звезды»")
+        FeedItem.objects.all().delete()
+
+        call_command("recount_stats", stdout=StringIO())
+
+        # В ленты возвращаются только последние FEED_REJOIN_SIZE постов
+        self.assertEqual(list(FeedItem.objects.values_list("post_id",
+                                                           flat=True)),
+                         [post_new.id])
+        self.assertEqual(list(follow_feed(self.user_follower)), [post_new])
+
+
+class FeedCacheTests(TestCase):
+    """ В данном классе расположены тесты для проверки
+            кеширования ленты подписок"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user_follower = User.objects.create_user(
+            username="TestUser_follower")
+        cls.user_another = User.objects.create_user(
+            username="TestUser_another")
+        cls.user_author = User.objects.create_user(
+            username="TestUser_author")
+        cls.post = Post.objects.create(author=cls.user_author,
+                                       text="Тестовый текст")
+        Follow.objects.create(user=cls.user_follower, author=cls.user_author)
+
+        cls.follower_client = Client()
+        cls.follower_client.force_login(cls.user_follower)
+        cls.another_client = Client()
+        cls.another_client.force_login(cls.user_another)
+
+    def setUp(self):
+        cache.clear()
+
+    def assert_version_changes(self, action):
+        version = feed_version(self.user_follower)
+        action()
+        self.assertNotEqual(feed_version(self.user_follower), version)
+
+    def test_version_changes_when_feed_changes(self):
+        def edit_post():
+            self.post.text = "Новый текст"
+            self.post.save()
+
+        actions = {
+            "новый пост": lambda: Post.objects.create(
+                author=self.user_author, text="Новый пост"),
+            "правка": edit_post,
+            "отписка": lambda: Follow.objects.filter(
+                user=self.user_follower).delete(),
+            "подписка": lambda: Follow.objects.create(
+                user=self.user_follower, author=self.user_author),
+            "удаление": lambda: Post.objects.filter(
+                author=self.user_author).first().delete(),
+        }
+        for name, action in actions.items():
+            with self.subTest(action=name):
+                self.assert_version_changes(action)
+
+    def test_cached_feed_is_not_shared_between_users(self):
+        url = reverse("posts:follow_index")
+        self.follower_client.get(url)
+
+        response = self.another_client.get(url)
+
+        self.assertNotContains(response, self.post.text)
+
+    def test_new_post_appears_in_cached_feed(self):
+        url = reverse("posts:follow_index")
+        self.follower_client.get(url)
+
+        post_new = Post.objects.create(author=self.user_author,
+                                       text="Свежий пост")
+
+        self.assertContains(self.follower_client.get(url), post_new.text)
+
+    def test_new_comment_appears_in_cached_feed(self):
+        url = reverse("posts:follow_index")
+        self.follower_client.get(url)
+
+        Comment.objects.create(post=self.post, author=self.user_another,
+                               text="Комментарий")
+
+        self.assertContains(self.follower_client.get(url), "Комментариев: 1")
+
+    def test_cache_hit_skips_feed_query(self):
+        url = reverse("posts:follow_index")
+        with CaptureQueriesContext(connection) as miss:
+            self.follower_client.get(url)
+        with CaptureQueriesContext(connection) as hit:
+            self.follower_client.get(url)
+
+        self.assertLess(len(hit), len(miss))
@@ -1,3 +1,4 @@
+import hashlib
 import shutil
 import tempfile
 from django.conf import settings
@@ -7,6 +8,7 @@ from django.contrib.auth import get_user_model
 from django.urls import reverse
 
 from posts.models import Group, Post, Comment
+from posts.storage import post_images
 from yatube.settings import MEDIA_ROOT
 
 User = get_user_model()
@@ -67,7 +69,9 @@ class PostFormTests(TestCase):
         self.assertTrue(Post.objects.filter(
             text=form_data["text"],
             author=form_data["author"],
-            image=f"posts/{form_data['image'].name}",
+            image=post_images.hashed_name(
+                f"posts/{form_data['image'].name}",
+                hashlib.sha256(small_gif).hexdigest()),
             group=form_data["group"]).exists())
 
     def test_update_post(self):
@@ -108,8 +112,9 @@ class PostFormTests(TestCase):
             "posts:post", args=[self.user.username, self.post.id]))
         self.assertEqual(self.post.text, form_data["text"])
         self.assertEqual(self.post.group.id, form_data["group"])
-        self.assertEqual(self.post.image.name,
-                         f"posts/{form_data['image'].name}")
+        self.assertEqual(self.post.image.name, post_images.hashed_name(
+            f"posts/{form_data['image'].name}",
+            hashlib.sha256(small_gif_new).hexdigest()))
 
 
 class CommentFormTests(TestCase):
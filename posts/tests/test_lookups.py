@@ -0,0 +1,129 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import Http404
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from posts import lookups
+from posts.models import Group
+from yatube import routers
+
+User = get_user_model()
+
+
+class LookupsTests(TestCase):
+    """ В данном классе расположены тесты для проверки
+            кеша групп по slug и пользователей по имени"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="TestUser",
+                                            first_name="Имя")
+        cls.group = Group.objects.create(title="Тестовая группа",
+                                         slug="test-slug",
+                                         description="Тестовое описание")
+
+    def setUp(self):
+        cache.clear()
+        lookups.local.clear()
+
+    def tearDown(self):
+        lookups.local.clear()
+
+    def test_second_lookup_has_no_queries(self):
+        with self.assertNumQueries(1):
+            lookups.group_by_slug("test-slug")
+        with self.assertNumQueries(0):
+            group = lookups.group_by_slug("test-slug")
+        self.assertEqual(group, self.group)
+        self.assertEqual(group.title, "Тестовая группа")
+
+    def test_shared_cache_serves_other_processes(self):
+        lookups.user_by_username("TestUser")
+        lookups.local.clear()
+        with self.assertNumQueries(0):
+            user = lookups.user_by_username("TestUser")
+        self.assertEqual(user.get_full_name(), "Имя")
+
+    def test_every_lookup_gets_own_instance(self):
+        self.assertIsNot(lookups.group_by_slug("test-slug"),
+                         lookups.group_by_slug("test-slug"))
+
+    def test_password_is_not_cached(self):
+        lookups.user_by_username("TestUser")
+        cached = cache.get(lookups._key(User, "TestUser"))
+        self.assertNotIn(self.user.password, cached)
+
+    def test_missing_is_404(self):
+        with self.assertRaises(Http404):
+            lookups.group_by_slug("missing")
+
+    def test_save_invalidates(self):
+        lookups.group_by_slug("test-slug")
+        group = Group.objects.get(pk=self.group.pk)
+        group.title = "Новое название"
+        group.save()
+        self.assertEqual(lookups.group_by_slug("test-slug").title,
+                         "Новое название")
+
+    def test_rename_forgets_old_name(self):
+        lookups.user_by_username("TestUser")
+        user = User.objects.get(pk=self.user.pk)
+        user.username = "Renamed"
+        user.save()
+        with self.assertRaises(Http404):
+            lookups.user_by_username("TestUser")
+        self.assertEqual(lookups.user_by_username("Renamed"), user)
+
+    def test_delete_invalidates(self):
+        lookups.group_by_slug("test-slug")
+        Group.objects.get(pk=self.group.pk).delete()
+        with self.assertRaises(Http404):
+            lookups.group_by_slug("test-slug")
+
+    def test_version_is_read_fresh(self):
+        group = lookups.group_by_slug("test-slug")
+        Group.objects.filter(pk=self.group.pk).update(version=42)
+        self.assertEqual(group.version, 42)
+
+    @override_settings(LOOKUP_LOCAL_SIZE=2)
+    def test_local_cache_is_bounded(self):
+        for i in range(3):
+            lookups.local.set(i, i)
+        self.assertIsNone(lookups.local.get(0))
+        self.assertEqual(lookups.local.get(2), 2)
+
+    @override_settings(LOOKUP_LOCAL_TTL=-1)
+    def test_local_entries_expire(self):
+        lookups.local.set("key", 1)
+        self.assertIsNone(lookups.local.get("key"))
+
+
+class LookupsTransactionTests(TransactionTestCase):
+    """ В данном классе расположены тесты для проверки
+            кеша поиска при фиксации транзакций и чтении с реплик"""
+    def setUp(self):
+        cache.clear()
+        lookups.local.clear()
+        self.addCleanup(lookups.local.clear)
+
+    def test_old_name_cached_before_commit_is_forgotten(self):
+        user = User.objects.create_user(username="TestUser")
+        with transaction.atomic():
+            user.username = "Renamed"
+            user.save()
+            # Параллельный запрос до фиксации ещё видит старое имя
+            cache.set(lookups._key(User, "TestUser"),
+                      (user.id, "TestUser", "", ""))
+        with self.assertRaises(Http404):
+            lookups.user_by_username("TestUser")
+
+    @override_settings(DATABASE_REPLICAS=["replica1"])
+    def test_miss_reads_primary(self):
+        """Отстающая реплика не возвращает в кеш старые значения."""
+        group = Group.objects.create(title="Тестовая группа",
+                                     slug="test-slug")
+        routers._state.replicas = True
+        self.addCleanup(routers.reset)
+        with self.assertNumQueries(1):
+            self.assertEqual(lookups.group_by_slug("test-slug"), group)
@@ -0,0 +1,139 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.storage import FileSystemStorage
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from posts import media
+from posts.models import MediaBlob, Post
+from posts.tests.test_thumbnails import make_image
+from posts.thumbnails import generate_for_post, ready_variants
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ContentAddressedMediaTests(TestCase):
+    """ В данном классе расположены тесты для проверки хранения
+            одинаковых картинок одной копией с подсчётом ссылок"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="TestUser")
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def create_post(self, name="picture.jpg", size=(1200, 800)):
+        return Post.objects.create(author=self.user, text="Тестовый текст",
+                                   image=make_image(name, size))
+
+    def run_on_commit(self):
+        callbacks = connection.run_on_commit
+        connection.run_on_commit = []
+        for _, callback in callbacks:
+            callback()
+
+    def refs(self, name):
+        blob = MediaBlob.objects.filter(name=name).first()
+        return blob.refs if blob else 0
+
+    def test_same_content_is_stored_once(self):
+        first = self.create_post("first.jpg")
+        second = self.create_post("second.jpg")
+
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(self.refs(first.image.name), 2)
+
+    def test_file_is_kept_while_referenced(self):
+        first = self.create_post()
+        second = self.create_post()
+        name = first.image.name
+
+        first.delete()
+        self.run_on_commit()
+
+        self.assertEqual(self.refs(name), 1)
+        self.assertTrue(second.image.storage.exists(name))
+
+    def test_unreferenced_file_and_variants_are_deleted(self):
+        post = self.create_post()
+        generate_for_post(post.id)
+        post.refresh_from_db()
+        storage = post.image.storage
+        formats = ready_variants(post)["formats"]
+        variants = [name for image_format in ("webp", "jpeg")
+                    for _, name in formats[image_format]]
+        name = post.image.name
+
+        post.delete()
+        self.run_on_commit()
+
+        self.assertFalse(MediaBlob.objects.filter(name=name).exists())
+        self.assertFalse(storage.exists(name))
+        for variant in variants:
+            self.assertFalse(storage.exists(variant))
+
+    def test_replaced_image_releases_previous_file(self):
+        post = self.create_post()
+        old_name = post.image.name
+
+        post.image = make_image("other.jpg", size=(800, 800))
+        post.save()
+        self.run_on_commit()
+
+        self.assertEqual(self.refs(post.image.name), 1)
+        self.assertEqual(self.refs(old_name), 0)
+        self.assertFalse(post.image.storage.exists(old_name))
+
+    def test_saving_without_image_change_keeps_refs(self):
+        post = self.create_post()
+
+        post.text = "Новый текст"
+        post.save()
+        Post.objects.get(id=post.id).save()
+
+        self.assertEqual(self.refs(post.image.name), 1)
+
+    def generate_variants(self, post):
+        generate_for_post(post.id)
+        post.refresh_from_db()
+        formats = ready_variants(post)["formats"]
+        return [name for image_format in ("webp", "jpeg")
+                for _, name in formats[image_format]]
+
+    def test_hashed_file_is_deleted_without_scanning_posts(self):
+        post = self.create_post()
+        self.generate_variants(post)
+
+        post.delete()
+        with CaptureQueriesContext(connection) as queries:
+            self.run_on_commit()
+
+        self.assertFalse(any("image_variants" in query["sql"]
+                             for query in queries.captured_queries))
+
+    def test_legacy_file_keeps_variants_shared_with_copy(self):
+        """Файл под прежним (не из содержимого) именем делит варианты с
+        копией того же содержимого."""
+        post = self.create_post()
+        variants = self.generate_variants(post)
+        storage = post.image.storage
+        legacy = FileSystemStorage._save(storage, "posts/legacy.jpg",
+                                         make_image())
+        MediaBlob.objects.create(name=legacy, refs=1)
+
+        media.release(legacy)
+        self.run_on_commit()
+
+        self.assertFalse(storage.exists(legacy))
+        for variant in variants:
+            self.assertTrue(storage.exists(variant))
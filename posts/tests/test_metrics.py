@@ -0,0 +1,80 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+from yatube.metrics import Histogram, registry
+
+User = get_user_model()
+
+
+class MetricsTests(TestCase):
+    """ В данном классе расположены тесты для проверки
+            сбора метрик запросов и эндпоинта /metrics"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="TestUser")
+        Post.objects.create(author=cls.user, text="Тестовый текст")
+        cls.guest_client = Client()
+
+    def setUp(self):
+        cache.clear()
+        registry.reset()
+
+    def scrape(self):
+        response = self.guest_client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        return response.content.decode()
+
+    def test_request_is_recorded_by_url_name(self):
+        """Запрос попадает в счётчики и гистограммы с именем URL."""
+        self.guest_client.get(reverse("posts:index"))
+        body = self.scrape()
+        self.assertIn('yatube_http_requests_total{view="posts:index",'
+                      'method="GET",status="200"} 1', body)
+        self.assertIn('yatube_http_request_duration_seconds_bucket'
+                      '{view="posts:index",le="+Inf"} 1', body)
+        self.assertIn('yatube_http_response_size_bytes_count'
+                      '{view="posts:index"} 1', body)
+        self.assertIn('yatube_db_query_duration_seconds_total'
+                      '{view="posts:index"}', body)
+
+    def test_db_queries_are_counted(self):
+        """Число SQL-запросов запроса попадает в гистограмму."""
+        self.guest_client.get(reverse("posts:index"))
+        histogram = registry.queries["posts:index"]
+        self.assertEqual(sum(histogram.counts), 1)
+        self.assertGreater(histogram.sum, 0)
+
+    def test_unknown_url_is_unmatched(self):
+        """Ненайденный адрес не плодит отдельных меток."""
+        self.guest_client.get("/no/such/page/")
+        self.assertIn('view="unmatched",method="GET",status="404"',
+                      self.scrape())
+
+    def test_cache_hits_and_misses(self):
+        """Чтения из кеша делятся на попадания и промахи."""
+        cache.get("metrics-test")
+        cache.set("metrics-test", 1)
+        cache.get("metrics-test")
+        self.assertEqual(registry.cache["miss"], 1)
+        self.assertEqual(registry.cache["hit"], 1)
+        self.assertEqual(cache.get("metrics-absent", "default"), "default")
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Значения интервалов в выводе накопительные."""
+        histogram = Histogram((1, 10))
+        for value in (0.5, 5, 5, 50):
+            histogram.observe(value)
+        self.assertEqual(list(histogram.samples()),
+                         [(1, 1), (10, 3), ("+Inf", 4)])
+        self.assertEqual(histogram.sum, 60.5)
+
+    @override_settings(METRICS_ALLOWED_IPS=["10.0.0.1"])
+    def test_metrics_hidden_from_other_addresses(self):
+        """Метрики отдаются только разрешённым адресам."""
+        response = self.guest_client.get("/metrics")
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,145 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+from posts.pagination import (cached_count, decode_cursor, encode_cursor,
+                              paginate)
+
+User = get_user_model()
+
+
+class CursorPaginatorTests(TestCase):
+    """ В данном классе расположены тесты для проверки
+        постраничной навигации по курсору"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.guest_client = Client()
+        cls.factory = RequestFactory()
+        cls.user = User.objects.create_user(username="TestUser")
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f"Текст{i}") for i in range(25))
+        # bulk_create не трогает auto_now_add-поле по отдельности:
+        # у части постов одинаковое время, порядок решает id
+        cls.posts = list(Post.objects.order_by("-pub_date", "-id"))
+
+    def setUp(self):
+        cache.clear()
+
+    def get_page(self, **params):
+        request = self.factory.get("/", params)
+        return paginate(request, Post.objects.all())[1]
+
+    def test_cursor_round_trip(self):
+        post = self.posts[0]
+        cursor = encode_cursor([post.pub_date, post.id])
+
+        self.assertEqual(decode_cursor(cursor), [post.pub_date, post.id])
+
+    def test_pages_follow_each_other_by_cursor(self):
+        first = self.get_page()
+        second = self.get_page(after=first.next_cursor)
+        third = self.get_page(after=second.next_cursor)
+
+        self.assertEqual(list(first) + list(second) + list(third),
+                         self.posts)
+        self.assertTrue(second.has_previous())
+        self.assertFalse(third.has_next())
+
+    def test_before_cursor_returns_previous_page(self):
+        first = self.get_page()
+        second = self.get_page(after=first.next_cursor)
+
+        previous = self.get_page(before=second.previous_cursor)
+
+        self.assertEqual(list(previous), list(first))
+        self.assertFalse(previous.has_previous())
+        self.assertTrue(previous.has_next())
+
+    def test_old_page_links_keep_working(self):
+        page = self.get_page(page=2)
+
+        self.assertEqual(page.number, 2)
+        self.assertEqual(list(page), self.posts[10:20])
+
+    def test_broken_cursor_falls_back_to_first_page(self):
+        page = self.get_page(after="broken")
+
+        self.assertEqual(list(page), self.posts[:10])
+
+    def test_cursor_of_wrong_types_falls_back_to_first_page(self):
+        for values in (["abc", "x"], [None, None],
+                       ["2020-01-01T00:00:00", "zz"], [1, 2], [{}, 1],
+                       ["2020-01-01T00:00:00+00:00", 10 ** 30],
+                       ["2020-01-01T00:00:00+00:00", 1.5e308],
+                       ["2020-01-01T00:00:00+00:00", float("inf")],
+                       ["2020-01-01T00:00:00+00:00", float("nan")],
+                       [10 ** 30, 1]):
+            for direction in ("after", "before"):
+                with self.subTest(values=values, direction=direction):
+                    page = self.get_page(**{direction:
+                                            encode_cursor(values)})
+
+                    self.assertEqual(list(page), self.posts[:10])
+
+    def test_deep_page_costs_one_query_without_count(self):
+        cursor = encode_cursor([self.posts[19].pub_date, self.posts[19].id])
+
+        with self.assertNumQueries(1):
+            posts = list(self.get_page(after=cursor))
+
+        self.assertEqual(posts, self.posts[20:])
+
+    def test_page_is_not_fetched_until_used(self):
+        with self.assertNumQueries(0):
+            page = self.get_page(page=2)
+
+        self.assertEqual(page.key, "page:2")
+
+    @override_settings(PAGINATE_WINDOW=1)
+    def test_paginator_renders_cursor_links(self):
+        response = self.guest_client.get(reverse("posts:index"))
+        page = response.context.get("page")
+
+        self.assertContains(response, f'href="?{page.next_query}"')
+        self.assertContains(response, 'href="?page=2"')
+        self.assertNotContains(response, "?page=3")
+
+    @override_settings(PAGINATE_WINDOW=2, PAGINATE_OFFSET_PAGES=10)
+    def test_window_is_limited_around_current_page(self):
+        request = self.factory.get("/", {"page": 5})
+        paginator, page = paginate(request, Post.objects.all(), count=1000)
+
+        self.assertEqual([link["number"] for link in page.window],
+                         [3, 4, 5, 6, 7])
+        self.assertEqual(paginator.num_pages, 100)
+
+    def test_window_stops_at_last_page(self):
+        page = self.get_page(page=3)
+
+        self.assertEqual([link["number"] for link in page.window],
+                         [1, 2, 3])
+
+    def test_count_is_cached_and_lazy(self):
+        request = self.factory.get("/")
+        with self.assertNumQueries(0):
+            paginator, page = paginate(
+                request, Post.objects.all(),
+                count=cached_count("test", Post.objects))
+
+        with self.assertNumQueries(1):
+            self.assertEqual(paginator.count, 25)
+        paginator, page = paginate(request, Post.objects.all(),
+                                   count=cached_count("test", Post.objects))
+        with self.assertNumQueries(0):
+            self.assertEqual(paginator.count, 25)
+
+    def test_cursor_page_links_to_first_page(self):
+        first = self.get_page()
+        response = self.guest_client.get(reverse("posts:index"),
+                                         {"after": first.next_cursor})
+
+        self.assertContains(response, 'href="?"')
+        self.assertContains(response, "Всего записей: 25")
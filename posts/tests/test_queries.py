@@ -0,0 +1,191 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import lookups
+from posts.models import Comment, Follow, Group, Post
+from posts.urls import app_name, urlpatterns
+
+User = get_user_model()
+
+# Бюджет запросов к БД на одну страницу, включая сессию, пользователя и
+# точки сохранения транзакций. Страницы записи дополнительно отмечают
+# изменение лент подписчиков (posts.feed.touch) и поднимают версии страниц
+# профиля и групп; страницы поста, профиля и группы сначала читают версию
+# для ETag (posts.conditional). Ленты на холодном кеше один раз считают
+# записи для навигации (posts.pagination.cached_count). Кнопки подписки на
+# карточках выбирают подписки зрителя одним запросом (posts.relationships)
+# и на главной, где список постов из общего кеша. Группа и пользователь из
+# адреса берутся из posts.lookups без запросов
+QUERY_BUDGETS = {
+    "posts:index": 6,
+    "posts:follow_index": 6,
+    "posts:group": 6,
+    "posts:profile": 6,
+    "posts:search": 4,
+    "posts:post": 7,
+    "posts:post_comments": 2,
+    "posts:new_post": 5,
+    "posts:post_edit": 6,
+    "posts:post_delete": 19,
+    "posts:add_comment": 9,
+    "posts:profile_follow": 15,
+    "posts:profile_unfollow": 12,
+}
+
+
+class QueryBudgetTests(TestCase):
+    """ В данном классе расположены тесты, которые проверяют, что страницы
+        укладываются в бюджет запросов и не зависят от размера страницы"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user_author = User.objects.create_user(username="TestUser_author")
+        cls.user_reader = User.objects.create_user(username="TestUser_reader")
+        cls.group = Group.objects.create(title="Тестовая группа",
+                                         slug="test-slug",
+                                         description="Тестовое описание")
+        Follow.objects.create(user=cls.user_reader, author=cls.user_author)
+        cls.post = cls.create_posts(1)
+
+        cls.reader_client = Client()
+        cls.reader_client.force_login(cls.user_reader)
+        cls.author_client = Client()
+        cls.author_client.force_login(cls.user_author)
+
+    @classmethod
+    def create_posts(cls, count):
+        for i in range(count):
+            post = Post.objects.create(author=cls.user_author,
+                                       text=f"Тестовый текст {i}",
+                                       group=cls.group)
+            Comment.objects.create(author=cls.user_reader, post=post,
+                                   text="Текст комментария")
+        return post
+
+    def setUp(self):
+        cache.clear()
+        # Группа и пользователи - горячие записи: они уже в posts.lookups
+        lookups.local.clear()
+        lookups.group_by_slug(self.group.slug)
+        for user in (self.user_author, self.user_reader):
+            lookups.user_by_username(user.username)
+
+    def tearDown(self):
+        lookups.local.clear()
+
+    def count_queries(self, client, url, method="get", data=None):
+        with CaptureQueriesContext(connection) as queries:
+            getattr(client, method)(url, data)
+        return len(queries)
+
+    def assert_within_budget(self, name, client, url, method="get",
+                             data=None):
+        count = self.count_queries(client, url, method, data)
+        self.assertLessEqual(
+            count, QUERY_BUDGETS[name],
+            f"{name} выполнила {count} запросов при бюджете "
+            f"{QUERY_BUDGETS[name]}")
+        return count
+
+    def feed_urls(self):
+        return {
+            "posts:index": reverse("posts:index"),
+            "posts:follow_index": reverse("posts:follow_index"),
+            "posts:group": reverse("posts:group",
+                                   kwargs={"slug": self.group.slug}),
+            "posts:profile": reverse(
+                "posts:profile",
+                kwargs={"username": self.user_author.username}),
+            "posts:search": reverse("posts:search") + "?q=текст",
+        }
+
+    def test_every_view_has_a_budget(self):
+        names = {f"{app_name}:{pattern.name}" for pattern in urlpatterns}
+
+        self.assertEqual(names, set(QUERY_BUDGETS))
+
+    def test_feed_pages_do_not_depend_on_page_size(self):
+        # Начинаем с двух страниц: навигация со счётчиком уже выводится
+        self.create_posts(settings.POSTS_PER_PAGE)
+        before = {}
+        for name, url in self.feed_urls().items():
+            before[name] = self.count_queries(self.reader_client, url)
+
+        self.create_posts(15)
+        cache.clear()
+
+        for name, url in self.feed_urls().items():
+            with self.subTest(name=name):
+                count = self.assert_within_budget(name, self.reader_client,
+                                                  url)
+                self.assertEqual(count, before[name])
+
+    def test_post_page_is_within_budget(self):
+        self.create_posts(1)
+        Comment.objects.bulk_create(
+            Comment(author=self.user_reader, post=self.post, text="Текст")
+            for _ in range(10))
+
+        self.assert_within_budget(
+            "posts:post", self.reader_client,
+            reverse("posts:post",
+                    kwargs={"username": self.user_author.username,
+                            "post_id": self.post.id}))
+
+    @override_settings(COMMENTS_PER_PAGE=5)
+    def test_post_page_does_not_depend_on_comments(self):
+        url = reverse("posts:post",
+                      kwargs={"username": self.user_author.username,
+                              "post_id": self.post.id})
+        few = self.count_queries(self.reader_client, url)
+        Comment.objects.bulk_create(
+            Comment(author=self.user_reader, post=self.post, text="Текст")
+            for _ in range(30))
+        cache.clear()
+
+        self.assertEqual(self.count_queries(self.reader_client, url), few)
+
+    @override_settings(COMMENTS_PER_PAGE=5)
+    def test_comment_chunks_are_within_budget(self):
+        Comment.objects.bulk_create(
+            Comment(author=self.user_reader, post=self.post, text="Текст")
+            for _ in range(30))
+        response = self.reader_client.get(
+            reverse("posts:post",
+                    kwargs={"username": self.user_author.username,
+                            "post_id": self.post.id}))
+        next_url = "{}?{}".format(response.context["comments_url"],
+                                  response.context["comments"].next_query)
+
+        self.assert_within_budget("posts:post_comments", self.reader_client,
+                                  next_url)
+
+    def test_write_pages_are_within_budget(self):
+        post_kwargs = {"username": self.user_author.username,
+                       "post_id": self.post.id}
+        author_kwargs = {"username": self.user_author.username}
+        cases = (
+            ("posts:new_post", self.author_client,
+             reverse("posts:new_post"), "get", None),
+            ("posts:post_edit", self.author_client,
+             reverse("posts:post_edit", kwargs=post_kwargs), "get", None),
+            ("posts:add_comment", self.reader_client,
+             reverse("posts:add_comment", kwargs=post_kwargs), "post",
+             {"text": "Новый комментарий"}),
+            ("posts:profile_unfollow", self.reader_client,
+             reverse("posts:profile_unfollow", kwargs=author_kwargs),
+             "get", None),
+            ("posts:profile_follow", self.reader_client,
+             reverse("posts:profile_follow", kwargs=author_kwargs),
+             "get", None),
+            ("posts:post_delete", self.author_client,
+             reverse("posts:post_delete", kwargs=post_kwargs), "get", None),
+        )
+        for name, client, url, method, data in cases:
+            with self.subTest(name=name):
+                self.assert_within_budget(name, client, url, method, data)
@@ -0,0 +1,105 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test import Client, RequestFactory, TestCase
+from django.urls import reverse
+
+from posts.models import Follow, Group, Post
+from posts.relationships import Relationships, relationships_for
+
+User = get_user_model()
+
+
+class RelationshipsTests(TestCase):
+    """ В данном классе расположены тесты для проверки
+            ответов о подписках зрителя и их кеширования"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username="TestUser_reader")
+        cls.authors = [User.objects.create_user(username=f"TestUser_{i}")
+                       for i in range(3)]
+        Follow.objects.create(user=cls.reader, author=cls.authors[0])
+        Follow.objects.create(user=cls.reader, author=cls.authors[2])
+
+    def setUp(self):
+        cache.clear()
+
+    def author_ids(self):
+        return [author.id for author in self.authors]
+
+    def test_follows_is_one_query_then_memoized(self):
+        relationships = Relationships(self.reader)
+        with self.assertNumQueries(1):
+            self.assertTrue(relationships.follows(self.authors[0].id))
+        with self.assertNumQueries(0):
+            self.assertTrue(relationships.follows(self.authors[0].id))
+
+    def test_followed_among_is_one_query(self):
+        relationships = Relationships(self.reader)
+        with self.assertNumQueries(1):
+            followed = relationships.followed_among(self.author_ids())
+        self.assertEqual(followed, {self.authors[0].id, self.authors[2].id})
+        with self.assertNumQueries(0):
+            self.assertFalse(relationships.follows(self.authors[1].id))
+
+    def test_anonymous_follows_nobody_without_queries(self):
+        with self.assertNumQueries(0):
+            self.assertFalse(
+                Relationships(AnonymousUser()).follows(self.authors[0].id))
+
+    def test_one_service_per_request(self):
+        request = RequestFactory().get("/")
+        request.user = self.reader
+        self.assertIs(relationships_for(request), relationships_for(request))
+
+
+class FollowButtonsTests(TestCase):
+    """ В данном классе расположены тесты для проверки
+            кнопок подписки на карточках постов"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username="TestUser_reader")
+        cls.author = User.objects.create_user(username="TestUser_author")
+        cls.group = Group.objects.create(title="Тестовая группа",
+                                         slug="test-slug",
+                                         description="Тестовое описание")
+        Post.objects.create(author=cls.author, text="Тестовый текст",
+                            group=cls.group)
+
+        cls.reader_client = Client()
+        cls.reader_client.force_login(cls.reader)
+        cls.follow_url = reverse("posts:profile_follow",
+                                 args=[cls.author.username])
+        cls.unfollow_url = reverse("posts:profile_unfollow",
+                                   args=[cls.author.username])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cards_show_current_follow_state(self):
+        """Кнопка на карточке сменяется сразу после (от)подписки."""
+        for url in (reverse("posts:index"),
+                    reverse("posts:group", args=[self.group.slug])):
+            with self.subTest(url=url):
+                self.assertContains(self.reader_client.get(url),
+                                    self.follow_url)
+                self.reader_client.get(self.follow_url)
+                self.assertContains(self.reader_client.get(url),
+                                    self.unfollow_url)
+                self.reader_client.get(self.unfollow_url)
+                self.assertContains(self.reader_client.get(url),
+                                    self.follow_url)
+
+    def test_follow_returns_to_page(self):
+        response = self.reader_client.get(self.follow_url + "?next=/group/")
+        self.assertRedirects(response, "/group/",
+                             fetch_redirect_response=False)
+
+    def test_follow_ignores_foreign_next(self):
+        response = self.reader_client.get(
+            self.follow_url + "?next=https://example.com/")
+        self.assertRedirects(response,
+                             reverse("posts:profile",
+                                     args=[self.author.username]))
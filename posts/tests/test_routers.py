@@ -0,0 +1,108 @@
+import os
+import sqlite3
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import (RequestFactory, SimpleTestCase,
+                         TransactionTestCase, override_settings)
+
+from posts.models import Post
+from yatube import routers
+
+User = get_user_model()
+REPLICAS = ["replica1", "replica2"]
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS, REPLICA_PIN_SECONDS=10)
+class RouterTests(SimpleTestCase):
+    """ В данном классе расположены тесты для проверки
+            маршрутизации чтения на реплики"""
+    def setUp(self):
+        self.router = routers.PrimaryReplicaRouter()
+        self.factory = RequestFactory()
+        self.addCleanup(routers.reset)
+
+    def run_request(self, request, view):
+        routed = []
+
+        def get_response(request):
+            routed.extend(view())
+            return HttpResponse()
+
+        middleware = routers.ReplicaPinMiddleware(get_response)
+        return middleware(request), routed
+
+    def test_reads_outside_requests_use_primary(self):
+        """Команды и фоновые потоки читают из основной базы."""
+        self.assertEqual(self.router.db_for_read(Post), "default")
+
+    def test_safe_request_reads_from_replica(self):
+        """GET читает с реплики и не получает cookie."""
+        response, routed = self.run_request(
+            self.factory.get("/"), lambda: [self.router.db_for_read(Post)])
+        self.assertIn(routed[0], REPLICAS)
+        self.assertNotIn(routers.PIN_COOKIE, response.cookies)
+
+    def test_sessions_are_read_from_primary(self):
+        """Сессии всегда читаются из основной базы."""
+        _, routed = self.run_request(
+            self.factory.get("/"), lambda: [self.router.db_for_read(Session)])
+        self.assertEqual(routed, ["default"])
+
+    def test_write_pins_rest_of_request_and_client(self):
+        """После записи запрос и следующие запросы клиента читают из
+        основной базы."""
+        def view():
+            return [self.router.db_for_write(Post),
+                    self.router.db_for_read(Post)]
+        response, routed = self.run_request(self.factory.get("/"), view)
+        self.assertEqual(routed, ["default", "default"])
+        cookie = response.cookies[routers.PIN_COOKIE]
+        self.assertEqual(cookie["max-age"], 10)
+
+        request = self.factory.get("/")
+        request.COOKIES[routers.PIN_COOKIE] = "1"
+        _, routed = self.run_request(
+            request, lambda: [self.router.db_for_read(Post)])
+        self.assertEqual(routed, ["default"])
+
+    def test_unsafe_request_reads_from_primary(self):
+        """POST читает из основной базы."""
+        _, routed = self.run_request(
+            self.factory.post("/"), lambda: [self.router.db_for_read(Post)])
+        self.assertEqual(routed, ["default"])
+
+    def test_replicas_are_not_migrated(self):
+        """Схема реплик приходит копией, а не миграциями."""
+        self.assertFalse(self.router.allow_migrate("replica1", "posts"))
+        self.assertIsNone(self.router.allow_migrate("default", "posts"))
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_middleware_is_off_without_replicas(self):
+        """Без реплик middleware не подключается."""
+        with self.assertRaises(routers.MiddlewareNotUsed):
+            routers.ReplicaPinMiddleware(lambda request: HttpResponse())
+
+
+class SyncReplicasTests(TransactionTestCase):
+    """ В данном классе расположены тесты для проверки
+            копирования основной базы в файлы реплик"""
+    def test_copy_contains_primary_data(self):
+        """Реплика после синхронизации содержит свежие записи."""
+        user = User.objects.create_user(username="TestUser")
+        post = Post.objects.create(author=user, text="Тестовый текст")
+        handle, path = tempfile.mkstemp(suffix=".sqlite3")
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+
+        call_command("sync_replicas", to=[path], stdout=StringIO())
+
+        replica = sqlite3.connect(path)
+        self.addCleanup(replica.close)
+        row = replica.execute("SELECT text FROM posts_post WHERE id = ?",
+                              (post.id,)).fetchone()
+        self.assertEqual(row, ("Тестовый текст",))
@@ -0,0 +1,100 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Group, Post
+from posts.search import match_expression, search_posts
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    """ В данном классе расположены тесты для проверки
+            полнотекстового поиска по постам"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.guest_client = Client()
+        cls.user = User.objects.create_user(username="TestUser")
+        cls.user_another = User.objects.create_user(username="TestUser_2")
+        cls.group = Group.objects.create(title="Тестовая группа",
+                                         slug="test-slug",
+                                         description="Тестовое описание")
+        cls.post_cats = Post.objects.create(
+            author=cls.user, group=cls.group,
+            text="Коты спят. Коты едят. Коты снова спят.")
+        cls.post_mixed = Post.objects.create(
+            author=cls.user_another,
+            text="Собаки гуляют, а коты смотрят в окно")
+        cls.post_dogs = Post.objects.create(author=cls.user,
+                                            text="Собаки лают")
+
+    def setUp(self):
+        cache.clear()
+
+    def search(self, query, **params):
+        response = self.guest_client.get(reverse("posts:search"),
+                                         {"q": query, **params})
+        return list(response.context["page"])
+
+    def test_results_are_ranked_by_relevance(self):
+        self.assertEqual(self.search("коты"),
+                         [self.post_cats, self.post_mixed])
+
+    def test_last_word_matches_as_prefix(self):
+        self.assertEqual(self.search("соба"),
+                         [self.post_dogs, self.post_mixed])
+
+    def test_results_are_filtered_by_group_and_author(self):
+        self.assertEqual(self.search("коты", group=self.group.slug),
+                         [self.post_cats])
+        self.assertEqual(self.search("коты", author="TestUser_2"),
+                         [self.post_mixed])
+
+    def test_index_follows_create_edit_and_delete(self):
+        post = Post.objects.create(author=self.user, text="Попугай поёт")
+        self.assertEqual(self.search("попугай"), [post])
+
+        post.text = "Канарейка поёт"
+        post.save()
+        self.assertEqual(self.search("попугай"), [])
+        self.assertEqual(self.search("канарейка"), [post])
+
+        post.delete()
+        self.assertEqual(self.search("канарейка"), [])
+
+    def test_fts_syntax_in_query_is_escaped(self):
+        self.assertEqual(match_expression('коты" OR NEAR(*'),
+                         '"коты" "or" "near"*')
+        self.assertEqual(self.search('"'), [])
+
+    def test_results_are_paginated_by_rank(self):
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f"Хомяк номер {i}")
+            for i in range(25))
+        expected = list(search_posts("хомяк"))
+
+        first = self.guest_client.get(reverse("posts:search"),
+                                      {"q": "хомяк"}).context["page"]
+        second = self.guest_client.get(
+            reverse("posts:search"),
+            {"q": "хомяк", "after": first.next_cursor}).context["page"]
+
+        self.assertEqual(list(first) + list(second), expected[:20])
+
+    def test_rebuild_command_restores_lost_triggers(self):
+        with connection.cursor() as cursor:
+            cursor.execute("DROP TRIGGER posts_post_fts_insert")
+        post = Post.objects.create(author=self.user, text="Ёж бежит")
+        self.assertEqual(self.search("ёж"), [])
+
+        call_command("rebuild_search_index", stdout=StringIO())
+
+        self.assertEqual(self.search("ёж"), [post])
+        post_new = Post.objects.create(author=self.user, text="Ёж спит")
+        self.assertIn(post_new, self.search("ёж"))
@@ -0,0 +1,85 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+from yatube import slow_queries
+
+User = get_user_model()
+
+
+class NormalizeTests(SimpleTestCase):
+    """ В данном классе расположены тесты для проверки
+            нормализации SQL в журнале медленных запросов"""
+    def test_values_are_replaced(self):
+        """Литералы и параметры заменяются, списки IN сворачиваются."""
+        self.assertEqual(
+            slow_queries.normalize(
+                'SELECT "posts_post"."id" FROM "posts_post"\n'
+                "WHERE text = 'a''b' AND id IN (%s, %s, %s) LIMIT 21"),
+            'SELECT "posts_post"."id" FROM "posts_post" '
+            "WHERE text = ? AND id IN (...) LIMIT ?")
+
+    def test_same_shape_same_fingerprint(self):
+        """Запросы одной формы с разными значениями дают один отпечаток."""
+        first = slow_queries.normalize("SELECT * FROM t WHERE id IN (%s)")
+        second = slow_queries.normalize(
+            "SELECT * FROM t WHERE id IN (%s, %s)")
+        self.assertEqual(slow_queries.fingerprint(first),
+                         slow_queries.fingerprint(second))
+
+
+class SlowQueryLogTests(TestCase):
+    """ В данном классе расположены тесты для проверки
+            журнала медленных запросов и команды slow_queries"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="TestUser")
+        Post.objects.create(author=cls.user, text="Тестовый текст")
+
+    def setUp(self):
+        slow_queries.reset_plans()
+        handle, self.log = tempfile.mkstemp(suffix=".log")
+        os.close(handle)
+        self.addCleanup(os.remove, self.log)
+        settings = override_settings(SLOW_QUERY_THRESHOLD_MS=0,
+                                     SLOW_QUERY_LOG=self.log)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_queries_are_logged_with_plan(self):
+        """Запросы страницы пишутся с именем URL и планом SQLite."""
+        Client().get(reverse("posts:index"))
+        entries = list(slow_queries.read(self.log))
+        self.assertTrue(entries)
+        entry = next(entry for entry in entries
+                     if "posts_post" in entry["sql"])
+        self.assertEqual(entry["view"], "posts:index")
+        self.assertNotIn("%s", entry["sql"])
+        self.assertGreaterEqual(entry["duration_ms"], 0)
+        self.assertTrue(entry["plan"])
+
+    def test_threshold_filters_fast_queries(self):
+        """Запросы быстрее порога в журнал не попадают."""
+        with override_settings(SLOW_QUERY_THRESHOLD_MS=10 ** 6):
+            Client().get(reverse("posts:index"))
+        self.assertEqual(list(slow_queries.read(self.log)), [])
+
+    def test_command_prints_top_offenders(self):
+        """Команда сводит записи по отпечаткам."""
+        client = Client()
+        client.get(reverse("posts:index"))
+        client.get(reverse("posts:index"))
+        groups = slow_queries.aggregate(slow_queries.read(self.log))
+        self.assertTrue(any(group["count"] >= 2 for group in groups))
+
+        out = StringIO()
+        call_command("slow_queries", top=3, view="posts:index", stdout=out)
+        self.assertIn("posts:index", out.getvalue())
+        self.assertIn("раз, всего", out.getvalue())
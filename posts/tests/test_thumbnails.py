@@ -0,0 +1,140 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts.models import Post
+from posts.thumbnails import generate_for_post, ready_variants
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def make_image(name="picture.jpg", size=(1200, 800)):
+    content = BytesIO()
+    Image.new("RGB", size, (200, 40, 40)).save(content, "JPEG")
+    return SimpleUploadedFile(name, content.getvalue(),
+                              content_type="image/jpeg")
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, THUMBNAIL_ASYNC=False)
+class ThumbnailTests(TestCase):
+    """ В данном классе расположены тесты для проверки
+            заблаговременного создания миниатюр"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="TestUser")
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.user)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(author=self.user,
+                                        text="Тестовый текст",
+                                        image=make_image())
+        self.post_url = reverse("posts:post",
+                                kwargs={"username": self.user.username,
+                                        "post_id": self.post.id})
+
+    def run_on_commit(self):
+        # TestCase не фиксирует транзакцию - вызываем отложенное вручную
+        callbacks = connection.run_on_commit
+        connection.run_on_commit = []
+        for _, callback in callbacks:
+            callback()
+
+    def test_page_shows_placeholder_until_thumbnail_is_ready(self):
+        response = self.authorized_client.get(self.post_url)
+
+        self.assertIsNone(ready_variants(self.post))
+        self.assertContains(response, "post-image-placeholder")
+
+    def test_variants_are_created_for_every_width_and_format(self):
+        generate_for_post(self.post.id)
+        self.post.refresh_from_db()
+
+        manifest = ready_variants(self.post)
+        storage = self.post.image.storage
+        for image_format in ("webp", "jpeg"):
+            variants = manifest["formats"][image_format]
+            self.assertEqual([width for width, _ in variants],
+                             list(settings.POST_IMAGE_WIDTHS))
+            for width, name in variants:
+                self.assertIn(manifest["hash"], name)
+                with Image.open(storage.open(name)) as image:
+                    self.assertEqual(image.format, image_format.upper())
+                    self.assertEqual(image.width, width)
+
+        webp, jpeg = (manifest["formats"][key][-1][1]
+                      for key in ("webp", "jpeg"))
+        self.assertLess(storage.size(webp), storage.size(jpeg))
+
+    def test_same_content_reuses_variants(self):
+        other = Post.objects.create(author=self.user, text="Копия",
+                                    image=make_image("copy.jpg"))
+
+        generate_for_post(self.post.id)
+        generate_for_post(other.id)
+        self.post.refresh_from_db()
+        other.refresh_from_db()
+
+        self.assertEqual(ready_variants(self.post)["formats"],
+                         ready_variants(other)["formats"])
+
+    def test_picture_replaces_placeholder(self):
+        self.authorized_client.get(self.post_url)
+
+        generate_for_post(self.post.id)
+        response = self.authorized_client.get(self.post_url)
+
+        self.assertNotContains(response, "post-image-placeholder")
+        self.assertContains(response, '<source type="image/webp"')
+        for width in settings.POST_IMAGE_WIDTHS:
+            self.assertContains(response, f"-{width}.webp {width}w")
+            self.assertContains(response, f"-{width}.jpg {width}w")
+
+    def test_replaced_image_shows_placeholder_until_ready(self):
+        generate_for_post(self.post.id)
+        self.post.refresh_from_db()
+
+        self.post.image = make_image("other.jpg", size=(800, 800))
+        self.post.save()
+
+        self.assertIsNone(ready_variants(self.post))
+
+    def test_new_post_queues_thumbnails_after_commit(self):
+        self.authorized_client.post(reverse("posts:new_post"),
+                                    {"text": "Новый пост",
+                                     "image": make_image("new.jpg")})
+        post = Post.objects.latest("id")
+        self.assertIsNone(ready_variants(post))
+
+        self.run_on_commit()
+
+        post.refresh_from_db()
+        self.assertIsNotNone(ready_variants(post))
+
+    def test_command_backfills_missing_thumbnails(self):
+        out = StringIO()
+
+        call_command("generate_thumbnails", processes=1, stdout=out)
+
+        self.post.refresh_from_db()
+        self.assertIsNotNone(ready_variants(self.post))
+        self.assertIn("1", out.getvalue())
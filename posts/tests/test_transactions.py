@@ -0,0 +1,71 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import OperationalError, connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from posts.transactions import atomic_retry
+
+
+@override_settings(DB_RETRY_ATTEMPTS=3, DB_RETRY_DELAY=0)
+class AtomicRetryTests(TransactionTestCase):
+    """ В данном классе расположены тесты для проверки
+            повтора транзакций записи на занятой базе"""
+    def failing(self, failures, message="database is locked"):
+        calls = []
+
+        @atomic_retry
+        def write():
+            calls.append(connection.in_atomic_block)
+            if len(calls) <= failures:
+                raise OperationalError(message)
+            return "ok"
+        return write, calls
+
+    def test_locked_transaction_is_retried(self):
+        """Транзакция, упавшая на блокировке, начинается заново."""
+        write, calls = self.failing(2)
+        self.assertEqual(write(), "ok")
+        self.assertEqual(calls, [True, True, True])
+
+    def test_attempts_are_limited(self):
+        """После DB_RETRY_ATTEMPTS попыток ошибка отдаётся наружу."""
+        write, calls = self.failing(3)
+        with self.assertRaises(OperationalError):
+            write()
+        self.assertEqual(len(calls), 3)
+
+    def test_other_errors_are_not_retried(self):
+        """Прочие ошибки базы не повторяются."""
+        write, calls = self.failing(1, "no such table: nowhere")
+        with self.assertRaises(OperationalError):
+            write()
+        self.assertEqual(len(calls), 1)
+
+    def test_nested_transaction_is_not_retried(self):
+        """Внутри открытой транзакции повтор не помог бы."""
+        write, calls = self.failing(1)
+        with transaction.atomic():
+            with self.assertRaises(OperationalError):
+                write()
+        self.assertEqual(len(calls), 1)
+
+
+class SqliteProfileTests(TestCase):
+    """ В данном классе расположены тесты для проверки
+            настроек соединения SQLite и бенчмарка bench_sqlite"""
+    def test_pragmas_are_applied(self):
+        """PRAGMA из OPTIONS выполняются на соединении."""
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA busy_timeout")
+            self.assertEqual(cursor.fetchone()[0], 5000)
+            cursor.execute("PRAGMA cache_size")
+            self.assertEqual(cursor.fetchone()[0], -20000)
+
+    def test_bench_sqlite_reports_both_profiles(self):
+        """Бенчмарк сравнивает профиль по умолчанию и настроенный."""
+        out = StringIO()
+        call_command("bench_sqlite", readers=1, writers=1, seconds=0.1,
+                     posts=100, stdout=out)
+        self.assertIn("по умолчанию", out.getvalue())
+        self.assertIn("WAL и PRAGMA", out.getvalue())
@@ -0,0 +1,144 @@
+"""Варианты картинок постов создаются заранее, а не в запросе.
+
+После сохранения поста (new_post, post_edit) картинка ставится в пул
+потоков. Для каждой ширины из POST_IMAGE_WIDTHS создаётся кадр с
+пропорциями карточки в каждом формате из POST_IMAGE_FORMATS (WebP и
+запасной JPEG). Имена вариантов строятся из хеша содержимого картинки,
+поэтому их можно отдавать с вечным кешированием.
+
+Список вариантов хранится в Post.image_variants (манифест JSON), шаблон
+строит по нему <picture> со srcset. Пока манифеста нет или он от прежней
+картинки, выводится заглушка. Готовый манифест увеличивает версию поста,
+сбрасывая кеш его карточки.
+"""
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from PIL import Image, ImageOps
+
+from . import counters, feed
+from .models import Post
+from .storage import name_digest
+from .transactions import atomic_retry
+
+VARIANTS_DIR = "posts/variants"
+
+_executor = None
+
+
+def variant_height(width):
+    ratio_width, ratio_height = settings.POST_IMAGE_RATIO
+    return round(width * ratio_height / ratio_width)
+
+
+def file_digest(image_name, storage=default_storage):
+    # Имя из хранилища по содержимому уже содержит его SHA-256
+    digest = name_digest(image_name)
+    if digest is None:
+        sha256 = hashlib.sha256()
+        with storage.open(image_name, "rb") as source:
+            for chunk in source.chunks():
+                sha256.update(chunk)
+        digest = sha256.hexdigest()
+    return digest[:16]
+
+
+def _variants(digest):
+    for width in settings.POST_IMAGE_WIDTHS:
+        for image_format, extension, quality in settings.POST_IMAGE_FORMATS:
+            name = f"{VARIANTS_DIR}/{digest}-{width}.{extension}"
+            yield width, image_format, quality, name
+
+
+def variant_names(digest):
+    return [name for *_, name in _variants(digest)]
+
+
+def render_variants(image_name, storage=default_storage):
+    """Создаёт недостающие варианты картинки, возвращает манифест.
+
+    Варианты одинакового содержимого общие, поэтому картинка, загруженная
+    повторно, не декодируется.
+    """
+    digest = file_digest(image_name, storage)
+    image = None
+    frames = {}
+    formats = {}
+    for width, image_format, quality, name in _variants(digest):
+        if not storage.exists(name):
+            if image is None:
+                with storage.open(image_name, "rb") as source:
+                    with Image.open(source) as original:
+                        image = (ImageOps.exif_transpose(original)
+                                 .convert("RGB"))
+            if width not in frames:
+                frames[width] = ImageOps.fit(
+                    image, (width, variant_height(width)), Image.LANCZOS)
+            content = BytesIO()
+            frames[width].save(content, image_format, quality=quality)
+            storage.save(name, ContentFile(content.getvalue()))
+        formats.setdefault(image_format.lower(), []).append([width, name])
+
+    return {"source": image_name, "hash": digest, "formats": formats}
+
+
+def ready_variants(post):
+    """Манифест вариантов картинки поста или None, пока их создают."""
+    if not post.image or not post.image_variants:
+        return None
+    manifest = json.loads(post.image_variants)
+    if manifest["source"] != post.image.name:
+        return None
+    return manifest
+
+
+@atomic_retry
+def save_variants(post_id, manifest):
+    # Картинку могли заменить, пока создавались варианты прежней
+    updated = Post.objects.filter(id=post_id, image=manifest["source"]).update(
+        image_variants=json.dumps(manifest), version=F("version") + 1)
+    if updated:
+        counters.bump_page_versions(post_id=post_id)
+    return updated
+
+
+def generate_for_post(post_id):
+    try:
+        post = (Post.objects.filter(id=post_id)
+                .only("author", "image", "image_variants").first())
+        if post is None or not post.image or ready_variants(post):
+            return
+        if save_variants(post_id, render_variants(post.image.name)):
+            feed.invalidate(post.author_id)
+    finally:
+        close_old_connections()
+
+
+def _executor_instance():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            thread_name_prefix="thumbnails")
+    return _executor
+
+
+def _submit(post_id):
+    if settings.THUMBNAIL_ASYNC:
+        _executor_instance().submit(generate_for_post, post_id)
+    else:
+        generate_for_post(post_id)
+
+
+def queue(post):
+    """Ставит создание вариантов в очередь после фиксации транзакции."""
+    if post.image:
+        transaction.on_commit(partial(_submit, post.id))
@@ -0,0 +1,52 @@
+"""Транзакции записи, повторяемые при занятой базе.
+
+SQLite допускает одного писателя. busy_timeout заставляет ждать его, но
+транзакция, начатая чтением, не может дождаться записи по снимку, который
+успел устареть, и сразу получает "database is locked". Такую транзакцию
+можно только начать заново - это и делает atomic_retry.
+"""
+import random
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.db import OperationalError, transaction
+
+
+def is_locked(error):
+    """Ошибка из-за того, что базу держит другой писатель."""
+    message = str(error).lower()
+    return "database is locked" in message or "database is busy" in message
+
+
+def retry_delays():
+    """Паузы между попытками: экспонента со случайным разбросом, чтобы
+    повторы разных процессов не сталкивались снова."""
+    delay = settings.DB_RETRY_DELAY
+    for _ in range(settings.DB_RETRY_ATTEMPTS - 1):
+        yield delay * random.uniform(0.5, 1.5)
+        delay *= 2
+
+
+def atomic_retry(func):
+    """transaction.atomic, который повторяет всю функцию при блокировке.
+
+    Внутри уже открытой транзакции повторять бессмысленно - её держит
+    внешний блок, поэтому там функция выполняется один раз.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if transaction.get_connection().in_atomic_block:
+            with transaction.atomic():
+                return func(*args, **kwargs)
+        for delay in retry_delays():
+            try:
+                with transaction.atomic():
+                    return func(*args, **kwargs)
+            except OperationalError as error:
+                if not is_locked(error):
+                    raise
+            time.sleep(delay)
+        with transaction.atomic():
+            return func(*args, **kwargs)
+    return wrapper
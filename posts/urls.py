@@ -9,12 +9,15 @@ urlpatterns = [
     path("follow/", views.follow_index, name="follow_index"),
     path('group/<slug:slug>/', views.group_posts, name='group'),
     path('new/', views.new_post, name='new_post'),
+    path('search/', views.search, name='search'),
     path('<str:username>/', views.profile, name='profile'),
     path('<str:username>/<int:post_id>/', views.post_view, name='post'),
     path('<str:username>/<int:post_id>/edit/',
          views.post_edit, name='post_edit'),
     path('<str:username>/<int:post_id>/delete/',
          views.post_delete, name='post_delete'),
+    path("<str:username>/<int:post_id>/comments/",
+         views.post_comments, name="post_comments"),
     path("<str:username>/<int:post_id>/comment/",
          views.add_comment, name="add_comment"),
     path("<str:username>/follow/", views.profile_follow,
@@ -1,83 +1,169 @@
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404, redirect
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
-from django.views.decorators.http import require_http_methods
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_http_methods
+from django.views.decorators.vary import vary_on_cookie
 from django.http import HttpResponseServerError
+from django.utils.http import is_safe_url
 
-from .models import Post, Group, User, Follow
+from .models import Comment, Post, Follow, UserStats
 from .forms import PostForm, CommentForm
+from .feed import follow_feed, feed_version
+from .pagination import (CursorPaginator, cache_page_ids, cached_count,
+                         paginate)
+from .relationships import FollowedEveryone, relationships_for
+from .search import search_posts
+from .transactions import atomic_retry
+from . import conditional, lookups, thumbnails
+
+
+def comment_pages(post_id, params=None):
+    """Комментарии поста от старых к новым порциями по COMMENTS_PER_PAGE:
+    первая выводится на странице поста, следующие - через post_comments."""
+    comments = Comment.objects.filter(post_id=post_id).select_related("author")
+    return CursorPaginator(comments, settings.COMMENTS_PER_PAGE,
+                           ordering=("created", "id"), params=params)
+
+
+def comments_url(username, post_id):
+    return reverse('posts:post_comments', args=(username, post_id))
+
+
+def with_stats(author):
+    """Счётчики автора для карточки профиля - отдельным запросом по ключу:
+    в posts.lookups их нет, они меняются с каждым постом и подпиской."""
+    stats = UserStats.objects.filter(user_id=author.id).first()
+    if stats is not None:
+        author.stats = stats
+    return author
 
 
 def index(request):
-    post_list = Post.objects.all()
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
+    post_list = Post.objects.select_related("author", "group")
+    paginator, page = paginate(request, post_list,
+                               count=cached_count("index", Post.objects))
+    followed = relationships_for(request).among_posts(page)
     return render(request, "index.html", {"page": page,
-                                          'paginator': paginator})
+                                          'paginator': paginator,
+                                          'followed': followed})
 
 
 @login_required
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-
-    return render(request, "follow.html", {"page": page,
-                                           'paginator': paginator})
+    post_list = follow_feed(request.user)
+    version = feed_version(request.user)
+    count = cached_count(f"follow:{request.user.pk}:{version}", post_list)
+    paginator, page = paginate(request, post_list, count=count)
+    # Версия ленты меняется только с её составом: по ней кешируем id
+    # постов страницы, карточки же берут свою версию из самих постов
+    page = cache_page_ids(
+        page, f"follow_page:{request.user.pk}:{version}:{page.key}",
+        settings.FEED_PAGE_CACHE_TIMEOUT)
+
+    return render(request, "follow.html", {
+        "page": page,
+        'paginator': paginator,
+        'followed': FollowedEveryone(),
+    })
 
 
+# Страница зависит от cookie зрителя: браузер и прокси хранят её по cookie
+# и перед каждым показом сверяют ETag (posts.conditional)
+@vary_on_cookie
+@cache_control(no_cache=True)
+@condition(etag_func=conditional.group_etag)
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    group = lookups.group_by_slug(slug)
+    post_list = group.posts.select_related("author", "group")
+    # Версия группы растёт с каждым постом в ней - число под ней точное.
+    # Её уже прочитал group_etag, иначе она дочитается из базы
+    version = getattr(request, "group_version", None)
+    if version is None:
+        version = group.version
+    count = cached_count(f"group:{group.id}:{version}", group.posts)
+    paginator, page = paginate(request, post_list, count=count)
     context = {
         "group": group,
         "page": page,
         'paginator': paginator,
+        'followed': relationships_for(request).among_posts(page),
     }
     return render(request, "group.html", context)
 
 
-def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-
-    if request.user.is_authenticated:
-        followed_authors = User.objects.filter(following__user=request.user)
-        following = author in followed_authors
-    else:
-        following = False
+def search(request):
+    query = request.GET.get('q', '')
+    group = request.GET.get('group')
+    author = request.GET.get('author')
+    posts = search_posts(query, group=group, author=author)
+    paginator, page = paginate(request, posts)
+    context = {
+        'page': page,
+        'paginator': paginator,
+        'query': query,
+        'group': group,
+        'author': author,
+        'followed': relationships_for(request).among_posts(page),
+    }
+    return render(request, 'search.html', context)
 
+
+@vary_on_cookie
+@cache_control(no_cache=True)
+@condition(etag_func=conditional.profile_etag)
+def profile(request, username):
+    author = with_stats(lookups.user_by_username(username))
+    posts = author.posts.select_related("author", "group")
+    stats = getattr(author, "stats", None)
+    count = (stats.posts_count if stats is not None
+             else cached_count(f"profile:{author.id}", author.posts))
+    paginator, page = paginate(request, posts, count=count)
+
+    relationships = relationships_for(request)
     context = {
         'page': page,
         'author': author,
         'paginator': paginator,
-        'following': following,
+        'following': relationships.follows(author.id),
+        'followed': relationships.among_posts(page),
     }
     return render(request, 'profile.html', context)
 
 
+@vary_on_cookie
+@cache_control(no_cache=True)
+@condition(etag_func=conditional.post_etag)
 def post_view(request, username, post_id):
-    author = get_object_or_404(User, username=username)
-    post = get_object_or_404(Post, id=post_id, author__username=username)
+    author = with_stats(lookups.user_by_username(username))
+    post = get_object_or_404(Post.objects.select_related("group"),
+                             id=post_id, author_id=author.id)
+    post.author = author
     form = CommentForm()
-    comments = post.comments.all()
     context = {'form': form,
                'post': post,
-               'comments': comments,
-               'author': author
+               'comments': comment_pages(post.id).offset_page(1),
+               'comments_url': comments_url(username, post_id),
+               'author': author,
+               'followed': relationships_for(request).among_posts([post]),
                }
     return render(request, 'post.html', context)
 
 
+def post_comments(request, username, post_id):
+    """Следующая порция комментариев фрагментом HTML для подгрузки."""
+    author = lookups.user_by_username(username)
+    post = get_object_or_404(Post.objects.only("id"),
+                             id=post_id, author_id=author.id)
+    paginator = comment_pages(post.id, params=request.GET)
+    context = {'comments': paginator.page_for_request(request),
+               'comments_url': comments_url(username, post_id)}
+    return render(request, 'comments_chunk.html', context)
+
+
 @login_required
+@atomic_retry
 def new_post(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
 
@@ -85,34 +171,43 @@ def new_post(request):
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        thumbnails.queue(post)
         return redirect('posts:index')
 
     return render(request, 'new_post.html', {'form': form})
 
 
 @login_required
+@atomic_retry
 def post_edit(request, username, post_id):
-    post = get_object_or_404(Post, id=post_id, author__username=username)
+    author = lookups.user_by_username(username)
+    post = get_object_or_404(Post, id=post_id, author_id=author.id)
+    post.author = author
 
     if request.user.username != username:
-        return redirect('posts:post', post.author, post.id)
+        return redirect('posts:post', username, post.id)
 
     form = PostForm(request.POST or None, files=request.FILES or None,
                     instance=post)
 
     if request.method == 'POST' and form.is_valid():
         form.save()
+        if 'image' in form.changed_data:
+            thumbnails.queue(post)
         return redirect('posts:post', post.author, post.id)
 
     return render(request, 'new_post.html', {'form': form, 'object': post})
 
 
 @login_required
+@atomic_retry
 def post_delete(request, username, post_id):
-    post = get_object_or_404(Post, id=post_id, author__username=username)
+    author = lookups.user_by_username(username)
+    post = get_object_or_404(Post, id=post_id, author_id=author.id)
+    post.author = author
 
     if request.user.username != username:
-        return redirect('posts:post', post.author, post.id)
+        return redirect('posts:post', username, post.id)
 
     post.delete()
 
@@ -121,8 +216,16 @@ def post_delete(request, username, post_id):
 
 @login_required
 @require_http_methods(['POST'])
+@atomic_retry
 def add_comment(request, username, post_id):
-    post = get_object_or_404(Post, id=post_id, author__username=username)
+    # Запрос из скрипта страницы получает только фрагмент: новый
+    # комментарий (201) или ошибки формы (400), без страницы поста
+    fragment = request.is_ajax()
+    author = lookups.user_by_username(username)
+    posts = (Post.objects.only("id") if fragment
+             else Post.objects.select_related("group"))
+    post = get_object_or_404(posts, id=post_id, author_id=author.id)
+    post.author = author
     form = CommentForm(request.POST)
 
     if form.is_valid():
@@ -130,30 +233,54 @@ def add_comment(request, username, post_id):
         comment.author = request.user
         comment.post = post
         comment.save()
-        return redirect('posts:post', post.author, post.id)
+        if fragment:
+            return render(request, 'comment_item.html',
+                          {'comment': comment}, status=201)
+        return redirect('posts:post', username, post.id)
+
+    if fragment:
+        return render(request, 'comment_errors.html', {'form': form},
+                      status=400)
+    context = {'form': form,
+               'post': post,
+               'comments': comment_pages(post.id).offset_page(1),
+               'comments_url': comments_url(username, post_id),
+               'author': with_stats(author),
+               'followed': relationships_for(request).among_posts([post]),
+               }
+    return render(request, 'post.html', context)
 
-    return render(request, 'post.html', {'form': form, 'post': post})
+
+def redirect_back(request, username):
+    """Кнопки подписки на карточках возвращают на страницу, где нажаты."""
+    next_url = request.GET.get('next')
+    if next_url and is_safe_url(next_url, {request.get_host()},
+                                request.is_secure()):
+        return redirect(next_url)
+    return redirect('posts:profile', username=username)
 
 
 @login_required
+@atomic_retry
 def profile_follow(request, username):
-    author = get_object_or_404(User, username=username)
+    author = lookups.user_by_username(username)
 
     if request.user == author:
         return redirect('posts:profile', username=username)
 
     author.following.get_or_create(user=request.user, author=author)
 
-    return redirect('posts:profile', username=username)
+    return redirect_back(request, username)
 
 
 @login_required
+@atomic_retry
 def profile_unfollow(request, username):
-    author = get_object_or_404(User, username=username)
+    author = lookups.user_by_username(username)
 
     Follow.objects.filter(user=request.user, author=author).delete()
 
-    return redirect('posts:profile', username=username)
+    return redirect_back(request, username)
 
 
 def page_not_found(request, exception):
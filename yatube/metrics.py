@@ -0,0 +1,207 @@
+"""Метрики запросов в формате Prometheus.
+
+MetricsMiddleware для каждого запроса записывает время ответа, число и
+суммарное время SQL-запросов и размер ответа с меткой view - именем URL
+(например, "posts:index"). Обращения к кешу считают бэкенды Metered*Cache
+из этого модуля. Всё хранится в памяти процесса: каждый процесс сервера
+отдаёт на /metrics свои значения, суммирует их Prometheus.
+
+Запись одного запроса - несколько сложений под общей блокировкой, поэтому
+сбор метрик можно не выключать под нагрузкой.
+"""
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connections
+from django.http import Http404, HttpResponse
+
+from yatube.sqlite.cache import SQLiteCache
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+                   5.0, 10.0)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+
+_lock = threading.Lock()
+
+
+class Histogram:
+    """Счётчики по интервалам; накопительные суммы считаются при выводе."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def samples(self):
+        total = 0
+        for bound, count in zip(self.buckets + ("+Inf",), self.counts):
+            total += count
+            yield bound, total
+
+
+class Registry:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.requests = defaultdict(int)
+        self.latency = defaultdict(lambda: Histogram(LATENCY_BUCKETS))
+        self.sizes = defaultdict(lambda: Histogram(SIZE_BUCKETS))
+        self.queries = defaultdict(lambda: Histogram(QUERY_BUCKETS))
+        self.db_seconds = defaultdict(float)
+        self.cache = defaultdict(int)
+
+    def record_request(self, view, method, status, seconds, size,
+                       queries, db_seconds):
+        with _lock:
+            self.requests[view, method, str(status)] += 1
+            self.latency[view].observe(seconds)
+            if size is not None:
+                self.sizes[view].observe(size)
+            self.queries[view].observe(queries)
+            self.db_seconds[view] += db_seconds
+
+    def record_cache(self, result):
+        with _lock:
+            self.cache[result] += 1
+
+    def render(self):
+        from posts import page_cache
+
+        lines = []
+        with _lock:
+            _counter(lines, "yatube_http_requests_total",
+                     "Обработанные запросы", ("view", "method", "status"),
+                     self.requests)
+            _histogram(lines, "yatube_http_request_duration_seconds",
+                       "Время ответа", self.latency)
+            _histogram(lines, "yatube_http_response_size_bytes",
+                       "Размер тела ответа", self.sizes)
+            _histogram(lines, "yatube_db_queries_per_request",
+                       "SQL-запросов на один запрос", self.queries)
+            _counter(lines, "yatube_db_query_duration_seconds_total",
+                     "Суммарное время SQL-запросов", ("view",),
+                     {(view,): value
+                      for view, value in self.db_seconds.items()})
+            _counter(lines, "yatube_cache_requests_total",
+                     "Чтения из кеша", ("result",),
+                     {(result,): value
+                      for result, value in self.cache.items()})
+        _counter(lines, "yatube_page_cache_requests_total",
+                 "Обращения к кешу страниц лент", ("result",),
+                 {(result,): value
+                  for result, value in page_cache.stats().items()})
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+def _escape(value):
+    return (str(value).replace("\\", "\\\\").replace("\n", "\\n")
+            .replace('"', '\\"'))
+
+
+def _labels(names, values):
+    pairs = ",".join(f'{name}="{_escape(value)}"'
+                     for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _counter(lines, name, help_text, label_names, values):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} counter")
+    for key, value in sorted(values.items()):
+        lines.append(f"{name}{_labels(label_names, key)} {value}")
+
+
+def _histogram(lines, name, help_text, histograms):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for view, histogram in sorted(histograms.items()):
+        total = 0
+        for bound, total in histogram.samples():
+            labels = _labels(("view", "le"), (view, bound))
+            lines.append(f"{name}_bucket{labels} {total}")
+        labels = _labels(("view",), (view,))
+        lines.append(f"{name}_sum{labels} {histogram.sum}")
+        lines.append(f"{name}_count{labels} {total}")
+
+
+class QueryTimer:
+    """execute_wrapper, считающий SQL-запросы и их время."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.count += 1
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = QueryTimer()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timer))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+
+        match = getattr(request, "resolver_match", None)
+        view = match.view_name if match else "unmatched"
+        size = None if response.streaming else len(response.content)
+        registry.record_request(view, request.method, response.status_code,
+                                elapsed, size, timer.count, timer.seconds)
+        return response
+
+
+def metrics(request):
+    """Текущие значения метрик процесса в текстовом формате Prometheus."""
+    allowed = settings.METRICS_ALLOWED_IPS
+    if allowed is not None and request.META.get("REMOTE_ADDR") not in allowed:
+        raise Http404
+    return HttpResponse(registry.render(), content_type=CONTENT_TYPE)
+
+
+class MeteredCacheMixin:
+    """Считает попадания и промахи get() в registry."""
+
+    _missing = object()
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, self._missing, version)
+        if value is self._missing:
+            registry.record_cache("miss")
+            return default
+        registry.record_cache("hit")
+        return value
+
+
+class MeteredSQLiteCache(MeteredCacheMixin, SQLiteCache):
+    pass
+
+
+class MeteredLocMemCache(MeteredCacheMixin, LocMemCache):
+    pass
@@ -0,0 +1,87 @@
+"""Маршрутизация чтения на реплики.
+
+Пишем всегда в основную базу default, читаем с реплик из
+DATABASE_REPLICAS - копий основной базы, которые обновляет команда
+sync_replicas и которые поэтому отстают. Чтобы отставание не было видно:
+
+* с реплик читают только GET и HEAD запросы, которые пропустил
+  ReplicaPinMiddleware; команды, фоновые потоки и запросы на запись
+  читают из основной базы;
+* после первой записи в запросе и до его конца всё читается из основной
+  базы, как и внутри открытой транзакции;
+* запрос, который что-то записал, получает cookie на REPLICA_PIN_SECONDS
+  секунд, и следующие запросы этого клиента тоже читают из основной базы -
+  пользователь сразу видит свой пост или комментарий.
+"""
+import random
+import threading
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+PRIMARY = "default"
+PIN_COOKIE = "read_primary"
+SAFE_METHODS = ("GET", "HEAD")
+# Сессия, созданная после последней синхронизации, на реплике не найдётся
+# и пользователь окажется разлогинен
+PRIMARY_APPS = ("sessions",)
+
+_state = threading.local()
+
+
+def reset():
+    _state.replicas = False
+    _state.wrote = False
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not getattr(_state, "replicas", False):
+            return PRIMARY
+        if (model._meta.app_label in PRIMARY_APPS
+                or connections[PRIMARY].in_atomic_block):
+            return PRIMARY
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        _state.replicas = False
+        _state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        pool = {PRIMARY, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Реплики получают схему вместе с данными из sync_replicas
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class ReplicaPinMiddleware:
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _state.replicas = (request.method in SAFE_METHODS
+                           and PIN_COOKIE not in request.COOKIES)
+        _state.wrote = False
+        try:
+            response = self.get_response(request)
+            wrote = _state.wrote
+        finally:
+            reset()
+        if wrote:
+            response.set_cookie(PIN_COOKIE, "1",
+                                max_age=settings.REPLICA_PIN_SECONDS,
+                                httponly=True, samesite="Lax")
+        return response
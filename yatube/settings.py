@@ -48,6 +48,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Первым, чтобы время ответа учитывало все остальные слои
+    'yatube.metrics.MetricsMiddleware',
+    'yatube.slow_queries.SlowQueryMiddleware',
+    # До сессий и пользователя: они тоже читаются с реплик
+    'yatube.routers.ReplicaPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -83,13 +88,49 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# yatube.sqlite - sqlite3 с PRAGMA на каждом соединении: WAL, чтобы
+# чтение не ждало записи, и busy_timeout, чтобы писатель ждал очереди.
+# Соединение живёт между запросами CONN_MAX_AGE секунд
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'yatube.sqlite',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': 60,
+        'OPTIONS': {
+            'pragmas': {
+                'journal_mode': 'wal',
+                'synchronous': 'normal',
+                'busy_timeout': 5000,
+                'cache_size': -20000,
+                'mmap_size': 256 * 1024 * 1024,
+                'temp_store': 'memory',
+            },
+        },
     }
 }
 
+# Реплики только для чтения (yatube.routers): копии основной базы в
+# db.replicaN.sqlite3, которые обновляет manage.py sync_replicas.
+# Клиент, который что-то записал, ещё REPLICA_PIN_SECONDS секунд читает
+# из основной базы
+DATABASE_REPLICA_COUNT = 0
+DATABASE_REPLICAS = []
+for number in range(1, DATABASE_REPLICA_COUNT + 1):
+    DATABASES[f'replica{number}'] = {
+        **DATABASES['default'],
+        'NAME': os.path.join(BASE_DIR, f'db.replica{number}.sqlite3'),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{number}')
+DATABASE_ROUTERS = ['yatube.routers.PrimaryReplicaRouter']
+REPLICA_PIN_SECONDS = 10
+
+# Транзакции записи (posts.transactions.atomic_retry), упавшие на занятой
+# базе, повторяются до DB_RETRY_ATTEMPTS раз с паузой от DB_RETRY_DELAY
+# секунд, растущей вдвое
+DB_RETRY_ATTEMPTS = 5
+DB_RETRY_DELAY = 0.02
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -127,12 +168,29 @@ USE_TZ = True
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/2.2/howto/static-files/
 
+# Общий для всех процессов кеш: фрагменты карточек и лент, отметки
+# изменения лент. Он в файле SQLite (yatube.sqlite.cache): add() атомарен
+# между процессами, на нём держатся блокировки posts.page_cache. В тестах
+# его заменяет кеш в памяти (yatube.testing).
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        'BACKEND': 'yatube.metrics.MeteredSQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
 }
 
+TEST_RUNNER = 'yatube.testing.TestRunner'
+
+# Страница ленты свежая PAGE_CACHE_TIMEOUT секунд, ещё PAGE_CACHE_GRACE
+# секунд её отдают устаревшей, пока один процесс пересчитывает её под
+# блокировкой на PAGE_CACHE_LOCK_TIMEOUT секунд. Когда копии нет совсем,
+# остальные до PAGE_CACHE_WAIT секунд ждут результата этого процесса
+PAGE_CACHE_TIMEOUT = 2
+PAGE_CACHE_GRACE = 30
+PAGE_CACHE_LOCK_TIMEOUT = 10
+PAGE_CACHE_WAIT = 2
+
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, "static")
 
@@ -149,3 +207,66 @@ LOGIN_REDIRECT_URL = "posts:index"
 EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
 # указываем директорию, в которую будут складываться файлы писем
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
+
+# Постраничная навигация: по ключу (pub_date, id), старые ссылки ?page=N
+# обслуживаются через OFFSET только для первых PAGINATE_OFFSET_PAGES страниц
+POSTS_PER_PAGE = 10
+PAGINATE_OFFSET_PAGES = 10
+# Ссылок на номера страниц по обе стороны от текущей; число записей для
+# навигации кешируется на PAGINATE_COUNT_TIMEOUT секунд
+PAGINATE_WINDOW = 3
+PAGINATE_COUNT_TIMEOUT = 300
+# Комментарии на странице поста выводятся и подгружаются порциями
+COMMENTS_PER_PAGE = 50
+
+# Группы по slug и пользователи по имени: LRU процесса на LOOKUP_LOCAL_SIZE
+# записей по LOOKUP_LOCAL_TTL секунд перед общим кешем (posts.lookups)
+LOOKUP_CACHE = True
+LOOKUP_LOCAL_SIZE = 1024
+LOOKUP_LOCAL_TTL = 5
+LOOKUP_CACHE_TIMEOUT = 300
+
+# Лента подписок: посты раскладываются по «входящим» подписчиков при
+# публикации. Авторов, у которых подписчиков больше FEED_FANOUT_LIMIT,
+# не раскладываем - их посты подмешиваются в ленту при чтении.
+FEED_FANOUT_LIMIT = 10000
+# Обратно в ленты подписчиков автор возвращается, когда их становится не
+# больше FEED_REJOIN_LIMIT (recount_stats), и получает туда последние
+# FEED_REJOIN_SIZE постов
+FEED_REJOIN_LIMIT = FEED_FANOUT_LIMIT * 9 // 10
+FEED_REJOIN_SIZE = 50
+# Сколько последних постов автора досыпать в ленту при подписке
+FEED_BACKFILL_SIZE = 1000
+FEED_BATCH_SIZE = 1000
+FEED_CELEBRITIES_TTL = 300
+# Сколько секунд хранится состав страницы ленты подписок (id постов)
+FEED_PAGE_CACHE_TIMEOUT = 300
+
+# Варианты картинок постов: кадр с пропорциями POST_IMAGE_RATIO каждой
+# ширины в каждом формате (формат Pillow, расширение, качество). Создаются
+# пулом из THUMBNAIL_WORKERS потоков сразу после сохранения поста
+POST_IMAGE_RATIO = (960, 339)
+POST_IMAGE_WIDTHS = (320, 640, 960)
+POST_IMAGE_FORMATS = (
+    ('WEBP', 'webp', 80),
+    ('JPEG', 'jpg', 85),
+)
+THUMBNAIL_WORKERS = 2
+THUMBNAIL_ASYNC = True
+
+# Входит в ETag страниц поста, профиля и группы (posts.conditional):
+# увеличьте, когда меняются их шаблоны, чтобы кеши не отдавали старую разметку
+PAGE_ETAG_VERSION = 1
+
+# Списки админки с фильтрами считают не больше стольких строк
+ADMIN_COUNT_LIMIT = 10000
+
+# Метрики процесса на /metrics (yatube.metrics) отдаются только этим
+# адресам; None - всем
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+
+# SQL-запросы дольше SLOW_QUERY_THRESHOLD_MS миллисекунд пишутся строками
+# JSON в SLOW_QUERY_LOG (yatube.slow_queries); None - журнал выключен.
+# Сводка: manage.py slow_queries. В тестах выключен (yatube.testing)
+SLOW_QUERY_THRESHOLD_MS = 100
+SLOW_QUERY_LOG = os.path.join(BASE_DIR, 'slow_queries.log')
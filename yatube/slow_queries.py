@@ -0,0 +1,194 @@
+"""Журнал медленных SQL-запросов.
+
+SlowQueryMiddleware на время запроса оборачивает выполнение SQL на всех
+соединениях. Запрос дольше SLOW_QUERY_THRESHOLD_MS миллисекунд попадает
+строкой JSON в SLOW_QUERY_LOG: имя URL, нормализованный SQL и его
+отпечаток, параметры, длительность и план EXPLAIN QUERY PLAN (только
+SQLite). План снимается один раз на отпечаток в процессе, чтобы частый
+медленный запрос не выполнялся дважды на каждый вызов.
+
+Сводку по отпечаткам печатает команда slow_queries.
+"""
+import hashlib
+import json
+import re
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils import timezone
+
+# Сколько планов держать в памяти процесса
+PLAN_CACHE_SIZE = 1000
+MAX_PARAM_LENGTH = 200
+
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r"(?<![\w.\"])-?\d+(?:\.\d+)?\b")
+LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+SPACE_RE = re.compile(r"\s+")
+EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")
+
+_lock = threading.Lock()
+_plans = {}
+_local = threading.local()
+
+
+def normalize(sql):
+    """SQL без значений: литералы и параметры заменены на ?, списки
+    IN (?, ?, ...) свёрнуты, чтобы запросы одной формы совпадали."""
+    sql = STRING_RE.sub("?", sql)
+    sql = sql.replace("%s", "?")
+    sql = NUMBER_RE.sub("?", sql)
+    sql = LIST_RE.sub("(...)", sql)
+    return SPACE_RE.sub(" ", sql).strip()
+
+
+def fingerprint(normalized):
+    return hashlib.sha1(normalized.encode()).hexdigest()[:16]
+
+
+def _param(value):
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    text = str(value)
+    if len(text) > MAX_PARAM_LENGTH:
+        text = text[:MAX_PARAM_LENGTH] + "…"
+    return text
+
+
+def explain(connection, sql, params):
+    """Строки EXPLAIN QUERY PLAN с отступом по вложенности; None, если
+    план снять нельзя."""
+    if connection.vendor != "sqlite":
+        return None
+    if not sql.lstrip().upper().startswith(EXPLAINABLE):
+        return None
+    # Курсор бэкенда без обёрток: план не должен попасть в журнал и
+    # метрики как ещё один запрос
+    cursor = connection.create_cursor()
+    try:
+        cursor.execute("EXPLAIN QUERY PLAN " + sql, params or ())
+        rows = cursor.fetchall()
+    except Exception:
+        return None
+    finally:
+        cursor.close()
+
+    depth = {0: -1}
+    plan = []
+    for node, parent, _, detail in rows:
+        depth[node] = depth.get(parent, -1) + 1
+        plan.append("  " * depth[node] + detail)
+    return plan
+
+
+def _cached_plan(key, connection, sql, params):
+    with _lock:
+        if key in _plans:
+            return _plans[key]
+    plan = explain(connection, sql, params)
+    with _lock:
+        if len(_plans) >= PLAN_CACHE_SIZE:
+            _plans.clear()
+        _plans[key] = plan
+    return plan
+
+
+def reset_plans():
+    with _lock:
+        _plans.clear()
+
+
+def write(entry):
+    line = json.dumps(entry, ensure_ascii=False) + "\n"
+    with _lock:
+        with open(settings.SLOW_QUERY_LOG, "a", encoding="utf-8") as log:
+            log.write(line)
+
+
+class SlowQueryLogger:
+    """execute_wrapper, записывающий запросы дольше порога."""
+
+    def __init__(self, request, threshold_ms):
+        self.request = request
+        self.threshold = threshold_ms / 1000
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            if elapsed >= self.threshold:
+                self.log(sql, params, many, context["connection"], elapsed)
+
+    def log(self, sql, params, many, connection, elapsed):
+        if many:
+            params = next(iter(params), None)
+        normalized = normalize(sql)
+        key = fingerprint(normalized)
+        match = getattr(self.request, "resolver_match", None)
+        write({
+            "time": timezone.now().isoformat(),
+            "view": match.view_name if match else None,
+            "fingerprint": key,
+            "sql": normalized,
+            "params": [_param(value) for value in params or ()],
+            "many": many,
+            "duration_ms": round(elapsed * 1000, 3),
+            "plan": _cached_plan(key, connection, sql, params),
+        })
+
+
+class SlowQueryMiddleware:
+    def __init__(self, get_response):
+        if settings.SLOW_QUERY_THRESHOLD_MS is None:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        logger = SlowQueryLogger(request, settings.SLOW_QUERY_THRESHOLD_MS)
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(logger))
+            return self.get_response(request)
+
+
+def read(path):
+    """Записи журнала; битые строки (например, недописанные) пропускаются."""
+    with open(path, encoding="utf-8") as log:
+        for line in log:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def aggregate(entries):
+    """Сводка по отпечаткам: число, суммарное и худшее время, имена URL,
+    последний план."""
+    groups = {}
+    for entry in entries:
+        group = groups.setdefault(entry["fingerprint"], {
+            "fingerprint": entry["fingerprint"],
+            "sql": entry["sql"],
+            "count": 0,
+            "total_ms": 0.0,
+            "max_ms": 0.0,
+            "views": set(),
+            "plan": None,
+        })
+        group["count"] += 1
+        group["total_ms"] += entry["duration_ms"]
+        group["max_ms"] = max(group["max_ms"], entry["duration_ms"])
+        if entry.get("view"):
+            group["views"].add(entry["view"])
+        if entry.get("plan"):
+            group["plan"] = entry["plan"]
+    for group in groups.values():
+        group["avg_ms"] = group["total_ms"] / group["count"]
+        group["views"] = sorted(group["views"])
+    return list(groups.values())
@@ -0,0 +1,11 @@
+"""Бэкенд SQLite с настройками соединения для конкурентной нагрузки.
+
+ENGINE 'yatube.sqlite' - обычный django.db.backends.sqlite3, который на
+каждом новом соединении выполняет PRAGMA из OPTIONS['pragmas'].
+"""
+
+
+def apply_pragmas(connection, pragmas):
+    """Выполняет PRAGMA на соединении sqlite3 (не обёртке Django)."""
+    for name, value in pragmas.items():
+        connection.execute(f"PRAGMA {name} = {value}").fetchall()
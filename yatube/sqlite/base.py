@@ -0,0 +1,16 @@
+from django.db.backends.sqlite3 import base
+
+from . import apply_pragmas
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        # Не параметр sqlite3.connect(), а наш: PRAGMA для get_new_connection
+        kwargs.pop("pragmas", None)
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        apply_pragmas(conn, self.settings_dict["OPTIONS"].get("pragmas", {}))
+        return conn
@@ -0,0 +1,182 @@
+"""Общий для процессов кеш в отдельном файле SQLite.
+
+В отличие от FileBasedCache, add() здесь - одна команда SQL, а incr() -
+транзакция BEGIN IMMEDIATE, поэтому обе атомарны между процессами: на
+add() держатся блокировки posts.page_cache.
+Запись не обходит каталог: истёкшие записи и лишние сверх MAX_ENTRIES
+удаляются раз в CULL_EVERY записей по индексу срока.
+
+CACHES = {'default': {'BACKEND': 'yatube.sqlite.cache.SQLiteCache',
+                      'LOCATION': '/путь/к/cache.sqlite3'}}
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from . import apply_pragmas
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL,
+                                  expires REAL);
+CREATE INDEX IF NOT EXISTS cache_expires_idx ON cache (expires);
+"""
+PRAGMAS = {"journal_mode": "wal", "synchronous": "normal",
+           "busy_timeout": 5000}
+# Записи без срока при вытеснении считаются самыми долгоживущими
+NEVER = 1e18
+
+
+class SQLiteCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        self._cull_every = int(params.get("OPTIONS", {})
+                               .get("CULL_EVERY", 100))
+        self._local = threading.local()
+
+    def _connection(self):
+        # Соединение на поток; после fork процесса открывается новое
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self._path, isolation_level=None)
+            apply_pragmas(conn, PRAGMAS)
+            conn.executescript(SCHEMA)
+            self._local.conn, self._local.pid = conn, os.getpid()
+            self._local.writes = 0
+        return conn
+
+    def _expires(self, timeout):
+        expires = self.get_backend_timeout(timeout)
+        return NEVER if expires is None else expires
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def get(self, key, default=None, version=None):
+        row = self._connection().execute(
+            "SELECT value FROM cache WHERE key = ? AND expires > ?",
+            (self._key(key, version), time.time())).fetchone()
+        return default if row is None else pickle.loads(row[0])
+
+    def get_many(self, keys, version=None):
+        keys = {self._key(key, version): key for key in keys}
+        if not keys:
+            return {}
+        rows = self._connection().execute(
+            f"SELECT key, value FROM cache WHERE expires > ? AND key IN "
+            f"({', '.join('?' * len(keys))})", (time.time(), *keys))
+        return {keys[key]: pickle.loads(value) for key, value in rows}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._write(
+            "INSERT OR REPLACE INTO cache (key, value, expires) "
+            "VALUES (?, ?, ?)",
+            (self._key(key, version), self._dump(value),
+             self._expires(timeout)))
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self._expires(timeout)
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO cache (key, value, expires) "
+                "VALUES (?, ?, ?)",
+                [(self._key(key, version), self._dump(value), expires)
+                 for key, value in data.items()])
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        self._written(len(data))
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        """Записывает, только если ключа нет или он истёк - атомарно."""
+        cursor = self._write(
+            "INSERT INTO cache (key, value, expires) VALUES (?, ?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET value = excluded.value, "
+            "expires = excluded.expires WHERE cache.expires <= ?",
+            (self._key(key, version), self._dump(value),
+             self._expires(timeout), time.time()))
+        return cursor.rowcount == 1
+
+    def incr(self, key, delta=1, version=None):
+        """Чтение и запись под BEGIN IMMEDIATE: параллельные incr() других
+        процессов ждут, прибавления не теряются."""
+        key = self._key(key, version)
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT value FROM cache WHERE key = ? AND expires > ?",
+                (key, time.time())).fetchone()
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(row[0]) + delta
+            conn.execute("UPDATE cache SET value = ? WHERE key = ?",
+                         (self._dump(value), key))
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        cursor = self._connection().execute(
+            "UPDATE cache SET expires = ? WHERE key = ? AND expires > ?",
+            (self._expires(timeout), self._key(key, version), time.time()))
+        return cursor.rowcount == 1
+
+    def has_key(self, key, version=None):
+        return self._connection().execute(
+            "SELECT 1 FROM cache WHERE key = ? AND expires > ?",
+            (self._key(key, version), time.time())).fetchone() is not None
+
+    def delete(self, key, version=None):
+        self._connection().execute("DELETE FROM cache WHERE key = ?",
+                                   (self._key(key, version),))
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        if keys:
+            self._connection().execute(
+                f"DELETE FROM cache WHERE key IN "
+                f"({', '.join('?' * len(keys))})", keys)
+
+    def clear(self):
+        self._connection().execute("DELETE FROM cache")
+
+    def _dump(self, value):
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    def _write(self, sql, params):
+        cursor = self._connection().execute(sql, params)
+        self._written(1)
+        return cursor
+
+    def _written(self, count):
+        self._local.writes += count
+        if self._local.writes >= self._cull_every:
+            self._local.writes = 0
+            self._cull()
+
+    def _cull(self):
+        """Удаляет истёкшие записи, а при переполнении - самые близкие
+        к истечению. Выполняется раз в CULL_EVERY записей потока."""
+        conn = self._connection()
+        conn.execute("DELETE FROM cache WHERE expires <= ?", (time.time(),))
+        extra = (conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+                 - self._max_entries)
+        if extra > 0:
+            # Как у бэкендов Django: освобождаем 1/CULL_FREQUENCY места
+            if self._cull_frequency:
+                extra = max(extra, self._max_entries // self._cull_frequency)
+            conn.execute("DELETE FROM cache WHERE key IN (SELECT key FROM "
+                         "cache ORDER BY expires LIMIT ?)", (extra,))
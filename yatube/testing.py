@@ -0,0 +1,56 @@
+"""Окружение тестов для manage.py test и pytest (conftest.py).
+
+Настройки проекта от способа запуска не зависят; на время тестов
+подменяется то, что не должно делиться с работающим сайтом: общий кеш -
+на кеш в памяти процесса, чтобы прогоны не видели данных друг друга и
+сайта, а журнал медленных запросов выключается. Перед каждым тестом
+кеши очищаются: откат транзакции теста удаляет строки без сигналов,
+которые стёрли бы их копии в кеше.
+"""
+import unittest
+
+from django.core.cache import cache
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+TEST_SETTINGS = {
+    "CACHES": {
+        "default": {
+            "BACKEND": "yatube.metrics.MeteredLocMemCache",
+        },
+    },
+    "SLOW_QUERY_THRESHOLD_MS": None,
+}
+
+
+def override_test_settings():
+    return override_settings(**TEST_SETTINGS)
+
+
+def reset_caches():
+    from posts import lookups
+
+    cache.clear()
+    lookups.local.clear()
+
+
+class ResettingResultMixin:
+    def startTest(self, test):
+        reset_caches()
+        super().startTest(test)
+
+
+class TestRunner(DiscoverRunner):
+    def get_resultclass(self):
+        # Поверх результата с --debug-sql, если он выбран
+        base = super().get_resultclass() or unittest.TextTestResult
+        return type("ResettingResult", (ResettingResultMixin, base), {})
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._test_settings = override_test_settings()
+        self._test_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._test_settings.disable()
+        super().teardown_test_environment(**kwargs)